@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+MP4 Output Mode Benchmark
+Remuxes the same .h264 recordings once per output mode (faststart and
+fragmented, see OUTPUT_MODES in convert_h264_to_mp4.py) and compares wall
+time, output size and the bytes ffmpeg actually wrote.
+
+Bytes written come from the block output count of the finished ffmpeg
+children (getrusage), so the faststart rewrite pass shows up as roughly
+twice the output size. That figure is only available on Linux and other
+Unix systems; elsewhere only time and size are reported.
+
+Usage:
+    python benchmark_mp4_modes.py                     # all recordings, converted individually
+    python benchmark_mp4_modes.py --merge             # all recordings merged into one MP4
+    python benchmark_mp4_modes.py rec_*.h264 --repeat 5
+"""
+
+import argparse
+import shutil
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from convert_h264_to_mp4 import OUTPUT_MODES, VideoConverter
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# getrusage() counts output in 512-byte blocks
+BLOCK_BYTES = 512
+
+
+def children_written_bytes():
+    """Bytes written by all finished child processes, or None if unknown."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_oublock * BLOCK_BYTES
+
+
+def run_mode(converter, mode, inputs, merge, bench_dir):
+    """
+    Remux inputs with one output mode. Returns (seconds, output bytes,
+    written bytes or None). Outputs are deleted afterwards.
+    """
+    converter.output_mode = mode
+    if merge:
+        jobs = [(inputs, bench_dir / f"merged_{mode}.mp4")]
+    else:
+        jobs = [([f], bench_dir / f"{f.stem}_{mode}.mp4") for f in inputs]
+
+    written_before = children_written_bytes()
+    start = time.perf_counter()
+    for sources, output in jobs:
+        if merge:
+            success, error, _ = converter.merge_files(sources, output)
+        else:
+            success, error = converter.convert_file(sources[0], output)
+        if not success:
+            raise RuntimeError(f"{mode}: ffmpeg failed for {output.name}: {error}")
+    elapsed = time.perf_counter() - start
+    written_after = children_written_bytes()
+
+    output_bytes = sum(output.stat().st_size for _, output in jobs)
+    for _, output in jobs:
+        output.unlink()
+    written = None if written_before is None else written_after - written_before
+    return elapsed, output_bytes, written
+
+
+def benchmark(inputs, merge=False, repeat=3, bench_dir=None):
+    """Run every mode repeat times (interleaved) and print a comparison."""
+    converter = VideoConverter(workers=1)
+    bench_dir = Path(bench_dir) if bench_dir else converter.output_dir / ".benchmark"
+    # Only a directory created here is removed afterwards
+    created = not bench_dir.exists()
+    bench_dir.mkdir(parents=True, exist_ok=True)
+    converter.output_dir = bench_dir
+
+    input_mb = sum(f.stat().st_size for f in inputs) / (1024 * 1024)
+    print(f"Benchmarking {len(inputs)} file(s), {input_mb:.1f} MB, "
+          f"{'merged into one MP4' if merge else 'converted individually'}, {repeat} run(s) per mode")
+    print(f"Writing to {bench_dir}\n")
+
+    results = {mode: [] for mode in OUTPUT_MODES}
+    try:
+        # Alternate the modes so page cache warm-up doesn't favour one of them
+        for _ in range(repeat):
+            for mode in OUTPUT_MODES:
+                results[mode].append(run_mode(converter, mode, inputs, merge, bench_dir))
+    finally:
+        if created:
+            shutil.rmtree(bench_dir, ignore_errors=True)
+
+    print(f"  {'mode':<12} {'time (s)':>9} {'MB/s':>8} {'output MB':>10} {'written MB':>11} {'written/output':>15}")
+    for mode, runs in results.items():
+        elapsed = statistics.median(r[0] for r in runs)
+        output_mb = runs[0][1] / (1024 * 1024)
+        written = [r[2] for r in runs if r[2] is not None]
+        if written:
+            written_mb = statistics.median(written) / (1024 * 1024)
+            written_text = f"{written_mb:>11.1f} {written_mb / output_mb if output_mb else 0:>14.2f}x"
+        else:
+            written_text = f"{'-':>11} {'-':>15}"
+        print(f"  {mode:<12} {elapsed:>9.2f} {input_mb / elapsed:>8.1f} {output_mb:>10.1f} {written_text}")
+    print("\n  time is the median of the runs; written MB is what ffmpeg wrote, "
+          "including faststart's rewrite pass")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare faststart and fragmented MP4 output on the same recordings"
+    )
+    parser.add_argument(
+        "inputs", nargs="*", type=Path,
+        help="Recordings to remux (default: every .h264 file in the input directory)",
+    )
+    parser.add_argument("--merge", action="store_true", help="Merge the inputs into one MP4 per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode (default: 3)")
+    parser.add_argument(
+        "--bench-dir", type=Path, default=None,
+        help="Scratch directory for outputs (default: a temporary .benchmark directory "
+             "in the output directory, so the same disk is measured)",
+    )
+    args = parser.parse_args()
+
+    inputs = args.inputs or VideoConverter(workers=1).get_h264_files()
+    if not inputs:
+        print("❌ No .h264 files to benchmark!")
+        sys.exit(1)
+
+    try:
+        benchmark(inputs, args.merge, max(1, args.repeat), args.bench_dir)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,28 @@
 H.264 to MP4 Bulk Converter
 Convert all .h264 recordings to MP4 format
 Supports individual conversion, merging, and batch processing
+
+Run without arguments for the interactive menu, or non-interactively:
+    python convert_h264_to_mp4.py --mode merge-by-date --input recordings --output converted
+    python convert_h264_to_mp4.py --watch    # convert recordings as they finish
 """
 
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
 import os
+import re
+import select
+import struct
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from datetime import datetime
+import json
 import shutil
 
 # ============= CONFIGURATION =============
@@ -21,20 +36,147 @@ OUTPUT_DIR = os.path.join(SCRIPT_DIR, "converted")      # Where MP4 files go
 
 # Conversion options
 DELETE_ORIGINALS = False    # Delete .h264 files after successful conversion
-ADD_TIMESTAMP = True        # Add timestamp to output filename
+ADD_TIMESTAMP = True        # Keep recording times in output names (content fingerprint if a name has none)
+WORKERS = 4                 # Concurrent remuxes in individual mode (1 = one at a time)
+OUTPUT_MODE = "faststart"   # "faststart" or "fragmented" (see OUTPUT_MODES)
+INCREMENTAL_MERGE = True    # Append new recordings to existing daily merges (written fragmented)
+VALIDATE_INPUTS = True      # Index recordings first: skip unusable ones, trim damaged tails
+
+# Watch mode (--watch)
+SETTLE_SECONDS = 5.0        # Unchanged this long = finished (when close events aren't available)
+POLL_INTERVAL = 1.0         # Seconds between checks
 
 # =========================================
 
+# merge_files error when every input was left out as unusable
+NO_USABLE_RECORDINGS = "no usable recordings"
+
+# MP4 layouts. faststart moves the index (moov) to the front for web
+# playback, which makes ffmpeg rewrite the whole file in a second pass.
+# fragmented writes an empty moov up front and a fragment per keyframe, in
+# a single sequential pass; files stay playable even if ffmpeg is killed.
+OUTPUT_MODES = {
+    "faststart": ['-movflags', '+faststart'],
+    "fragmented": ['-movflags', '+frag_keyframe+empty_moov+default_base_moof'],
+}
+
+# Records which recordings each merged_YYYYMMDD.mp4 contains (in OUTPUT_DIR)
+MERGE_STATE_FILE = ".merge_state.json"
+
+# Records completed individual conversions and merge-all outputs (in
+# OUTPUT_DIR), so re-runs skip them without looking at the recordings again
+LEDGER_FILE = ".conversion_ledger.json"
+LEDGER_SAVE_INTERVAL = 5.0  # Seconds between ledger saves during a run
+
+# Recording time in recorder filenames (rec_YYYYMMDD_HHMMSS.h264)
+RECORDED_TIME = re.compile(r'(?<!\d)\d{8}_\d{6}(?!\d)')
+
+# Use the shared ffmpeg job runner (ffmpeg_jobs.py in the repository root or
+# next to this script) when available; plain subprocess otherwise
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+try:
+    import ffmpeg_jobs
+except ImportError:
+    ffmpeg_jobs = None
+
+import fmp4
+import h264_index
+
+MODES = ('individual', 'merge-all', 'merge-by-date')
+
+class InotifyWatcher:
+    """Linux inotify events for one directory, through libc (no extra packages)"""
+    
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_Q_OVERFLOW = 0x4000  # events were dropped; has no file name
+    EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+    
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        try:
+            init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except AttributeError:
+            raise OSError("inotify is not supported on this system")
+        self.fd = init(os.O_NONBLOCK | getattr(os, 'O_CLOEXEC', 0))
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if add_watch(self.fd, os.fsencode(str(directory)), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"cannot watch {directory}: {os.strerror(errno)}")
+    
+    def read(self, timeout):
+        """Wait up to timeout seconds; returns a list of (mask, filename) ('' on overflow)"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos + self.EVENT_HEADER.size <= len(data):
+            _, mask, _, length = self.EVENT_HEADER.unpack_from(data, pos)
+            pos += self.EVENT_HEADER.size
+            name = data[pos:pos + length].rstrip(b'\0')
+            pos += length
+            if name or mask & self.IN_Q_OVERFLOW:
+                events.append((mask, os.fsdecode(name)))
+        return events
+    
+    def close(self):
+        os.close(self.fd)
+
 class VideoConverter:
-    def __init__(self):
-        self.input_dir = Path(INPUT_DIR)
-        self.output_dir = Path(OUTPUT_DIR)
+    def __init__(
+        self,
+        workers=WORKERS,
+        output_mode=OUTPUT_MODE,
+        input_dir=None,
+        output_dir=None,
+        delete_originals=DELETE_ORIGINALS,
+        add_timestamp=ADD_TIMESTAMP,
+        incremental_merge=INCREMENTAL_MERGE,
+        validate_inputs=VALIDATE_INPUTS,
+    ):
+        """Settings default to the configuration constants above"""
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {output_mode} (choose from {', '.join(OUTPUT_MODES)})")
+        self.input_dir = Path(input_dir or INPUT_DIR)
+        self.output_dir = Path(output_dir or OUTPUT_DIR)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = max(1, workers)
+        self.output_mode = output_mode
+        self.delete_originals = delete_originals
+        self.add_timestamp = add_timestamp
+        self.incremental_merge = incremental_merge
+        self.validate_inputs = validate_inputs
         
         self.total_files = 0
         self.converted_files = 0
         self.failed_files = 0
         self.skipped_files = 0
+        self.bytes_processed = 0    # Input bytes of converted files, for MB/s
+        self.started_at = time.perf_counter()
+        
+        # Loaded by the modes that use it (see load_ledger)
+        self.ledger = None
+        self._ledger_saved_at = 0.0
+        
+        # Worker threads update the counters above (and the ledger) through
+        # count() and record_conversion()
+        self._lock = threading.Lock()
+        
+    def count(self, counter, files=1, input_bytes=0):
+        """Add to a file counter (and the processed bytes) from any thread"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + files)
+            self.bytes_processed += input_bytes
         
     def check_ffmpeg(self):
         """Check if ffmpeg is installed"""
@@ -49,98 +191,298 @@ class VideoConverter:
         except FileNotFoundError:
             return False
     
+    def run_ffmpeg(self, cmd):
+        """Run an ffmpeg command, returning (success, stderr)"""
+        if ffmpeg_jobs is not None:
+            result = ffmpeg_jobs.run_ffmpeg(cmd)
+            return result.ok, result.stderr
+        
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        return result.returncode == 0, result.stderr
+    
     def get_h264_files(self):
         """Get all .h264 files in input directory"""
         files = sorted(self.input_dir.glob("*.h264"))
         return files
     
     def get_output_filename(self, input_file):
-        """Generate output MP4 filename"""
+        """
+        Generate output MP4 filename. The name only depends on the
+        recording, so converting it again gives the same name. Recorder
+        names already carry the recording time; with add_timestamp, other
+        names get a content fingerprint so different recordings that share
+        a name never overwrite each other.
+        """
         stem = input_file.stem
         
-        if ADD_TIMESTAMP:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_name = f"{stem}_{timestamp}.mp4"
+        if self.add_timestamp and not RECORDED_TIME.search(stem):
+            output_name = f"{stem}_{self.fingerprint(input_file)}.mp4"
         else:
             output_name = f"{stem}.mp4"
         
         return self.output_dir / output_name
     
-    def convert_file(self, input_file, output_file):
-        """Convert single .h264 file to MP4"""
+    def fingerprint(self, input_file):
+        """Short hash of a file's contents"""
+        digest = hashlib.blake2b(digest_size=6)
+        with open(input_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def load_ledger(self):
+        """Load the conversion ledger ({} sections if there is none yet)"""
+        try:
+            with open(self.output_dir / LEDGER_FILE, encoding='utf-8') as f:
+                self.ledger = json.load(f)
+        except (OSError, ValueError):
+            self.ledger = {}
+        self.ledger.setdefault("files", {})
+        self.ledger.setdefault("merges", {})
+        self._ledger_saved_at = time.monotonic()
+        return self.ledger
+    
+    def save_ledger(self, force=False):
+        """Write the ledger, at most every LEDGER_SAVE_INTERVAL seconds unless forced"""
+        with self._lock:
+            if self.ledger is None:
+                return
+            if not force and time.monotonic() - self._ledger_saved_at < LEDGER_SAVE_INTERVAL:
+                return
+            ledger_file = self.output_dir / LEDGER_FILE
+            partial_file = ledger_file.with_name(ledger_file.name + '.partial')
+            with open(partial_file, 'w', encoding='utf-8') as f:
+                json.dump(self.ledger, f, indent=2)
+            os.replace(partial_file, ledger_file)
+            self._ledger_saved_at = time.monotonic()
+    
+    def record_conversion(self, input_file, stat, output_file):
+        """Note in the ledger that input_file (as it was at stat) is converted"""
+        with self._lock:
+            self.ledger["files"][input_file.name] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "output": output_file.name,
+            }
+    
+    def converted_output(self, input_file, stat):
+        """The ledger's output for an unchanged, already converted recording, or None"""
+        with self._lock:
+            entry = self.ledger["files"].get(input_file.name)
+        if entry is None or (entry["size"], entry["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        output_file = self.output_dir / entry["output"]
+        return output_file if output_file.exists() else None
+    
+    def inspect_input(self, input_file):
+        """
+        Index a recording before it goes to ffmpeg. Returns (index, ffmpeg
+        input, error): the input is the file itself, or only its complete
+        GOPs if the tail is damaged; error is set if the file is unusable.
+        index is None when validation is off.
+        """
+        if not self.validate_inputs:
+            return None, str(input_file), None
+        try:
+            index = h264_index.index_file(input_file)
+        except OSError as e:
+            return None, None, str(e)
+        if index.problem:
+            return index, None, index.problem
+        if index.good_end < index.size:
+            return index, h264_index.trimmed_url(input_file.absolute(), index.good_end), None
+        return index, str(input_file), None
+    
+    def describe_trim(self, index):
+        """Progress note for a recording whose damaged tail is left out"""
+        kept = h264_index.usable_frames(index)
+        return (f"Damaged tail trimmed ({index.damage}): "
+                f"kept {kept} of {index.frames} frames, dropped {(index.size - index.good_end) / 1024:.0f} KB")
+    
+    def convert_file(self, input_file, output_file, source=None):
+        """Convert single .h264 file to MP4 (source: ffmpeg input to use instead of the file)"""
         try:
             # Use ffmpeg to copy video stream into MP4 container (no re-encoding)
             cmd = [
                 'ffmpeg',
-                '-i', str(input_file),
+                '-i', source or str(input_file),
                 '-c', 'copy',           # Copy codec (no re-encoding)
-                '-movflags', '+faststart',  # Optimize for web playback
+                *OUTPUT_MODES[self.output_mode],  # MP4 layout (faststart/fragmented)
                 '-y',                   # Overwrite output file
                 str(output_file)
             ]
             
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            success, stderr = self.run_ffmpeg(cmd)
             
-            if result.returncode == 0:
+            if success:
                 return True, None
             else:
-                return False, result.stderr
+                return False, stderr
                 
         except Exception as e:
             return False, str(e)
     
-    def merge_files(self, input_files, output_file):
-        """Merge multiple .h264 files into one MP4"""
+    def merge_files(self, input_files, output_file, output_mode=None):
+        """
+        Merge multiple .h264 files into one MP4. Unusable recordings are
+        left out and damaged tails trimmed, so one bad file doesn't fail
+        the whole merge. Returns (success, error, the input files merged).
+        """
+        used = []
         try:
+            sources = []
+            trimmed = False
+            for file in input_files:
+                index, source, error = self.inspect_input(file)
+                if error:
+                    print(f"   ⚠️  Leaving out {file.name}: {error}")
+                    continue
+                used.append(file)
+                if index is not None and index.damage:
+                    print(f"   ⚠️  {file.name}: {self.describe_trim(index)}")
+                    sources.append(source)
+                    trimmed = True
+                else:
+                    sources.append(str(file.absolute()))
+            if not sources:
+                return False, NO_USABLE_RECORDINGS, used
+            
             # Create temporary concat file
             concat_file = self.output_dir / "concat_list.txt"
             
             with open(concat_file, 'w') as f:
-                for file in input_files:
+                for source in sources:
                     # Use absolute paths and escape special characters
-                    f.write(f"file '{file.absolute()}'\n")
+                    f.write(f"file '{source}'\n")
+            
+            # Trimmed recordings are read through ffmpeg's subfile protocol
+            whitelist = ['-protocol_whitelist', h264_index.PROTOCOL_WHITELIST] if trimmed else []
             
             # Merge using concat demuxer
             cmd = [
                 'ffmpeg',
                 '-f', 'concat',
                 '-safe', '0',
+                *whitelist,
                 '-i', str(concat_file),
                 '-c', 'copy',
-                '-movflags', '+faststart',
+                *OUTPUT_MODES[output_mode or self.output_mode],
                 '-y',
                 str(output_file)
             ]
             
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            success, stderr = self.run_ffmpeg(cmd)
             
             # Clean up concat file
             concat_file.unlink()
             
-            if result.returncode == 0:
-                return True, None
+            if success:
+                return True, None, used
             else:
-                return False, result.stderr
+                return False, stderr, used
                 
         except Exception as e:
-            return False, str(e)
+            return False, str(e), used
+    
+    def merged_entry(self, files, used):
+        """
+        Merge state entry for a merge of files: the recordings it contains,
+        and the sizes of those left out as unusable
+        """
+        merged = {f.name for f in used}
+        return {
+            "sources": sorted(merged),
+            "left_out": {f.name: f.stat().st_size for f in files if f.name not in merged},
+        }
+    
+    def unmerged_files(self, entry, files):
+        """
+        Files a merge state entry doesn't account for: not merged, and not
+        left out at their current size (a recording that was still being
+        written when it was left out is tried again once it has grown)
+        """
+        merged = set(entry["sources"])
+        left_out = entry.get("left_out", {})
+        return [f for f in files if f.name not in merged and left_out.get(f.name) != f.stat().st_size]
     
     def get_file_size(self, file_path):
         """Get file size in MB"""
         return file_path.stat().st_size / (1024 * 1024)
     
+    def convert_one(self, i, input_file):
+        """
+        Convert one file for convert_all_individual. Runs on a worker
+        thread, so the progress lines are returned instead of printed.
+        """
+        stat = input_file.stat()
+        
+        # Skip recordings the ledger has as converted, without reading them
+        done = self.converted_output(input_file, stat)
+        if done is not None:
+            self.count('skipped_files')
+            return [f"[{i}/{self.total_files}] ⏭️  Skipped: {input_file.name} (already converted to {done.name})"]
+        
+        output_file = self.get_output_filename(input_file)
+        
+        # An output the ledger doesn't know about was converted before the
+        # ledger existed; one it knows about is from an older version of
+        # this recording and gets replaced
+        if output_file.exists() and input_file.name not in self.ledger["files"]:
+            self.record_conversion(input_file, stat, output_file)
+            self.count('skipped_files')
+            return [f"[{i}/{self.total_files}] ⏭️  Skipped: {input_file.name} (already exists)"]
+        
+        lines = [f"[{i}/{self.total_files}] 🔄 Converting: {input_file.name}"]
+        
+        index, source, error = self.inspect_input(input_file)
+        if error:
+            lines.append(f"            ❌ Unusable: {error}")
+            lines.append("")
+            self.count('failed_files')
+            return lines
+        if index is not None and index.damage:
+            lines.append(f"            ⚠️  {self.describe_trim(index)}")
+        
+        input_bytes = stat.st_size
+        input_size = input_bytes / (1024 * 1024)
+        
+        # Written under a temporary name, so an interrupted conversion never
+        # leaves a file that looks finished
+        partial_file = output_file.with_name(f".{output_file.stem}.partial.mp4")
+        success, error = self.convert_file(input_file, partial_file, source)
+        if success:
+            os.replace(partial_file, output_file)
+            self.record_conversion(input_file, stat, output_file)
+        elif partial_file.exists():
+            partial_file.unlink()
+        
+        if success:
+            output_size = self.get_file_size(output_file)
+            lines.append(f"            ✅ Success: {output_file.name}")
+            lines.append(f"            📊 Size: {input_size:.1f} MB → {output_size:.1f} MB")
+            if index is not None:
+                lines.append(f"            🎞️  {h264_index.describe(index)}")
+            
+            self.count('converted_files', input_bytes=input_bytes)
+            
+            # Delete original if configured
+            if self.delete_originals:
+                input_file.unlink()
+                lines.append(f"            🗑️  Deleted: {input_file.name}")
+        else:
+            lines.append(f"            ❌ Failed: {error}")
+            self.count('failed_files')
+        
+        lines.append("")
+        return lines
+    
     def convert_all_individual(self):
-        """Convert each .h264 file to individual MP4"""
+        """Convert each .h264 file to individual MP4, self.workers at a time"""
         print(f"\n{'='*60}")
         print("🎬 INDIVIDUAL CONVERSION MODE")
         print(f"{'='*60}")
@@ -155,39 +497,22 @@ class VideoConverter:
             print("❌ No .h264 files found!")
             return
         
-        print(f"Found {self.total_files} file(s) to convert\n")
+        workers = min(self.workers, self.total_files)
+        print(f"Found {self.total_files} file(s) to convert ({workers} at a time)\n")
         
-        for i, input_file in enumerate(files, 1):
-            output_file = self.get_output_filename(input_file)
-            
-            # Skip if output already exists
-            if output_file.exists() and not ADD_TIMESTAMP:
-                print(f"[{i}/{self.total_files}] ⏭️  Skipped: {input_file.name} (already exists)")
-                self.skipped_files += 1
-                continue
-            
-            print(f"[{i}/{self.total_files}] 🔄 Converting: {input_file.name}")
-            
-            input_size = self.get_file_size(input_file)
-            
-            success, error = self.convert_file(input_file, output_file)
-            
-            if success:
-                output_size = self.get_file_size(output_file)
-                print(f"            ✅ Success: {output_file.name}")
-                print(f"            📊 Size: {input_size:.1f} MB → {output_size:.1f} MB")
-                
-                self.converted_files += 1
-                
-                # Delete original if configured
-                if DELETE_ORIGINALS:
-                    input_file.unlink()
-                    print(f"            🗑️  Deleted: {input_file.name}")
-            else:
-                print(f"            ❌ Failed: {error}")
-                self.failed_files += 1
-            
-            print()
+        self.started_at = time.perf_counter()
+        # Remuxing (-c copy) is I/O-bound, so threads each driving one ffmpeg
+        # process are enough. map() returns results in input order, which
+        # keeps each file's lines together and the log ordered.
+        self.load_ledger()
+        cancel_guard = ffmpeg_jobs.cancel_on_interrupt() if ffmpeg_jobs is not None else nullcontext()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool, cancel_guard:
+                for lines in pool.map(self.convert_one, range(1, self.total_files + 1), files):
+                    print("\n".join(lines))
+                    self.save_ledger()
+        finally:
+            self.save_ledger(force=True)
         
         self.show_summary()
     
@@ -223,27 +548,67 @@ class VideoConverter:
         
         print(f"\nTotal size: {total_size:.1f} MB\n")
         
-        # Generate output filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = self.output_dir / f"merged_{timestamp}.mp4"
+        # Named after the recordings, so merging the same set again is skipped
+        output_file = self.get_merge_filename(files)
+        ledger = self.load_ledger()
+        entry = ledger["merges"].get(output_file.name)
+        names = {f.name for f in files}
+        
+        if output_file.exists() and (
+            entry is None or (set(entry["sources"]) <= names and not self.unmerged_files(entry, files))
+        ):
+            if entry is None:
+                ledger["merges"][output_file.name] = {"sources": sorted(names)}
+                self.save_ledger(force=True)
+            print(f"⏭️  Skipped: {output_file.name} already contains these recordings")
+            return
         
         print(f"🔄 Merging into: {output_file.name}\n")
         
-        success, error = self.merge_files(files, output_file)
+        partial_file = output_file.with_name(f".{output_file.stem}.partial.mp4")
+        success, error, used = self.merge_files(files, partial_file)
         
         if success:
+            os.replace(partial_file, output_file)
+            ledger["merges"][output_file.name] = self.merged_entry(files, used)
+            self.save_ledger(force=True)
             output_size = self.get_file_size(output_file)
             print(f"✅ Merge successful!")
             print(f"📊 Output: {output_file.name} ({output_size:.1f} MB)")
             
-            if DELETE_ORIGINALS:
-                print(f"\n🗑️  Deleting {len(files)} original files...")
-                for f in files:
+            # Recordings left out as unusable are kept for inspection
+            if self.delete_originals:
+                print(f"\n🗑️  Deleting {len(used)} original files...")
+                for f in used:
                     f.unlink()
                 print("✅ Original files deleted")
         else:
+            if partial_file.exists():
+                partial_file.unlink()
             print(f"❌ Merge failed: {error}")
     
+    def get_merge_filename(self, files):
+        """
+        merged_<first>-<last>.mp4 from the recording times of the first and
+        last file, or merged_<fingerprint>.mp4 of the file names and sizes
+        if the names carry no recording time
+        """
+        first = RECORDED_TIME.search(files[0].stem)
+        last = RECORDED_TIME.search(files[-1].stem)
+        if first and last:
+            return self.output_dir / f"merged_{first.group()}-{last.group()}.mp4"
+        digest = hashlib.blake2b(digest_size=6)
+        for f in files:
+            digest.update(f"{f.name}:{f.stat().st_size}\n".encode('utf-8'))
+        return self.output_dir / f"merged_{digest.hexdigest()}.mp4"
+    
+    def daily_merge_mode(self):
+        """
+        MP4 layout for merged_YYYYMMDD.mp4. Appending needs a fragmented
+        file, so incremental merging overrides the output mode.
+        """
+        return "fragmented" if self.incremental_merge else self.output_mode
+    
     def merge_by_date(self):
         """Merge files grouped by date"""
         print(f"\n{'='*60}")
@@ -272,6 +637,13 @@ class VideoConverter:
                 print(f"⚠️  Skipping invalid filename: {f.name}")
         
         print(f"Found {len(date_groups)} date(s) with recordings:\n")
+        if self.daily_merge_mode() != self.output_mode:
+            print(f"ℹ️  Daily merges are written fragmented, not {self.output_mode}, "
+                  f"so new recordings can be appended to them\n")
+        
+        self.total_files = len(files)
+        self.started_at = time.perf_counter()
+        merge_state = self.load_merge_state()
         
         for date_str, group_files in sorted(date_groups.items()):
             print(f"📅 Date: {date_str} ({len(group_files)} file(s))")
@@ -281,36 +653,303 @@ class VideoConverter:
             
             # Output filename
             output_file = self.output_dir / f"merged_{date_str}.mp4"
+            entry = merge_state.get(output_file.name)
+            
+            if output_file.exists() and entry is not None and self.incremental_merge:
+                self.update_daily_merge(group_files, output_file, entry, merge_state)
+                print()
+                continue
             
             if output_file.exists():
-                print(f"   ⏭️  Skipped: {output_file.name} already exists")
-                self.skipped_files += len(group_files)
+                note = "" if entry is not None else " (not tracked; delete it to re-merge)"
+                print(f"   ⏭️  Skipped: {output_file.name} already exists{note}")
+                self.count('skipped_files', len(group_files))
                 print()
                 continue
             
             print(f"   🔄 Merging into: {output_file.name}")
             
-            success, error = self.merge_files(group_files, output_file)
+            input_bytes = sum(f.stat().st_size for f in group_files)
+            success, error, used = self.merge_files(group_files, output_file, self.daily_merge_mode())
             
             if success:
                 output_size = self.get_file_size(output_file)
                 print(f"   ✅ Success: {output_size:.1f} MB")
-                self.converted_files += len(group_files)
+                self.count('converted_files', len(used), sum(f.stat().st_size for f in used))
+                self.count('failed_files', len(group_files) - len(used))
+                
+                merge_state[output_file.name] = {
+                    **self.merged_entry(group_files, used),
+                    "size": output_file.stat().st_size,
+                }
+                self.save_merge_state(merge_state)
                 
-                if DELETE_ORIGINALS:
-                    for f in group_files:
+                if self.delete_originals:
+                    for f in used:
                         f.unlink()
-                    print(f"   🗑️  Deleted {len(group_files)} original file(s)")
+                    print(f"   🗑️  Deleted {len(used)} original file(s)")
             else:
                 print(f"   ❌ Failed: {error}")
-                self.failed_files += len(group_files)
+                self.count('failed_files', len(group_files))
             
             print()
         
         self.show_summary()
     
+    def settled_files(self, pending, exclude, settle, scan):
+        """
+        Names of .h264 files whose size and mtime haven't changed for
+        settle seconds. pending maps name -> (size, mtime_ns, unchanged
+        since) between calls. With scan, the directory is listed to find new
+        files; otherwise only the pending files are checked.
+        """
+        now = time.monotonic()
+        if scan:
+            with os.scandir(self.input_dir) as entries:
+                names = {e.name for e in entries if e.name.endswith('.h264') and e.is_file()}
+            for name in set(pending) - names:
+                del pending[name]
+        else:
+            names = set(pending)
+        
+        ready = []
+        for name in sorted(names - exclude):
+            try:
+                st = (self.input_dir / name).stat()
+            except FileNotFoundError:
+                pending.pop(name, None)
+                continue
+            key = (st.st_size, st.st_mtime_ns)
+            previous = pending.get(name)
+            if previous is None or previous[:2] != key:
+                pending[name] = (*key, now)
+                continue
+            # An empty file is one the recorder has only just created
+            if st.st_size and now - previous[2] >= settle:
+                del pending[name]
+                ready.append(name)
+        return ready
+    
+    def watch(self, settle=SETTLE_SECONDS, poll_interval=POLL_INTERVAL):
+        """
+        Convert recordings individually as they are finished, until Ctrl-C.
+        With inotify, a file is ready as soon as the recorder closes it.
+        Without it (and for files already there at startup, files that got
+        no close event within settle seconds of their last change, and
+        after the event queue overflowed), a file is ready once it has been
+        unchanged for settle seconds.
+        """
+        print(f"\n{'='*60}")
+        print("👀 WATCH MODE")
+        print(f"{'='*60}")
+        print(f"Input:  {self.input_dir}")
+        print(f"Output: {self.output_dir}")
+        print(f"{'='*60}\n")
+        
+        try:
+            watcher = InotifyWatcher(self.input_dir)
+            print("Using inotify: recordings are converted as soon as they are closed")
+        except OSError as e:
+            watcher = None
+            print(f"inotify unavailable ({e})")
+            print(f"Polling every {poll_interval:g}s: recordings are converted after {settle:g}s without changes")
+        print("Press Ctrl-C to stop\n")
+        
+        pending = {}    # name -> (size, mtime_ns, unchanged since), for the settle check
+        writing = {}     # name -> time of inotify's last write event; ready when closed
+        queued = set()   # names handed to the pool this session
+        running = []
+        self.started_at = time.perf_counter()
+        self.load_ledger()
+        
+        cancel_guard = ffmpeg_jobs.cancel_on_interrupt() if ffmpeg_jobs is not None else nullcontext()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool, cancel_guard:
+                rescan = True
+                while True:
+                    ready = []
+                    if watcher is not None:
+                        for mask, name in watcher.read(poll_interval):
+                            if mask & InotifyWatcher.IN_Q_OVERFLOW:
+                                print("⚠️  inotify dropped events; rescanning the input folder")
+                                rescan = True
+                            if not name.endswith('.h264') or name in queued:
+                                continue
+                            pending.pop(name, None)
+                            if mask & (InotifyWatcher.IN_CLOSE_WRITE | InotifyWatcher.IN_MOVED_TO):
+                                writing.pop(name, None)
+                                ready.append(name)
+                            else:
+                                writing[name] = time.monotonic()
+                        
+                        # No close event (e.g. a recorder that was killed, or
+                        # one lost in an overflow): fall back to the settle
+                        # check, counting from the last write event
+                        now = time.monotonic()
+                        for name, last_event in list(writing.items()):
+                            if now - last_event < settle:
+                                continue
+                            del writing[name]
+                            try:
+                                st = (self.input_dir / name).stat()
+                            except FileNotFoundError:
+                                continue
+                            pending[name] = (st.st_size, st.st_mtime_ns, last_event)
+                    elif not rescan:
+                        time.sleep(poll_interval)
+                    
+                    # Every poll without inotify; with it, only the initial
+                    # listing and rescans after an overflow need a scan
+                    ready += self.settled_files(
+                        pending, queued | set(writing) | set(ready), settle,
+                        scan=watcher is None or rescan,
+                    )
+                    rescan = False
+                    
+                    for name in ready:
+                        if name in queued:
+                            continue
+                        queued.add(name)
+                        self.total_files += 1
+                        print(f"🕒 Queued: {name}")
+                        running.append(pool.submit(self.convert_one, self.total_files, self.input_dir / name))
+                    
+                    for future in [f for f in running if f.done()]:
+                        running.remove(future)
+                        print("\n".join(future.result()))
+                    self.save_ledger()
+        finally:
+            if watcher is not None:
+                watcher.close()
+            self.save_ledger(force=True)
+            self.show_summary()
+    
+    def load_merge_state(self):
+        """Which recordings each daily merge contains ({} if none yet)"""
+        try:
+            with open(self.output_dir / MERGE_STATE_FILE, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_merge_state(self, state):
+        state_file = self.output_dir / MERGE_STATE_FILE
+        partial_file = state_file.with_name(state_file.name + '.partial')
+        with open(partial_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(partial_file, state_file)
+    
+    def append_files(self, input_files, output_file, entry, state):
+        """
+        Append recordings to a fragmented MP4: only the new files are
+        remuxed, and their fragments are added to the end of output_file.
+        The append start is saved in the merge state first, so an
+        interrupted append can be rolled back on the next run. Returns
+        (success, error, the input files appended).
+        """
+        delta_file = self.output_dir / f".{output_file.stem}.append.mp4"
+        try:
+            success, error, used = self.merge_files(input_files, delta_file, output_mode="fragmented")
+            if not success:
+                return False, error, used
+            
+            info = fmp4.scan_fragments(output_file)
+            entry["appending_from"] = info.data_end
+            self.save_merge_state(state)
+            fmp4.append_fragments(output_file, delta_file, info)
+            return True, None, used
+        except (OSError, ValueError) as e:
+            return False, str(e), []
+        finally:
+            if delta_file.exists():
+                delta_file.unlink()
+    
+    def update_daily_merge(self, group_files, output_file, entry, state):
+        """Add a day's new recordings to its existing merged MP4"""
+        # Roll back an append that was interrupted before it was recorded
+        rollback_to = entry.pop("appending_from", None)
+        if rollback_to is not None and output_file.stat().st_size != entry["size"]:
+            os.truncate(output_file, rollback_to)
+            entry["size"] = rollback_to
+            self.save_merge_state(state)
+            print(f"   ⚠️  Rolled back an interrupted append to {output_file.name}")
+        
+        if output_file.stat().st_size != entry["size"]:
+            print(f"   ⏭️  Skipped: {output_file.name} was modified after merging (delete it to re-merge)")
+            self.count('skipped_files', len(group_files))
+            return
+        
+        merged = set(entry["sources"])
+        new_files = self.unmerged_files(entry, group_files)
+        if not new_files:
+            print(f"   ⏭️  Skipped: {output_file.name} is up to date")
+            self.count('skipped_files', len(group_files))
+            return
+        
+        # Appending keeps the cost proportional to the new footage. Recordings
+        # that sort before already merged ones (late arrivals) would end up
+        # out of order, so those days are re-merged instead, if all of their
+        # recordings are still there.
+        can_remerge = merged <= {f.name for f in group_files}
+        if min(f.name for f in new_files) < max(merged):
+            success, error, used = False, "new recordings are older than merged ones", []
+        else:
+            print(f"   ➕ Appending {len(new_files)} new file(s) to: {output_file.name}")
+            success, error, used = self.append_files(new_files, output_file, entry, state)
+            if error == NO_USABLE_RECORDINGS:
+                # Nothing to add; they are tried again once they change
+                entry.setdefault("left_out", {}).update(self.merged_entry(new_files, used)["left_out"])
+                self.save_merge_state(state)
+                print(f"   ⏭️  Skipped: no usable new recordings for {output_file.name}")
+                self.count('failed_files', len(new_files))
+                self.count('skipped_files', len(group_files) - len(new_files))
+                return
+            if success:
+                update = self.merged_entry(new_files, used)
+                update["sources"] = sorted(merged | set(update["sources"]))
+                # Recordings left out earlier and unchanged since stay left out
+                update["left_out"] = {**entry.get("left_out", {}), **update["left_out"]}
+                for name in update["sources"]:
+                    update["left_out"].pop(name, None)
+        
+        if not success and can_remerge:
+            print(f"   ⚠️  Cannot append ({error})")
+            print(f"   🔄 Re-merging all {len(group_files)} file(s) into: {output_file.name}")
+            partial_file = output_file.with_name(f".{output_file.stem}.partial.mp4")
+            success, error, used = self.merge_files(group_files, partial_file, self.daily_merge_mode())
+            if success:
+                os.replace(partial_file, output_file)
+                update = self.merged_entry(group_files, used)
+            elif partial_file.exists():
+                partial_file.unlink()
+        
+        if success:
+            # Only recordings that went into the file count as merged; the
+            # ones left out stay in place and are not deleted
+            added = [f for f in used if f.name not in merged]
+            left_out = [f for f in new_files if f.name in update["left_out"]]
+            entry.pop("appending_from", None)
+            entry.update(update, size=output_file.stat().st_size)
+            self.save_merge_state(state)
+            print(f"   ✅ Success: {self.get_file_size(output_file):.1f} MB")
+            self.count('converted_files', len(added), sum(f.stat().st_size for f in added))
+            self.count('failed_files', len(left_out))
+            self.count('skipped_files', len(group_files) - len(added) - len(left_out))
+            
+            if self.delete_originals:
+                for f in added:
+                    f.unlink()
+                print(f"   🗑️  Deleted {len(added)} original file(s)")
+        else:
+            # Keeps any append start, so a partial append is rolled back next run
+            self.save_merge_state(state)
+            print(f"   ❌ Failed: {error}")
+            self.count('failed_files', len(new_files))
+    
     def show_summary(self):
         """Show conversion summary"""
+        elapsed = time.perf_counter() - self.started_at
+        processed_mb = self.bytes_processed / (1024 * 1024)
         print(f"{'='*60}")
         print("📊 CONVERSION SUMMARY")
         print(f"{'='*60}")
@@ -318,6 +957,8 @@ class VideoConverter:
         print(f"Converted:       {self.converted_files} ✅")
         print(f"Skipped:         {self.skipped_files} ⏭️")
         print(f"Failed:          {self.failed_files} ❌")
+        print(f"Processed:       {processed_mb:.1f} MB in {elapsed:.1f}s", end="")
+        print(f" ({processed_mb / elapsed:.1f} MB/s)" if elapsed > 0 and processed_mb else "")
         print(f"{'='*60}\n")
 
 def show_menu():
@@ -332,13 +973,78 @@ def show_menu():
     print("  4. Exit")
     print(f"\n{'='*60}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Convert .h264 recordings to MP4 (interactive menu when no --mode or --watch is given)"
+    )
+    parser.add_argument("--mode", choices=MODES, help="Conversion mode; skips the interactive menu")
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Keep running and convert each recording individually as soon as it is finished",
+    )
+    parser.add_argument("--input", default=INPUT_DIR, help=f"Directory with .h264 files (default: {INPUT_DIR})")
+    parser.add_argument("--output", default=OUTPUT_DIR, help=f"Directory for MP4 files (default: {OUTPUT_DIR})")
+    parser.add_argument(
+        "--workers", "-j", type=int, default=WORKERS,
+        help=f"Concurrent remuxes in individual and watch mode (default: {WORKERS})",
+    )
+    parser.add_argument(
+        "--output-mode", choices=sorted(OUTPUT_MODES), default=OUTPUT_MODE,
+        help=f"MP4 layout (default: {OUTPUT_MODE})",
+    )
+    parser.add_argument("--delete-originals", dest="delete_originals", action="store_true",
+                        help="Delete .h264 files after successful conversion")
+    parser.add_argument("--keep-originals", dest="delete_originals", action="store_false",
+                        help="Keep .h264 files after conversion")
+    parser.add_argument("--timestamp", dest="add_timestamp", action="store_true",
+                        help="Keep recording times in output names (content fingerprint if a name has none)")
+    parser.add_argument("--no-timestamp", dest="add_timestamp", action="store_false",
+                        help="Name outputs after the recording's file name only")
+    parser.add_argument("--incremental-merge", dest="incremental_merge", action="store_true",
+                        help="Append new recordings to existing daily merges")
+    parser.add_argument("--no-incremental-merge", dest="incremental_merge", action="store_false",
+                        help="Skip days whose merged file already exists")
+    parser.add_argument("--validate", dest="validate_inputs", action="store_true",
+                        help="Index recordings before converting; skip unusable ones, trim damaged tails")
+    parser.add_argument("--no-validate", dest="validate_inputs", action="store_false",
+                        help="Hand recordings to ffmpeg unchecked")
+    parser.add_argument(
+        "--settle", type=float, default=SETTLE_SECONDS,
+        help=f"Watch mode without inotify: seconds a file must stay unchanged (default: {SETTLE_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=POLL_INTERVAL,
+        help=f"Watch mode: seconds between checks (default: {POLL_INTERVAL:g})",
+    )
+    parser.set_defaults(
+        delete_originals=DELETE_ORIGINALS,
+        add_timestamp=ADD_TIMESTAMP,
+        incremental_merge=INCREMENTAL_MERGE,
+        validate_inputs=VALIDATE_INPUTS,
+    )
+    args = parser.parse_args()
+    if args.watch and args.mode:
+        parser.error("--watch converts individually; don't combine it with --mode")
+    return args
+
 def main():
+    args = parse_args()
+    
     print("=" * 60)
     print("H.264 to MP4 Bulk Converter")
     print("=" * 60)
     
     # Create converter
-    converter = VideoConverter()
+    converter = VideoConverter(
+        workers=args.workers,
+        output_mode=args.output_mode,
+        input_dir=args.input,
+        output_dir=args.output,
+        delete_originals=args.delete_originals,
+        add_timestamp=args.add_timestamp,
+        incremental_merge=args.incremental_merge,
+        validate_inputs=args.validate_inputs,
+    )
     
     # Check ffmpeg
     print("\n🔍 Checking dependencies...")
@@ -353,34 +1059,49 @@ def main():
     
     # Check input directory
     if not converter.input_dir.exists():
-        print(f"\n❌ Input directory not found: {INPUT_DIR}")
+        print(f"\n❌ Input directory not found: {converter.input_dir}")
         print("Creating directory...")
         converter.input_dir.mkdir(parents=True, exist_ok=True)
         print("✅ Directory created (but it's empty)")
-        return 1
+        if not args.watch:
+            return 1
+    
+    if args.watch:
+        try:
+            converter.watch(settle=args.settle, poll_interval=args.poll_interval)
+        except KeyboardInterrupt:
+            print("\n⏹️  Watch stopped")
+        return 0
     
     # Check for files
     files = converter.get_h264_files()
-    print(f"📁 Found {len(files)} .h264 file(s) in: {INPUT_DIR}")
+    print(f"📁 Found {len(files)} .h264 file(s) in: {converter.input_dir}")
     
     if len(files) == 0:
         print("\n⚠️  No .h264 files to convert!")
         return 0
     
-    # Show menu
+    actions = {
+        'individual': converter.convert_all_individual,
+        'merge-all': converter.merge_all,
+        'merge-by-date': converter.merge_by_date,
+    }
+    if args.mode:
+        actions[args.mode]()
+        return 0
+    
+    # Show menu (answers can also be piped in, e.g. echo 3 | ...)
     while True:
         show_menu()
         
-        choice = input("Select mode (1-4): ").strip()
+        try:
+            choice = input("Select mode (1-4): ").strip()
+        except EOFError:
+            print("\n❌ No mode selected. Use --mode or --watch when running unattended.")
+            return 2
         
-        if choice == '1':
-            converter.convert_all_individual()
-            break
-        elif choice == '2':
-            converter.merge_all()
-            break
-        elif choice == '3':
-            converter.merge_by_date()
+        if choice in ('1', '2', '3'):
+            actions[MODES[int(choice) - 1]]()
             break
         elif choice == '4':
             print("\n👋 Goodbye!")
@@ -394,5 +1115,7 @@ if __name__ == '__main__':
     try:
         exit(main())
     except KeyboardInterrupt:
+        if ffmpeg_jobs is not None:
+            ffmpeg_jobs.cancel_all()
         print("\n\n⏹️  Conversion cancelled by user")
         exit(0)
\ No newline at end of file
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Fragmented MP4 helpers used to append new footage to a merged MP4.
+
+A fragmented MP4 (ffmpeg -movflags frag_keyframe+empty_moov) is an ftyp box
+and a sample-less moov box followed by self-contained moof+mdat fragments,
+optionally closed by an mfra index. New recordings can therefore be added
+to an existing file without rewriting it: remux only the new recordings to
+a fragmented MP4, then copy their fragments onto the end of the existing
+file, shifting each fragment's decode time (tfdt) and sequence number
+(mfhd) so the timeline continues where the file stopped.
+
+Both files must hold the same tracks with the same timescale and sample
+description (codec, resolution, SPS/PPS); otherwise ValueError is raised
+and nothing is written.
+"""
+
+import os
+import struct
+from collections import namedtuple
+
+COPY_CHUNK = 1024 * 1024
+
+# tfhd flags
+TFHD_BASE_DATA_OFFSET = 0x01
+TFHD_SAMPLE_DESCRIPTION_INDEX = 0x02
+TFHD_DEFAULT_SAMPLE_DURATION = 0x08
+TFHD_DEFAULT_SAMPLE_SIZE = 0x10
+TFHD_DEFAULT_SAMPLE_FLAGS = 0x20
+
+# trun flags
+TRUN_DATA_OFFSET = 0x01
+TRUN_FIRST_SAMPLE_FLAGS = 0x04
+TRUN_SAMPLE_DURATION = 0x100
+TRUN_SAMPLE_SIZE = 0x200
+TRUN_SAMPLE_FLAGS = 0x400
+TRUN_SAMPLE_CTO = 0x800
+
+# tracks: {track_id: Track}; end_times: {track_id: decode time after the
+# last sample}; data_end: offset just past the last fragment (where an mfra
+# index starts, if any); fragments: (offset, size) of each moof
+FragmentInfo = namedtuple(
+    "FragmentInfo", "tracks end_times next_sequence data_end fragments"
+)
+Track = namedtuple("Track", "timescale sample_description default_duration")
+
+
+def iter_boxes(data, start=0, end=None):
+    """Yield (type, offset, header_size, size) for the boxes in data[start:end]."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size or pos + size > end:
+            raise ValueError(f"Corrupt {box_type!r} box at offset {pos}")
+        yield box_type.decode("latin-1"), pos, header_size, size
+        pos += size
+
+
+def iter_file_boxes(f):
+    """Yield (type, offset, header_size, size) for the top-level boxes of an open file."""
+    file_size = os.fstat(f.fileno()).st_size
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, box_type = struct.unpack_from(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", header, 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size or pos + size > file_size:
+            raise ValueError(f"Truncated {box_type!r} box at offset {pos}")
+        yield box_type.decode("latin-1"), pos, header_size, size
+        pos += size
+
+
+def child(data, parent_offset, parent_header, parent_size, box_type):
+    """(offset, header_size, size) of the first box_type child, or None."""
+    for name, offset, header_size, size in iter_boxes(
+        data, parent_offset + parent_header, parent_offset + parent_size
+    ):
+        if name == box_type:
+            return offset, header_size, size
+    return None
+
+
+def parse_moov(moov):
+    """Tracks of a fragmented file's moov box (raises ValueError if it isn't fragmented)."""
+    trex_defaults = {}
+    traks = []
+    for name, offset, header_size, size in iter_boxes(moov, 8):
+        if name == "trak":
+            traks.append((offset, header_size, size))
+        elif name == "mvex":
+            for sub, sub_offset, sub_header, _ in iter_boxes(moov, offset + header_size, offset + size):
+                if sub == "trex":
+                    track_id, _, duration = struct.unpack_from(">III", moov, sub_offset + sub_header + 4)
+                    trex_defaults[track_id] = duration
+    if not trex_defaults:
+        raise ValueError("not a fragmented MP4 (no mvex box)")
+
+    tracks = {}
+    for trak in traks:
+        tkhd = child(moov, *trak, "tkhd")
+        mdia = child(moov, *trak, "mdia")
+        if tkhd is None or mdia is None:
+            raise ValueError("incomplete trak box")
+        version = moov[tkhd[0] + tkhd[1]]
+        track_id = struct.unpack_from(">I", moov, tkhd[0] + tkhd[1] + (20 if version == 1 else 12))[0]
+
+        mdhd = child(moov, *mdia, "mdhd")
+        minf = child(moov, *mdia, "minf")
+        stbl = child(moov, *minf, "stbl") if minf else None
+        stsd = child(moov, *stbl, "stsd") if stbl else None
+        if mdhd is None or stsd is None:
+            raise ValueError(f"incomplete track {track_id}")
+        version = moov[mdhd[0] + mdhd[1]]
+        timescale = struct.unpack_from(">I", moov, mdhd[0] + mdhd[1] + (20 if version == 1 else 12))[0]
+        tracks[track_id] = Track(
+            timescale, bytes(moov[stsd[0]:stsd[0] + stsd[2]]), trex_defaults.get(track_id, 0)
+        )
+    return tracks
+
+
+def parse_traf(moof, traf, tracks):
+    """
+    Return (track_id, tfdt value offset or None, tfdt version, base decode
+    time, total duration, base data offset field offset or None) for a traf box.
+    """
+    track_id = None
+    default_duration = 0
+    base_offset_at = None
+    tfdt_at = tfdt_version = None
+    base_time = 0
+    duration = 0
+    for name, offset, header_size, size in iter_boxes(moof, traf[0] + traf[1], traf[0] + traf[2]):
+        body = offset + header_size
+        if name == "tfhd":
+            flags = struct.unpack_from(">I", moof, body)[0] & 0xFFFFFF
+            track_id = struct.unpack_from(">I", moof, body + 4)[0]
+            if track_id not in tracks:
+                raise ValueError(f"fragment for unknown track {track_id}")
+            default_duration = tracks[track_id].default_duration
+            pos = body + 8
+            if flags & TFHD_BASE_DATA_OFFSET:
+                base_offset_at = pos
+                pos += 8
+            if flags & TFHD_SAMPLE_DESCRIPTION_INDEX:
+                pos += 4
+            if flags & TFHD_DEFAULT_SAMPLE_DURATION:
+                default_duration = struct.unpack_from(">I", moof, pos)[0]
+        elif name == "tfdt":
+            tfdt_version = moof[body]
+            tfdt_at = body + 4
+            base_time = struct.unpack_from(">Q" if tfdt_version == 1 else ">I", moof, tfdt_at)[0]
+        elif name == "trun":
+            flags = struct.unpack_from(">I", moof, body)[0] & 0xFFFFFF
+            count = struct.unpack_from(">I", moof, body + 4)[0]
+            if not flags & TRUN_SAMPLE_DURATION:
+                duration += count * default_duration
+                continue
+            pos = body + 8
+            pos += 4 if flags & TRUN_DATA_OFFSET else 0
+            pos += 4 if flags & TRUN_FIRST_SAMPLE_FLAGS else 0
+            # Per-sample record: duration first, then whichever optional fields follow
+            record = 4 * sum(
+                1 for bit in (TRUN_SAMPLE_DURATION, TRUN_SAMPLE_SIZE, TRUN_SAMPLE_FLAGS, TRUN_SAMPLE_CTO)
+                if flags & bit
+            )
+            duration += sum(
+                struct.unpack_from(">I", moof, pos + i * record)[0] for i in range(count)
+            )
+    if track_id is None:
+        raise ValueError("traf box without tfhd")
+    return track_id, tfdt_at, tfdt_version, base_time, duration, base_offset_at
+
+
+def scan_fragments(path):
+    """Read the moov and every moof of a fragmented MP4 (mdat payloads are skipped)."""
+    tracks = None
+    end_times = {}
+    next_sequence = 1
+    data_end = 0
+    fragments = []
+    with open(path, "rb") as f:
+        for name, offset, header_size, size in iter_file_boxes(f):
+            if name in ("ftyp", "free", "skip", "styp", "sidx"):
+                data_end = offset + size
+            elif name == "moov":
+                f.seek(offset)
+                tracks = parse_moov(f.read(size))
+                data_end = offset + size
+            elif name == "moof":
+                if tracks is None:
+                    raise ValueError("moof box before moov")
+                f.seek(offset)
+                moof = f.read(size)
+                for sub, sub_offset, sub_header, sub_size in iter_boxes(moof, 8):
+                    if sub == "mfhd":
+                        next_sequence = struct.unpack_from(">I", moof, sub_offset + sub_header + 4)[0] + 1
+                    elif sub == "traf":
+                        track_id, _, _, base_time, duration, _ = parse_traf(
+                            moof, (sub_offset, sub_header, sub_size), tracks
+                        )
+                        end_times[track_id] = max(end_times.get(track_id, 0), base_time + duration)
+                fragments.append((offset, size))
+                data_end = offset + size
+            elif name == "mdat":
+                data_end = offset + size
+            elif name == "mfra":
+                # Random access index for the existing fragments; dropped on append
+                break
+    if tracks is None:
+        raise ValueError("no moov box")
+    return FragmentInfo(tracks, end_times, next_sequence, data_end, fragments)
+
+
+def patch_moof(moof, tracks, time_shift, sequence, offset_shift):
+    """Shift a moof's decode times and base data offsets and set its sequence number, in place."""
+    for sub, sub_offset, sub_header, sub_size in iter_boxes(moof, 8):
+        if sub == "mfhd":
+            struct.pack_into(">I", moof, sub_offset + sub_header + 4, sequence)
+        elif sub == "traf":
+            track_id, tfdt_at, version, base_time, _, base_offset_at = parse_traf(
+                moof, (sub_offset, sub_header, sub_size), tracks
+            )
+            if tfdt_at is not None:
+                shifted = base_time + time_shift.get(track_id, 0)
+                if version != 1 and shifted >= 1 << 32:
+                    raise ValueError("decode time overflows a version 0 tfdt box")
+                struct.pack_into(">Q" if version == 1 else ">I", moof, tfdt_at, shifted)
+            if base_offset_at is not None:
+                value = struct.unpack_from(">Q", moof, base_offset_at)[0]
+                struct.pack_into(">Q", moof, base_offset_at, value + offset_shift)
+
+
+def append_fragments(target_path, delta_path, target_info=None):
+    """
+    Append the fragments of delta_path to target_path. Any mfra index at the
+    end of the target is dropped first. Returns the number of fragments
+    appended. target_info (from scan_fragments) avoids scanning the target
+    twice when the caller already has it.
+    """
+    target_info = target_info or scan_fragments(target_path)
+    delta_info = scan_fragments(delta_path)
+
+    if set(delta_info.tracks) != set(target_info.tracks):
+        raise ValueError("new recordings have different tracks")
+    for track_id, track in delta_info.tracks.items():
+        existing = target_info.tracks[track_id]
+        if track.timescale != existing.timescale:
+            raise ValueError(f"track {track_id} timescale changed ({existing.timescale} -> {track.timescale})")
+        if track.sample_description != existing.sample_description:
+            raise ValueError(f"track {track_id} codec settings changed (resolution or SPS/PPS)")
+
+    # Each track continues from its own end; a delta track's first decode
+    # time is normally 0, so this keeps the gaps between tracks unchanged
+    time_shift = {track_id: target_info.end_times.get(track_id, 0) for track_id in delta_info.tracks}
+
+    appended = 0
+    with open(delta_path, "rb") as src, open(target_path, "r+b") as dst:
+        dst.truncate(target_info.data_end)
+        dst.seek(target_info.data_end)
+        sequence = target_info.next_sequence
+        for name, offset, header_size, size in iter_file_boxes(src):
+            if name not in ("moof", "mdat"):
+                continue
+            src.seek(offset)
+            if name == "moof":
+                moof = bytearray(src.read(size))
+                patch_moof(moof, delta_info.tracks, time_shift, sequence, dst.tell() - offset)
+                dst.write(moof)
+                sequence += 1
+                appended += 1
+                continue
+            remaining = size
+            while remaining:
+                chunk = src.read(min(COPY_CHUNK, remaining))
+                if not chunk:
+                    raise ValueError("delta file ended inside an mdat box")
+                dst.write(chunk)
+                remaining -= len(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    return appended
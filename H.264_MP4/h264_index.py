@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+H.264 Annex-B indexer used to check recordings before they reach ffmpeg.
+
+A raw .h264 recording is a sequence of NAL units, each preceded by a
+00 00 01 (or 00 00 00 01) start code. The indexer memory-maps the file and
+jumps from start code to start code with bytes.find, reading only the one
+or two header bytes it needs from each NAL unit; only SPS units are parsed
+in full (for the resolution and, if the stream signals it, the frame
+rate). A typical recording is indexed in milliseconds.
+
+The index records the NAL unit counts, the frame count and the offset and
+frame number of every keyframe (IDR picture, or the picture after a
+recovery point SEI), which is enough for the duration and for seeking to
+the keyframe at or before a given time.
+
+Damage is found where the bytes stop looking like NAL units: a set
+forbidden bit or an unknown NAL type (typically garbage after a crash), a
+run of zero bytes (a zero-filled tail or block; emulation prevention keeps
+00 00 00 out of real NAL units), an unreadable SPS, a last NAL unit too
+short to be complete, or a last slice much larger than any slice before it
+(garbage appended without a start code ends up in the last slice). good_end
+is then the start of the GOP containing the damage, so everything before it
+is complete GOPs; trimmed_url() gives ffmpeg just that part. A cut in the
+middle of the last frame's slice data can't be told apart from a complete
+frame, so such a file is kept whole (decoders treat it as one damaged frame).
+"""
+
+import argparse
+import mmap
+import sys
+from collections import namedtuple
+
+START_CODE = b"\x00\x00\x01"
+ZERO_RUN = b"\x00\x00\x00"
+
+# NAL unit types
+NAL_SLICE = 1
+NAL_IDR = 5
+NAL_SEI = 6
+NAL_SPS = 7
+NAL_PPS = 8
+NAL_AUD = 9
+
+# Types that start a new access unit when they follow a picture's slices
+AU_PREFIX_TYPES = {NAL_SEI, NAL_SPS, NAL_PPS, NAL_AUD, 14, 15, 16, 17, 18}
+# Types ffmpeg knows; anything else in a camera stream is garbage
+KNOWN_TYPES = set(range(1, 22))
+
+SEI_RECOVERY_POINT = 6
+
+# Zero bytes allowed after a NAL unit (trailing_zero_8bits); a longer run,
+# or 00 00 00 inside a unit, is zero-filled damage
+MAX_TRAILING_ZEROS = 64
+# The last slice is garbage-extended if it is this many times larger than
+# the largest slice before it
+TAIL_SLICE_FACTOR = 2
+
+# ffmpeg's concat demuxer only opens file inputs unless told otherwise
+PROTOCOL_WHITELIST = "file,subfile"
+
+# Profiles whose SPS carries chroma format and bit depth fields
+HIGH_PROFILES = {100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135}
+
+# keyframes: [(byte offset of the access unit, frame number)]; nal_counts:
+# {nal type: count}; width/height/fps: from the first SPS (fps None unless
+# signalled); damage: description of the first damage or None; good_end:
+# where the complete GOPs end (size if undamaged); problem: why the file is
+# unusable, or None
+H264Index = namedtuple(
+    "H264Index", "size frames keyframes nal_counts width height fps damage good_end problem"
+)
+SequenceParameters = namedtuple("SequenceParameters", "width height fps")
+
+
+class BitReader:
+    """Big-endian bit reader with the exp-Golomb codes used by H.264 headers."""
+
+    def __init__(self, data):
+        self.value = int.from_bytes(data, "big")
+        self.length = len(data) * 8
+        self.pos = 0
+
+    def u(self, bits):
+        if self.pos + bits > self.length:
+            raise ValueError("header ends early")
+        self.pos += bits
+        return (self.value >> (self.length - self.pos)) & ((1 << bits) - 1)
+
+    def ue(self):
+        zeros = 0
+        while not self.u(1):
+            zeros += 1
+            if zeros > 31:
+                raise ValueError("invalid exp-Golomb code")
+        return (1 << zeros) - 1 + self.u(zeros)
+
+    def se(self):
+        value = self.ue()
+        return (value + 1) // 2 if value & 1 else -(value // 2)
+
+
+def unescape(payload):
+    """NAL payload to RBSP: drop the emulation prevention byte in each 00 00 03."""
+    return payload.replace(b"\x00\x00\x03", b"\x00\x00")
+
+
+def skip_scaling_list(bits, size):
+    last = next_scale = 8
+    for _ in range(size):
+        if next_scale:
+            next_scale = (last + bits.se() + 256) % 256
+        last = next_scale or last
+
+
+def parse_sps(rbsp):
+    """Resolution and signalled frame rate of an SPS RBSP (without the NAL header byte)."""
+    bits = BitReader(rbsp)
+    profile_idc = bits.u(8)
+    bits.u(16)  # constraint flags, level_idc
+    bits.ue()   # seq_parameter_set_id
+
+    chroma_format_idc = 1
+    separate_colour_plane = 0
+    if profile_idc in HIGH_PROFILES:
+        chroma_format_idc = bits.ue()
+        if chroma_format_idc == 3:
+            separate_colour_plane = bits.u(1)
+        bits.ue()  # bit_depth_luma_minus8
+        bits.ue()  # bit_depth_chroma_minus8
+        bits.u(1)  # qpprime_y_zero_transform_bypass_flag
+        if bits.u(1):  # seq_scaling_matrix_present_flag
+            for i in range(12 if chroma_format_idc == 3 else 8):
+                if bits.u(1):
+                    skip_scaling_list(bits, 16 if i < 6 else 64)
+
+    bits.ue()  # log2_max_frame_num_minus4
+    pic_order_cnt_type = bits.ue()
+    if pic_order_cnt_type == 0:
+        bits.ue()  # log2_max_pic_order_cnt_lsb_minus4
+    elif pic_order_cnt_type == 1:
+        bits.u(1)  # delta_pic_order_always_zero_flag
+        bits.se()  # offset_for_non_ref_pic
+        bits.se()  # offset_for_top_to_bottom_field
+        for _ in range(bits.ue()):
+            bits.se()
+    bits.ue()  # max_num_ref_frames
+    bits.u(1)  # gaps_in_frame_num_value_allowed_flag
+
+    width_mbs = bits.ue() + 1
+    height_map_units = bits.ue() + 1
+    frame_mbs_only = bits.u(1)
+    if not frame_mbs_only:
+        bits.u(1)  # mb_adaptive_frame_field_flag
+    bits.u(1)  # direct_8x8_inference_flag
+
+    width = width_mbs * 16
+    height = (2 - frame_mbs_only) * height_map_units * 16
+    if bits.u(1):  # frame_cropping_flag
+        left, right, top, bottom = bits.ue(), bits.ue(), bits.ue(), bits.ue()
+        if chroma_format_idc == 0 or separate_colour_plane:
+            crop_x, crop_y = 1, 2 - frame_mbs_only
+        else:
+            crop_x = 1 if chroma_format_idc == 3 else 2
+            crop_y = (2 if chroma_format_idc == 1 else 1) * (2 - frame_mbs_only)
+        width -= crop_x * (left + right)
+        height -= crop_y * (top + bottom)
+
+    fps = None
+    if bits.u(1):  # vui_parameters_present_flag
+        if bits.u(1):  # aspect_ratio_info_present_flag
+            if bits.u(8) == 255:  # Extended_SAR
+                bits.u(32)
+        if bits.u(1):  # overscan_info_present_flag
+            bits.u(1)
+        if bits.u(1):  # video_signal_type_present_flag
+            bits.u(4)
+            if bits.u(1):  # colour_description_present_flag
+                bits.u(24)
+        if bits.u(1):  # chroma_loc_info_present_flag
+            bits.ue()
+            bits.ue()
+        if bits.u(1):  # timing_info_present_flag
+            num_units_in_tick = bits.u(32)
+            time_scale = bits.u(32)
+            if num_units_in_tick:
+                fps = time_scale / (2 * num_units_in_tick)
+
+    return SequenceParameters(width, height, fps)
+
+
+def index_data(data):
+    """Index Annex-B data (bytes or an mmap)."""
+    size = len(data)
+    nal_counts = {}
+    keyframes = []
+    frames = 0
+    sps = None
+    seen_pps = False
+    damage = damage_at = None
+    au_start = None           # start of the access unit being collected
+    recovery_point = False    # the next picture is a keyframe
+    largest_slice = 0
+    zeros = -1                # next 00 00 00 at or after the current NAL unit
+
+    pos = data.find(START_CODE)
+    while pos != -1:
+        # Include the leading zero of a 4-byte start code
+        unit_start = pos - 1 if pos and data[pos - 1] == 0 else pos
+        nal = pos + 3
+        next_pos = data.find(START_CODE, nal)
+        end = size if next_pos == -1 else next_pos
+
+        if nal >= end:
+            damage, damage_at = "start code without a NAL unit", unit_start
+            break
+        header = data[nal]
+        nal_type = header & 0x1F
+        if header & 0x80 or nal_type not in KNOWN_TYPES:
+            damage, damage_at = f"invalid NAL header 0x{header:02x}", unit_start
+            break
+        if zeros < nal:
+            zeros = data.find(ZERO_RUN, nal)
+            if zeros == -1:
+                zeros = size
+        if zeros + len(ZERO_RUN) <= end and (
+            end - zeros > MAX_TRAILING_ZEROS or bytes(data[zeros:end]).strip(b"\x00")
+        ):
+            damage, damage_at = "zero-filled data", unit_start
+            break
+        nal_counts[nal_type] = nal_counts.get(nal_type, 0) + 1
+
+        if nal_type in (NAL_SLICE, NAL_IDR):
+            if nal + 1 >= end:
+                damage, damage_at = "slice cut off after its header", unit_start
+                break
+            if next_pos == -1 and largest_slice and end - unit_start > TAIL_SLICE_FACTOR * largest_slice:
+                damage, damage_at = "last slice is larger than any before it (garbage appended?)", unit_start
+                break
+            largest_slice = max(largest_slice, end - unit_start)
+            # first_mb_in_slice == 0 (exp-Golomb "1") starts a new picture
+            if data[nal + 1] & 0x80:
+                if nal_type == NAL_IDR or recovery_point:
+                    keyframes.append((unit_start if au_start is None else au_start, frames))
+                    recovery_point = False
+                frames += 1
+            au_start = None
+        else:
+            if au_start is None and nal_type in AU_PREFIX_TYPES:
+                au_start = unit_start
+            if nal_type == NAL_SPS:
+                try:
+                    parsed = parse_sps(unescape(bytes(data[nal + 1:end])))
+                except ValueError as e:
+                    damage, damage_at = f"unreadable SPS ({e})", unit_start
+                    break
+                sps = sps or parsed
+            elif nal_type == NAL_PPS:
+                seen_pps = True
+            elif nal_type == NAL_SEI and nal + 1 < end and data[nal + 1] == SEI_RECOVERY_POINT:
+                recovery_point = True
+
+        pos = next_pos
+
+    good_end = size
+    if damage_at is not None:
+        # Everything from the keyframe that starts the damaged GOP is dropped
+        good_end = max((offset for offset, _ in keyframes if offset < damage_at), default=0)
+
+    problem = None
+    if size == 0:
+        problem = "empty file"
+    elif not nal_counts:
+        problem = "no H.264 start codes (not an Annex-B stream)"
+    elif sps is None or not seen_pps:
+        problem = "no SPS/PPS (stream parameters missing)"
+    elif not keyframes:
+        problem = "no keyframe"
+    elif good_end == 0:
+        problem = f"no complete GOP before the damage ({damage})"
+
+    return H264Index(
+        size, frames, keyframes, nal_counts,
+        sps.width if sps else None, sps.height if sps else None, sps.fps if sps else None,
+        damage, good_end, problem,
+    )
+
+
+def index_file(path):
+    """Index a .h264 file through a read-only memory map."""
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        if f.tell() == 0:
+            return index_data(b"")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return index_data(data)
+
+
+def usable_frames(index):
+    """Frames before good_end (all frames if the file is undamaged)."""
+    if index.good_end == index.size:
+        return index.frames
+    return max((frame for offset, frame in index.keyframes if offset == index.good_end), default=0)
+
+
+def duration(index):
+    """Seconds of usable video, or None if the stream doesn't signal its frame rate."""
+    return usable_frames(index) / index.fps if index.fps else None
+
+
+def seek(index, seconds):
+    """(byte offset, frame number) of the keyframe at or before seconds."""
+    if not index.keyframes:
+        raise ValueError("no keyframes to seek to")
+    if not index.fps:
+        raise ValueError("frame rate not signalled; seek by frame number instead")
+    target = seconds * index.fps
+    candidates = [k for k in index.keyframes if k[1] <= target and k[0] < index.good_end]
+    return candidates[-1] if candidates else index.keyframes[0]
+
+
+def trimmed_url(path, end):
+    """
+    ffmpeg input for the first end bytes of path. Inside a concat list it
+    needs -protocol_whitelist with subfile added (see PROTOCOL_WHITELIST).
+    """
+    return f"subfile,,start,0,end,{end},,:{path}"
+
+
+def describe(index):
+    """One-line summary of an index."""
+    keyframes = sum(1 for offset, _ in index.keyframes if offset < index.good_end)
+    parts = [f"{usable_frames(index)} frames", f"{keyframes} keyframes"]
+    if index.width:
+        parts.append(f"{index.width}x{index.height}")
+    if index.fps:
+        parts.append(f"{index.fps:g} fps, {duration(index):.1f}s")
+    return ", ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Index .h264 recordings and report damaged or unusable files"
+    )
+    parser.add_argument("files", nargs="+", help=".h264 files to check")
+    args = parser.parse_args()
+
+    unusable = 0
+    for path in args.files:
+        try:
+            index = index_file(path)
+        except OSError as e:
+            print(f"❌ {path}: {e}")
+            unusable += 1
+            continue
+        if index.problem:
+            print(f"❌ {path}: {index.problem}")
+            unusable += 1
+        elif index.damage:
+            print(f"⚠️  {path}: {describe(index)}; {index.damage}, "
+                  f"last {index.size - index.good_end} bytes would be trimmed")
+        else:
+            print(f"✅ {path}: {describe(index)}")
+    sys.exit(1 if unusable else 0)
+
+
+if __name__ == "__main__":
+    main()
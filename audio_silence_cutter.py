@@ -1,8 +1,10 @@
-import subprocess
 import tempfile
 import sys
 import os
 import logging
+from contextlib import redirect_stdout
+
+import ffmpeg_jobs
 
 # ===========================
 # ==== Configure logging ====
@@ -14,6 +16,31 @@ logger.setLevel(log_level)
 log_handler = logging.FileHandler(log_filename, delay=True)
 logger.addHandler(log_handler)
 
+# Filters up to this length are passed on the command line; longer ones
+# (thousands of sections) go through a -filter_script file
+INLINE_FILTER_MAX = 32 * 1024
+
+# Output formats when writing to stdout ("-"): uncompressed so the next tool
+# in a pipe doesn't have to decode, and self-describing except raw s16le
+PIPE_FORMATS = {
+    "wav": ["-c:a", "pcm_s16le", "-f", "wav"],
+    "nut": ["-c:a", "pcm_s16le", "-f", "nut"],
+    "s16le": ["-c:a", "pcm_s16le", "-f", "s16le"],
+}
+
+
+def ffmpeg_io(infile, outfile, pipe_format="wav"):
+    """
+    Input and output arguments for ffmpeg, mapping "-" to pipe:0/pipe:1.
+    Returns (input args, output args, runner keyword arguments).
+    """
+    in_args = ["-i", "pipe:0" if infile == "-" else infile]
+    if outfile == "-":
+        out_args = PIPE_FORMATS[pipe_format] + ["pipe:1"]
+    else:
+        out_args = ["-y", outfile]  # -y to overwrite output file
+    return in_args, out_args, {"pass_stdin": infile == "-", "pass_stdout": outfile == "-"}
+
 
 def findSilences(filename, dB):
     """
@@ -35,9 +62,14 @@ def findSilences(filename, dB):
         "null",
         "-",
     ]
-    output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    s = str(output.stderr, "utf-8")
-    lines = s.split("\n")
+    # Collect silencedetect lines as they stream; the job's stderr buffer only keeps the tail
+    lines = []
+
+    def keep_silencedetect(line):
+        if "silencedetect" in line:
+            lines.append(line)
+
+    ffmpeg_jobs.run_ffmpeg(command, on_stderr_line=keep_silencedetect)
     time_list = []
     logging.debug("  lines: ```\n" + "\n".join(lines) + "```\n\n")
 
@@ -78,9 +110,8 @@ def getAudioDuration(filename: str) -> float:
         "default=noprint_wrappers=1:nokey=1",
     ]
 
-    output = subprocess.run(command, stdout=subprocess.PIPE)
-    s = str(output.stdout, "UTF-8")
-    return float(s.strip())
+    output = ffmpeg_jobs.run_ffmpeg(command, capture_stdout=True)
+    return float(output.stdout.strip())
 
 
 def getSectionsOfNewAudio(silences, duration, BUFFER):
@@ -123,27 +154,25 @@ def createAudioFilter(audioSectionTimings):
     return f"aselect='{filter_expr}',asetpts=N/SR/TB"
 
 
-def ffmpeg_run_audio(infile, audioFilter, outfile):
+def ffmpeg_run_audio(infile, audioFilter, outfile, pipe_format="wav"):
     logging.debug(f"ffmpeg_run_audio()")
 
-    # Use temporary file for filter
-    with tempfile.NamedTemporaryFile(
-        mode="w", encoding="UTF-8", prefix="audio_filter", suffix=".txt", delete=False
-    ) as aFile:
-        audioFilter_file = aFile.name
-        aFile.write(audioFilter)
+    in_args, out_args, io = ffmpeg_io(infile, outfile, pipe_format)
+    audioFilter_file = None
+    if len(audioFilter) <= INLINE_FILTER_MAX:
+        filter_args = ["-af", audioFilter]
+    else:
+        # Use temporary file for long filters
+        with tempfile.NamedTemporaryFile(
+            mode="w", encoding="UTF-8", prefix="audio_filter", suffix=".txt", delete=False
+        ) as aFile:
+            audioFilter_file = aFile.name
+            aFile.write(audioFilter)
+        filter_args = ["-filter_script:a", audioFilter_file]
 
     try:
-        command = [
-            "ffmpeg",
-            "-i",
-            infile,
-            "-filter_script:a",
-            audioFilter_file,
-            "-y",
-            outfile,
-        ]  # -y to overwrite output file
-        result = subprocess.run(command, capture_output=True, text=True)
+        command = ["ffmpeg"] + in_args + filter_args + out_args
+        result = ffmpeg_jobs.run_ffmpeg(command, **io)
 
         if result.returncode != 0:
             print(f"FFmpeg error: {result.stderr}")
@@ -151,24 +180,54 @@ def ffmpeg_run_audio(infile, audioFilter, outfile):
         return True
     finally:
         # Clean up temporary file
-        try:
-            os.unlink(audioFilter_file)
-        except OSError:
-            pass
+        if audioFilter_file:
+            try:
+                os.unlink(audioFilter_file)
+            except OSError:
+                pass
 
 
-def cut_audio_silences(infile, outfile, dB, BUFFER):
+def createStreamingFilter(dB, BUFFER, min_silence=0.5):
+    """
+    Single-pass silence removal for piped input, which can't be read twice
+    (once to detect silences and once to cut). Keeps BUFFER seconds of each
+    removed silence, like add_buffer() does for the two-pass cut.
+    """
+    return (
+        f"silenceremove=start_periods=1:start_threshold={dB}dB"
+        f":start_duration={min_silence}:start_silence={BUFFER}"
+        f":stop_periods=-1:stop_threshold={dB}dB"
+        f":stop_duration={min_silence}:stop_silence={BUFFER}"
+        f":detection=peak"
+    )
+
+
+def cut_audio_silences(infile, outfile, dB, BUFFER, pipe_format="wav"):
     logging.debug(f"cut_audio_silences()")
     logging.debug(f"    - infile = {infile}")
     logging.debug(f"    - outfile = {outfile}")
     logging.debug(f"    - dB = {dB}")
 
+    if infile == "-":
+        print("Removing silences from stdin in a single pass...")
+        audioFilter = createStreamingFilter(dB, BUFFER)
+        print("Audio filter:", audioFilter)
+        if ffmpeg_run_audio(infile, audioFilter, outfile, pipe_format):
+            print(f"Successfully created: {outfile}")
+        else:
+            print("Error creating audio file")
+        return
+
     print("Detecting silences in audio...")
     silences = findSilences(infile, dB)
 
     if not silences:
         print("No silences detected. Copying original file...")
-        subprocess.run(["ffmpeg", "-i", infile, "-c", "copy", "-y", outfile])
+        if outfile == "-":
+            in_args, out_args, io = ffmpeg_io(infile, outfile, pipe_format)
+            ffmpeg_jobs.run_ffmpeg(["ffmpeg"] + in_args + out_args, **io)
+        else:
+            ffmpeg_jobs.run_ffmpeg(["ffmpeg", "-i", infile, "-c", "copy", "-y", outfile])
         return
 
     duration = getAudioDuration(infile)
@@ -178,7 +237,7 @@ def cut_audio_silences(infile, outfile, dB, BUFFER):
     print("Audio filter:", audioFilter)
 
     print("Creating new audio file...")
-    success = ffmpeg_run_audio(infile, audioFilter, outfile)
+    success = ffmpeg_run_audio(infile, audioFilter, outfile, pipe_format)
 
     if success:
         print(f"Successfully created: {outfile}")
@@ -191,17 +250,24 @@ def printHelp():
     print("Usage:")
     print(
         "   python audio_silence_cutter.py [input_file] [optional: output_file] [optional: dB_threshold]"
+        " [optional: --pipe-format wav|nut|s16le]"
     )
     print("")
     print("Arguments:")
-    print("   input_file    : Input audio file (.mp3, .wav, etc.)")
-    print("   output_file   : Output audio file (default: [input]_cut.[ext])")
+    print("   input_file    : Input audio file (.mp3, .wav, etc.), or - for stdin")
+    print("   output_file   : Output audio file (default: [input]_cut.[ext]), or - for stdout")
     print("   dB_threshold  : Silence threshold in dB (default: -30)")
+    print("   --pipe-format : Format written to stdout (default: wav)")
+    print("")
+    print("Reading stdin removes silences in a single pass (silenceremove), since a")
+    print("pipe can't be read twice. Stdin must be a container ffmpeg can probe")
+    print("(WAV, NUT, MP3, ...), not raw PCM.")
     print("")
     print("Examples:")
     print("   python audio_silence_cutter.py audio.mp3")
     print("   python audio_silence_cutter.py audio.wav output.wav")
     print("   python audio_silence_cutter.py podcast.mp3 clean_podcast.mp3 -35")
+    print("   python convert_mp4_to_mp3.py talk.mp4 -o - --pipe-format wav | python audio_silence_cutter.py - - | python split_it.py - chunks/")
     print("")
     print("dB Threshold Guide:")
     print("   -20 to -25: Very aggressive (removes low background noise)")
@@ -215,29 +281,46 @@ def printHelp():
 def main():
     logging.debug(f"main()")
     args = sys.argv[1:]
-    print("Arguments:", str(args))
+
+    pipe_format = "wav"
+    if "--pipe-format" in args:
+        i = args.index("--pipe-format")
+        if i + 1 >= len(args) or args[i + 1] not in PIPE_FORMATS:
+            sys.stderr.write(f"ERROR: --pipe-format must be one of: {', '.join(PIPE_FORMATS)}\n")
+            sys.exit(1)
+        pipe_format = args[i + 1]
+        del args[i:i + 2]
 
     if len(args) < 1 or args[0] == "--help":
         printHelp()
         return
 
     infile = args[0]
+    # Default to stdout for piped input so a chain needs no temporary files
+    outfile = "-" if infile == "-" else os.path.splitext(infile)[0] + "_cut" + os.path.splitext(infile)[1]
+    if len(args) >= 2:
+        outfile = args[1]
 
-    if not os.path.isfile(infile):
-        print(f"ERROR: Input file not found: {infile}")
-        return
+    if outfile == "-":
+        # stdout carries the audio; keep our messages on stderr
+        with redirect_stdout(sys.stderr):
+            run_cutter(args, infile, outfile, pipe_format)
+    else:
+        run_cutter(args, infile, outfile, pipe_format)
 
-    # Check if file is audio format
-    ext = os.path.splitext(infile)[1].lower()
-    if ext not in [".mp3", ".wav", ".flac", ".m4a", ".aac", ".ogg"]:
-        print(f"Warning: {ext} may not be a supported audio format")
 
-    # Set default values for optional arguments
-    tmp = os.path.splitext(infile)
-    outfile = tmp[0] + "_cut" + tmp[1]
+def run_cutter(args, infile, outfile, pipe_format):
+    print("Arguments:", str(args))
 
-    if len(args) >= 2:
-        outfile = args[1]
+    if infile != "-":
+        if not os.path.isfile(infile):
+            print(f"ERROR: Input file not found: {infile}")
+            return
+
+        # Check if file is audio format
+        ext = os.path.splitext(infile)[1].lower()
+        if ext not in [".mp3", ".wav", ".flac", ".m4a", ".aac", ".ogg"]:
+            print(f"Warning: {ext} may not be a supported audio format")
 
     dB = -30  # Default threshold for audio
     BUFFER = 0.1  # Shorter buffer for audio
@@ -253,7 +336,8 @@ def main():
     print(f"Silence threshold: {dB}dB")
     print(f"Buffer: {BUFFER}s")
 
-    cut_audio_silences(infile, outfile, dB, BUFFER)
+    with ffmpeg_jobs.cancel_on_interrupt():
+        cut_audio_silences(infile, outfile, dB, BUFFER, pipe_format)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,746 @@
+#!/usr/bin/env python3
+"""
+Parallel batch audio conversion using ffmpeg.
+
+Converts every file matching a glob pattern to any output container/codec
+and sample format, running several ffmpeg processes at once. The
+convert_*_to_wav.py scripts are presets over this engine.
+
+Usage examples:
+  - Convert all .flac files in the current directory to 16-bit WAV:
+      python batch_convert.py --pattern "*.flac" --ext .wav --codec pcm_s16le
+
+  - Convert a tree of .m4a files to 48 kHz mono MP3 using 4 workers:
+      python batch_convert.py --input "in" --output "out" --pattern "**/*.m4a" \\
+          --ext .mp3 --codec libmp3lame --sample-rate 48000 --channels 1 --jobs 4
+
+  - Decode each .m4a once and write WAV, 22 kHz mono WAV and MP3 from it:
+      python batch_convert.py --pattern "*.m4a" \\
+          --target ext=.wav \\
+          --target ext=.wav,rate=22050,channels=1,suffix=_22k \\
+          --target ext=.mp3,codec=libmp3lame,bitrate=192k
+
+Re-runs are incremental: a small SQLite ledger in the output directory
+records each input's size, mtime and fingerprint, the conversion
+parameters and the output's size, mtime and checksum, so unchanged inputs
+are skipped without starting ffmpeg and damaged outputs are redone.
+Outputs already there when the ledger first sees them are adopted rather
+than reconverted (unless --overwrite). Outputs are written to a temporary
+name and renamed into place once complete.
+
+Requirements:
+  - ffmpeg must be installed and available on PATH
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from shutil import which
+from typing import Dict, List, Optional, Tuple
+
+import ffmpeg_jobs
+
+
+@dataclass(frozen=True)
+class ConversionPreset:
+    """Default settings for a batch conversion entry point."""
+
+    description: str
+    input_label: str = "input"
+    pattern: str = "*"
+    output_ext: str = ".wav"
+    codec: Optional[str] = None
+    sample_fmt: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+
+
+GENERIC_PRESET = ConversionPreset(
+    description="Convert all files matching a pattern to another audio format using ffmpeg.",
+)
+
+STATE_DB_NAME = ".convert_state.sqlite"
+
+# Bytes hashed from the start, middle and end of an input for its fingerprint
+FINGERPRINT_SAMPLE_SIZE = 64 * 1024
+
+
+@dataclass
+class JobResult:
+    """Outcome of one file: status is 'converted', 'skipped' or 'failed'."""
+
+    status: str
+    error: Optional[str] = None
+    records: List[dict] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class OutputTarget:
+    """One output written for every input, described by a --target spec."""
+
+    ext: str
+    codec: Optional[str] = None
+    sample_fmt: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    bitrate: Optional[str] = None
+    suffix: str = ""
+    subdir: str = ""
+
+    # --target spec keys and the fields they set
+    SPEC_KEYS = {
+        "ext": ("ext", str),
+        "codec": ("codec", str),
+        "fmt": ("sample_fmt", str),
+        "rate": ("sample_rate", int),
+        "channels": ("channels", int),
+        "bitrate": ("bitrate", str),
+        "suffix": ("suffix", str),
+        "dir": ("subdir", str),
+    }
+
+    @classmethod
+    def parse(cls, spec: str) -> "OutputTarget":
+        """
+        Parse a spec such as "ext=.wav,rate=22050,channels=1,suffix=_22k".
+        A leading bare token is taken as the extension ("mp3,bitrate=192k").
+        """
+        values = {}
+        for i, item in enumerate(part.strip() for part in spec.split(",")):
+            if not item:
+                continue
+            key, sep, value = item.partition("=")
+            if not sep and i == 0:
+                key, value = "ext", key
+            if key not in cls.SPEC_KEYS or not value:
+                raise argparse.ArgumentTypeError(
+                    f"invalid target item '{item}' (keys: {', '.join(cls.SPEC_KEYS)})"
+                )
+            name, convert = cls.SPEC_KEYS[key]
+            try:
+                values[name] = convert(value)
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"invalid value for {key}: '{value}'")
+
+        if "ext" not in values:
+            raise argparse.ArgumentTypeError(f"target '{spec}' needs an ext")
+        if not values["ext"].startswith("."):
+            values["ext"] = f".{values['ext']}"
+        return cls(**values)
+
+    def output_name(self) -> str:
+        """Where this target's output goes relative to the mirrored input, e.g. "sub/*_22k.wav"."""
+        return os.path.normcase(os.path.normpath(os.path.join(self.subdir, f"*{self.suffix}{self.ext}")))
+
+    def output_options(self) -> List[str]:
+        """Per-output ffmpeg encoder options (resampling is done in the filter graph)."""
+        opts = []
+        if self.codec:
+            opts += ["-c:a", self.codec]
+        if self.sample_fmt:
+            opts += ["-sample_fmt", self.sample_fmt]
+        if self.channels:
+            opts += ["-ac", str(self.channels)]
+        if self.bitrate:
+            opts += ["-b:a", self.bitrate]
+        return opts
+
+    def params(self) -> str:
+        """Serialize the settings that affect output content, for the ledger."""
+        return json.dumps(
+            {k: v for k, v in asdict(self).items() if k not in ("suffix", "subdir")},
+            sort_keys=True,
+        )
+
+
+class ConversionLedger:
+    """SQLite record of completed conversions, keyed by output path."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS conversions (
+            output_path     TEXT PRIMARY KEY,
+            input_path      TEXT NOT NULL,
+            input_size      INTEGER NOT NULL,
+            input_mtime_ns  INTEGER NOT NULL,
+            input_fingerprint TEXT NOT NULL,
+            params          TEXT NOT NULL,
+            output_size     INTEGER NOT NULL,
+            output_mtime_ns INTEGER NOT NULL,
+            output_checksum TEXT NOT NULL,
+            converted_at    REAL NOT NULL
+        )
+    """
+    COLUMNS = (
+        "output_path", "input_path", "input_size", "input_mtime_ns",
+        "input_fingerprint", "params", "output_size", "output_mtime_ns",
+        "output_checksum", "converted_at",
+    )
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(self.SCHEMA)
+
+    def load(self) -> Dict[str, dict]:
+        """Return all recorded conversions as dicts keyed by output path."""
+        rows = self.conn.execute("SELECT * FROM conversions")
+        return {row["output_path"]: dict(row) for row in rows}
+
+    def record(self, entry: dict) -> None:
+        """Insert or replace the entry for entry['output_path'] and commit."""
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO conversions ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({placeholders})",
+            [entry[c] for c in self.COLUMNS],
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def available_cores() -> int:
+    """Number of CPU cores this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def ensure_ffmpeg_available() -> None:
+    """Exit with an error message if ffmpeg is not found on PATH."""
+    if which("ffmpeg") is None:
+        sys.stderr.write(
+            "Error: ffmpeg not found.\n"
+            "Install ffmpeg and ensure it is on your PATH, then retry.\n"
+            "Windows: install from https://ffmpeg.org/ or via winget/choco.\n"
+            "Linux: install via your package manager (e.g., apt install ffmpeg).\n"
+        )
+        sys.exit(1)
+
+
+def parse_args(preset: ConversionPreset = GENERIC_PRESET) -> argparse.Namespace:
+    out_label = preset.output_ext.lstrip(".")
+    parser = argparse.ArgumentParser(description=preset.description)
+    parser.add_argument(
+        "--input",
+        type=Path,
+        default=Path.cwd(),
+        help=f"Directory containing {preset.input_label} files (default: current directory)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help=f"Directory to write .{out_label} files (default: same as input)",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help=f"Reconvert and overwrite existing .{out_label} files even if up to date",
+    )
+    parser.add_argument(
+        "--pattern",
+        type=str,
+        default=preset.pattern,
+        help=f"Glob pattern for input files (default: {preset.pattern})",
+    )
+    parser.add_argument(
+        "--ext",
+        type=str,
+        default=preset.output_ext,
+        help=f"Output file extension, selects the container (default: {preset.output_ext})",
+    )
+    parser.add_argument(
+        "--codec",
+        type=str,
+        default=preset.codec,
+        help="Output audio codec, e.g. pcm_s16le, flac, libmp3lame (default: ffmpeg's choice)",
+    )
+    parser.add_argument(
+        "--sample-fmt",
+        type=str,
+        default=preset.sample_fmt,
+        help="Output sample format, e.g. s16, s32, flt (default: codec default)",
+    )
+    parser.add_argument(
+        "--sample-rate",
+        type=int,
+        default=preset.sample_rate,
+        help="Output sample rate in Hz (default: same as input)",
+    )
+    parser.add_argument(
+        "--channels",
+        type=int,
+        default=preset.channels,
+        help="Output channel count (default: same as input)",
+    )
+    parser.add_argument(
+        "--target",
+        type=OutputTarget.parse,
+        action="append",
+        default=None,
+        metavar="SPEC",
+        help=(
+            "Write this output too, decoding the input only once; may be repeated. "
+            "SPEC is comma-separated key=value pairs: ext, codec, fmt, rate, channels, "
+            "bitrate, suffix, dir (e.g. ext=.wav,rate=22050,channels=1,suffix=_22k). "
+            "Overrides --ext/--codec/--sample-fmt/--sample-rate/--channels"
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=available_cores(),
+        help="Number of files converted in parallel (default: number of cores)",
+    )
+    parser.add_argument(
+        "--threads-per-job",
+        type=int,
+        default=None,
+        help="ffmpeg threads per conversion (default: cores divided by jobs, at least 1)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Give up on a conversion after this many seconds (default: no limit)",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Retry conversions that time out or fail with a transient I/O error (default: 0)",
+    )
+    parser.add_argument(
+        "--state-db",
+        type=Path,
+        default=None,
+        help=f"Conversion ledger used to skip unchanged inputs (default: <output>/{STATE_DB_NAME})",
+    )
+    parser.add_argument(
+        "--no-state",
+        action="store_true",
+        help="Don't use the ledger; only skip outputs that already exist",
+    )
+    args = parser.parse_args()
+
+    # Two targets writing the same file would share one partial output
+    seen = set()
+    for target in args.target or []:
+        name = target.output_name()
+        if name in seen:
+            parser.error(
+                f"two --target specs write the same output ({name}); "
+                "give one a different suffix, dir or ext"
+            )
+        seen.add(name)
+    return args
+
+
+def build_ffmpeg_cmd(
+    input_file: Path,
+    output_file: Path,
+    overwrite: bool,
+    codec: Optional[str] = None,
+    sample_fmt: Optional[str] = None,
+    sample_rate: Optional[int] = None,
+    channels: Optional[int] = None,
+    bitrate: Optional[str] = None,
+    threads: Optional[int] = None,
+) -> List[str]:
+    """Build the ffmpeg command line for a single conversion."""
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-y" if overwrite else "-n"]
+    if threads:
+        # Limit decoder and encoder threads so parallel jobs don't oversubscribe
+        cmd += ["-threads", str(threads)]
+    cmd += ["-i", str(input_file)]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    if codec:
+        cmd += ["-c:a", codec]
+    if sample_fmt:
+        cmd += ["-sample_fmt", sample_fmt]
+    if sample_rate:
+        cmd += ["-ar", str(sample_rate)]
+    if channels:
+        cmd += ["-ac", str(channels)]
+    if bitrate:
+        cmd += ["-b:a", bitrate]
+    cmd.append(str(output_file))
+    return cmd
+
+
+def build_fanout_cmd(
+    input_file: Path,
+    outputs: List[Tuple[Path, OutputTarget]],
+    threads: Optional[int] = None,
+) -> List[str]:
+    """
+    Build one ffmpeg command that decodes input_file once and splits the
+    audio with asplit into a branch per output, each with its own
+    resampling and encoder settings.
+    """
+    branches = [f"[s{i}]" for i in range(len(outputs))]
+    graph = [f"[0:a]asplit={len(outputs)}{''.join(branches)}"]
+    for i, (_, target) in enumerate(outputs):
+        resample = f"aresample={target.sample_rate}" if target.sample_rate else "anull"
+        graph.append(f"[s{i}]{resample}[o{i}]")
+
+    cmd = ["ffmpeg", "-hide_banner", "-nostdin", "-y"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd += ["-i", str(input_file), "-filter_complex", ";".join(graph)]
+    for i, (output_file, target) in enumerate(outputs):
+        cmd += ["-map", f"[o{i}]"] + target.output_options()
+        if threads:
+            cmd += ["-threads", str(threads)]
+        cmd.append(str(output_file))
+    return cmd
+
+
+def partial_path_for(output_file: Path) -> Path:
+    """Temporary path a conversion writes to before it is renamed into place."""
+    # Keep the real extension last so ffmpeg still picks the right muxer
+    return output_file.with_name(f".{output_file.stem}.partial{output_file.suffix}")
+
+
+def run_ffmpeg_atomic(
+    ffmpeg_cmd: List[str], output_files: List[Path], partial_files: List[Path]
+) -> Tuple[bool, Optional[str]]:
+    """
+    Run an ffmpeg command writing to partial_files and rename each onto its
+    output file once all of them are complete. Returns (success, error message).
+    """
+    completed = ffmpeg_jobs.run_ffmpeg(ffmpeg_cmd)
+
+    if completed.returncode == 0:
+        for partial_file, output_file in zip(partial_files, output_files):
+            os.replace(partial_file, output_file)
+        return True, None
+
+    for partial_file in partial_files:
+        try:
+            partial_file.unlink()
+        except OSError:
+            pass
+    return False, completed.stderr
+
+
+def run_conversion(
+    input_file: Path, output_file: Path, overwrite: bool, **options
+) -> Tuple[bool, Optional[str]]:
+    """
+    Run one conversion. The output is written to a temporary file and
+    atomically renamed, so an interrupted run never leaves a truncated
+    output behind. Returns (success, error message).
+    """
+    # Existing output and overwrite disabled; treat as skipped
+    if not overwrite and output_file.exists():
+        return True, None
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    partial_file = partial_path_for(output_file)
+    ffmpeg_cmd = build_ffmpeg_cmd(input_file, partial_file, True, **options)
+    return run_ffmpeg_atomic(ffmpeg_cmd, [output_file], [partial_file])
+
+
+def run_fanout(
+    input_file: Path,
+    outputs: List[Tuple[Path, OutputTarget]],
+    threads: Optional[int] = None,
+) -> Tuple[bool, Optional[str]]:
+    """Write all outputs from a single decode of input_file. Returns (success, error message)."""
+    output_files = [output_file for output_file, _ in outputs]
+    partial_files = [partial_path_for(output_file) for output_file in output_files]
+    for output_file in output_files:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    ffmpeg_cmd = build_fanout_cmd(
+        input_file,
+        [(partial, target) for partial, (_, target) in zip(partial_files, outputs)],
+        threads,
+    )
+    return run_ffmpeg_atomic(ffmpeg_cmd, output_files, partial_files)
+
+
+def convert_file(input_file: Path, output_file: Path, overwrite: bool, **options) -> bool:
+    """Convert a single file using ffmpeg. Returns True on success."""
+    ok, error = run_conversion(input_file, output_file, overwrite, **options)
+    if not ok:
+        sys.stderr.write(f"Failed to convert {input_file.name}:\n{error}\n")
+    return ok
+
+
+def is_own_file(path: Path) -> bool:
+    """True for the ledger and in-progress outputs this script writes itself."""
+    name = path.name
+    return name.startswith(STATE_DB_NAME) or (name.startswith(".") and ".partial." in name)
+
+
+def find_input_files(input_dir: Path, pattern: str) -> List[Path]:
+    """Return the sorted regular files under input_dir matching pattern."""
+    return [p for p in sorted(input_dir.glob(pattern)) if p.is_file() and not is_own_file(p)]
+
+
+def output_path_for(
+    input_file: Path, input_dir: Path, output_dir: Path, ext: str, suffix: str = "", subdir: str = ""
+) -> Path:
+    """Mirror input_file's location below input_dir into output_dir with a new extension."""
+    relative = input_file.relative_to(input_dir)
+    return output_dir / subdir / relative.parent / f"{relative.stem}{suffix}{ext}"
+
+
+def file_fingerprint(path: Path, size: int) -> str:
+    """
+    Cheap content fingerprint: BLAKE2 of the size plus samples from the
+    start, middle and end of the file.
+    """
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        for offset in (0, max(0, size // 2 - FINGERPRINT_SAMPLE_SIZE // 2),
+                       max(0, size - FINGERPRINT_SAMPLE_SIZE)):
+            f.seek(offset)
+            digest.update(f.read(FINGERPRINT_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def convert_outputs(
+    input_file: Path,
+    outputs: List[Tuple[Path, OutputTarget]],
+    threads: Optional[int] = None,
+) -> Tuple[bool, Optional[str]]:
+    """Write outputs from input_file, using the plain command for a single target."""
+    if len(outputs) > 1:
+        return run_fanout(input_file, outputs, threads)
+    output_file, target = outputs[0]
+    return run_conversion(
+        input_file, output_file, True,
+        codec=target.codec, sample_fmt=target.sample_fmt, sample_rate=target.sample_rate,
+        channels=target.channels, bitrate=target.bitrate, threads=threads,
+    )
+
+
+def output_is_current(output_file: Path, previous: Optional[dict], params: str, st) -> Optional[bool]:
+    """
+    Compare an output and its input stat with the ledger entry. Returns True
+    if up to date, False if stale and None if only the input fingerprint
+    can tell (input touched but output intact). The output's checksum is
+    only computed once its size and mtime match, to catch damage in place.
+    """
+    if previous is None or previous["params"] != params:
+        return False
+    try:
+        out_st = output_file.stat()
+    except FileNotFoundError:
+        return False
+    if (out_st.st_size != previous["output_size"]
+            or out_st.st_mtime_ns != previous["output_mtime_ns"]):
+        return False
+    if file_fingerprint(output_file, out_st.st_size) != previous["output_checksum"]:
+        return False
+    if st.st_size == previous["input_size"] and st.st_mtime_ns == previous["input_mtime_ns"]:
+        return True
+    return None
+
+
+def ledger_entry(
+    input_file: Path, st, fingerprint: str, output_file: Path, target: OutputTarget
+) -> dict:
+    """Ledger record for output_file, made from input_file (stat st) with target."""
+    out_st = output_file.stat()
+    return {
+        "output_path": str(output_file),
+        "input_path": str(input_file),
+        "input_size": st.st_size,
+        "input_mtime_ns": st.st_mtime_ns,
+        "input_fingerprint": fingerprint,
+        "params": target.params(),
+        "output_size": out_st.st_size,
+        "output_mtime_ns": out_st.st_mtime_ns,
+        "output_checksum": file_fingerprint(output_file, out_st.st_size),
+        "converted_at": time.time(),
+    }
+
+
+def process_job(
+    input_file: Path,
+    outputs: List[Tuple[Path, OutputTarget]],
+    previous: List[Optional[dict]],
+    overwrite: bool,
+    threads: Optional[int],
+) -> JobResult:
+    """
+    Convert one input to the outputs whose ledger entries in `previous`
+    show them stale, decoding the input once for all of them. An existing
+    output the ledger has no entry for (from an earlier run without the
+    ledger, or another tool) is recorded as it is unless overwrite is set.
+    Runs in a worker thread; the ledger itself is only touched by the caller.
+    """
+    st = input_file.stat()
+    fingerprint = None
+    stale = []
+    records = []
+
+    for (output_file, target), prev in zip(outputs, previous):
+        if prev is None and not overwrite and output_file.exists():
+            if fingerprint is None:
+                fingerprint = file_fingerprint(input_file, st.st_size)
+            records.append(ledger_entry(input_file, st, fingerprint, output_file, target))
+            continue
+        current = False if overwrite else output_is_current(output_file, prev, target.params(), st)
+        if current is None:
+            # Touched but possibly unchanged: compare content before reconverting
+            if fingerprint is None:
+                fingerprint = file_fingerprint(input_file, st.st_size)
+            current = fingerprint == prev["input_fingerprint"]
+            if current:
+                records.append(dict(prev, input_size=st.st_size, input_mtime_ns=st.st_mtime_ns))
+        if not current:
+            stale.append((output_file, target))
+
+    if not stale:
+        return JobResult("skipped", records=records)
+
+    if fingerprint is None:
+        fingerprint = file_fingerprint(input_file, st.st_size)
+
+    # The ledger decided these outputs are stale, so replace them
+    ok, error = convert_outputs(input_file, stale, threads)
+    if not ok:
+        return JobResult("failed", error=error, records=records)
+
+    for output_file, target in stale:
+        records.append(ledger_entry(input_file, st, fingerprint, output_file, target))
+    return JobResult("converted", records=records)
+
+
+def convert_batch(
+    files: List[Path],
+    input_dir: Path,
+    output_dir: Path,
+    targets: List[OutputTarget],
+    overwrite: bool = False,
+    jobs: int = 1,
+    threads_per_job: Optional[int] = None,
+    ledger: Optional[ConversionLedger] = None,
+) -> int:
+    """
+    Convert files with a pool of `jobs` concurrent ffmpeg processes, writing
+    one output per target (several targets share a single decode).
+    Progress is printed in input order regardless of completion order.
+    With a ledger, inputs whose content and parameters are unchanged since
+    the last run are skipped. Returns the number of successful or skipped
+    files.
+    """
+    jobs = max(1, min(jobs, len(files)))
+    if threads_per_job is None:
+        threads_per_job = max(1, available_cores() // jobs)
+
+    outputs = [
+        [(output_path_for(f, input_dir, output_dir, t.ext, t.suffix, t.subdir), t) for t in targets]
+        for f in files
+    ]
+    previous = ledger.load() if ledger is not None else {}
+
+    def job(pair: Tuple[Path, List[Tuple[Path, OutputTarget]]]) -> JobResult:
+        src, dsts = pair
+        if ledger is None:
+            dsts = [(dst, t) for dst, t in dsts if overwrite or not dst.exists()]
+            if not dsts:
+                return JobResult("skipped")
+            ok, error = convert_outputs(src, dsts, threads_per_job)
+            return JobResult("converted" if ok else "failed", error=error)
+        prev = [previous.get(str(dst)) for dst, _ in dsts]
+        return process_job(src, dsts, prev, overwrite, threads_per_job)
+
+    total = len(files)
+    successes = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool, ffmpeg_jobs.cancel_on_interrupt():
+        # map() yields results in submission order, which keeps the log ordered
+        results = pool.map(job, zip(files, outputs))
+        for idx, (src, dsts, result) in enumerate(zip(files, outputs, results), start=1):
+            for record in result.records:
+                ledger.record(record)
+            names = ", ".join(dst.name for dst, _ in dsts)
+            if result.status == "converted":
+                print(f"[{idx}/{total}] Converted: {src.name} -> {names}")
+                successes += 1
+            elif result.status == "skipped":
+                print(f"[{idx}/{total}] Unchanged: {src.name} -> {names}")
+                successes += 1
+            else:
+                print(f"[{idx}/{total}] Failed: {src.name} -> {names}")
+                sys.stderr.write(f"Failed to convert {src.name}:\n{result.error}\n")
+
+    return successes
+
+
+def main(preset: ConversionPreset = GENERIC_PRESET) -> None:
+    ensure_ffmpeg_available()
+    args = parse_args(preset)
+
+    input_dir: Path = args.input.resolve()
+    output_dir: Path = args.output.resolve() if args.output else input_dir
+
+    if not input_dir.exists() or not input_dir.is_dir():
+        sys.stderr.write(f"Input directory does not exist or is not a directory: {input_dir}\n")
+        sys.exit(1)
+
+    files = find_input_files(input_dir, args.pattern)
+
+    if not files:
+        print(f"No files matched pattern '{args.pattern}' in {input_dir}")
+        return
+
+    targets = args.target or [
+        OutputTarget(
+            ext=args.ext if args.ext.startswith(".") else f".{args.ext}",
+            codec=args.codec,
+            sample_fmt=args.sample_fmt,
+            sample_rate=args.sample_rate,
+            channels=args.channels,
+        )
+    ]
+
+    ffmpeg_jobs.configure(timeout=args.timeout, retries=args.retries)
+
+    ledger = None
+    if not args.no_state:
+        ledger = ConversionLedger(args.state_db or output_dir / STATE_DB_NAME)
+
+    total = len(files)
+    try:
+        successes = convert_batch(
+            files,
+            input_dir,
+            output_dir,
+            targets,
+            overwrite=args.overwrite,
+            jobs=args.jobs,
+            threads_per_job=args.threads_per_job,
+            ledger=ledger,
+        )
+    finally:
+        if ledger is not None:
+            ledger.close()
+
+    print(f"Done. {successes}/{total} files converted.")
+
+
+if __name__ == "__main__":
+    main()
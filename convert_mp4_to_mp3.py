@@ -2,58 +2,408 @@
 
 import sys
 import os
-import subprocess
+import glob
+import json
+import time
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
 
+import ffmpeg_jobs
 
-def convert_mp4_to_mp3(input_file, output_file="output.mp3"):
+# Target formats: output extension, source codecs that can be stream-copied
+# into it, the encoder settings used otherwise, and the muxer used when
+# writing to stdout (MP4/M4A can't be written to a pipe, so AAC goes out as ADTS)
+TARGETS = {
+    "mp3": {
+        "ext": ".mp3",
+        "copy_codecs": ("mp3",),
+        "encode": ["-acodec", "mp3", "-ab", "192k", "-ar", "44100"],
+        "pipe": ["-f", "mp3"],
+    },
+    "m4a": {
+        "ext": ".m4a",
+        "copy_codecs": ("aac", "alac"),
+        "encode": ["-acodec", "aac", "-ab", "192k", "-ar", "44100"],
+        "pipe": ["-f", "adts"],
+    },
+}
+
+# Uncompressed intermediate formats for chaining tools through pipes
+PIPE_FORMATS = {
+    "wav": ["-acodec", "pcm_s16le", "-f", "wav"],
+    "nut": ["-acodec", "pcm_s16le", "-f", "nut"],
+    "s16le": ["-acodec", "pcm_s16le", "-f", "s16le"],
+}
+
+
+def probe_audio_codec(input_file):
+    """Return the codec name of the first audio stream, or None if unknown"""
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "a:0",
+        "-show_entries",
+        "stream=codec_name",
+        "-of",
+        "json",
+        input_file,
+    ]
+    result = ffmpeg_jobs.run_ffmpeg(cmd, capture_stdout=True)
     try:
-        if not os.path.exists(input_file):
-            print(f"Error: Input file '{input_file}' not found.")
-            return False
-
-        if not input_file.lower().endswith(".mp4"):
-            print(f"Error: Input file must be an MP4 file.")
-            return False
-
-        print(f"Converting {input_file} to {output_file}...")
-
-        # Use ffmpeg to extract audio from video
-        cmd = [
-            "ffmpeg",
-            "-i",
-            input_file,
-            "-vn",  # No video
-            "-acodec",
-            "mp3",  # Audio codec
-            "-ab",
-            "192k",  # Audio bitrate
-            "-ar",
-            "44100",  # Audio sample rate
-            "-y",  # Overwrite output file
-            output_file,
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        streams = json.loads(result.stdout or "{}").get("streams", [])
+    except ValueError:
+        return None
+    return streams[0].get("codec_name") if streams else None
+
+
+def choose_target(codec, requested):
+    """
+    Resolve the requested format ('mp3', 'm4a' or 'auto') for a source codec.
+    Returns (target name, True if the audio can be stream-copied).
+    'auto' keeps MP3 and AAC audio as-is and encodes anything else to MP3.
+    """
+    if requested == "auto":
+        for name, target in TARGETS.items():
+            if codec in target["copy_codecs"]:
+                return name, True
+        return "mp3", False
+    return requested, codec in TARGETS[requested]["copy_codecs"]
+
+
+def run_ffmpeg(input_file, output_file, audio_args):
+    # "-" streams through our own stdin/stdout; -nostdin keeps concurrent
+    # ffmpeg processes off the terminal and doesn't affect reading pipe:0
+    source = "pipe:0" if input_file == "-" else input_file
+    dest = "pipe:1" if output_file == "-" else output_file
+    cmd = ["ffmpeg", "-nostdin", "-i", source, "-vn"] + audio_args + ["-y", dest]
+    return ffmpeg_jobs.run_ffmpeg(
+        cmd, pass_stdin=input_file == "-", pass_stdout=output_file == "-"
+    )
+
+
+def extract_audio(input_file, output_file, target="mp3", pipe_format=None):
+    """
+    Extract the audio of one MP4 without printing anything.
+    input_file and output_file may be "-" for stdin/stdout; with pipe_format
+    ('wav', 'nut' or 's16le') the audio is decoded to 16-bit PCM in that
+    format instead, for piping into the next tool.
+    Returns a report dict with the status, the path taken ('copy', 'encode'
+    or 'pcm'), the source codec, the final output path and any error.
+    """
+    report = {
+        "input": input_file,
+        "output": output_file,
+        "status": "failed",
+        "method": None,
+        "codec": None,
+        "seconds": 0.0,
+        "error": None,
+    }
+    started = time.monotonic()
+    try:
+        codec = None
+        if input_file != "-":
+            if not os.path.exists(input_file):
+                report["error"] = f"Input file '{input_file}' not found."
+                return report
+
+            if not input_file.lower().endswith(".mp4"):
+                report["error"] = "Input file must be an MP4 file."
+                return report
+
+            # A pipe can't be probed without consuming it; stdin input is always decoded
+            codec = probe_audio_codec(input_file)
+        report["codec"] = codec
+
+        if pipe_format:
+            result = run_ffmpeg(input_file, output_file, PIPE_FORMATS[pipe_format])
+            if result.returncode == 0:
+                report.update(status="ok", method="pcm")
+            else:
+                report.update(method="pcm", error=result.stderr)
+            return report
 
+        target, can_copy = choose_target(codec, target)
+        mux_args = []
+        if output_file == "-":
+            mux_args = TARGETS[target]["pipe"]
+        else:
+            ext = TARGETS[target]["ext"]
+            if os.path.splitext(output_file)[1].lower() != ext:
+                output_file = os.path.splitext(output_file)[0] + ext
+            report["output"] = output_file
+
+            out_dir = os.path.dirname(output_file)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+
+        if can_copy:
+            # Remux the existing audio stream; no decoding or encoding
+            result = run_ffmpeg(input_file, output_file, ["-c:a", "copy"] + mux_args)
+            if result.returncode == 0:
+                report.update(status="ok", method="copy")
+                return report
+            report["error"] = f"Stream copy failed, fell back to encoding: {result.stderr}"
+
+        result = run_ffmpeg(input_file, output_file, TARGETS[target]["encode"] + mux_args)
         if result.returncode == 0:
-            print(f"Conversion completed: {output_file}")
-            return True
+            report.update(status="ok", method="encode")
         else:
-            print(f"Error during conversion: {result.stderr}")
-            return False
+            report.update(method="encode", error=result.stderr)
+        return report
 
     except Exception as e:
-        print(f"Error during conversion: {str(e)}")
-        return False
+        report["error"] = str(e)
+        return report
+    finally:
+        report["seconds"] = round(time.monotonic() - started, 3)
+
+
+def describe(report):
+    """One-line human readable result of extract_audio"""
+    if report["status"] != "ok":
+        return f"Error during conversion: {report['error']}"
+    if report["method"] == "copy":
+        return f"Conversion completed: {report['output']} (stream copy, {report['codec']})"
+    if report["method"] == "pcm":
+        return f"Conversion completed: {report['output']} (decoded {report['codec'] or 'unknown'} -> PCM)"
+    return (f"Conversion completed: {report['output']} "
+            f"(encoded {report['codec'] or 'unknown'} -> {os.path.splitext(report['output'])[1][1:]})")
+
+
+def convert_mp4_to_mp3(input_file, output_file="output.mp3", target="mp3", pipe_format=None):
+    print(f"Converting {input_file} to {output_file}...")
+    report = extract_audio(input_file, output_file, target, pipe_format)
+    print(describe(report))
+    return report["status"] == "ok"
+
+
+def collect_inputs(sources, recursive=False):
+    """
+    Expand files, directories and glob patterns into (input file, root) pairs.
+    root is the directory the file's relative output location is based on.
+    """
+    found = []
+    for source in sources:
+        if os.path.isdir(source):
+            if recursive:
+                for dirpath, dirnames, filenames in os.walk(source):
+                    dirnames.sort()
+                    for name in sorted(filenames):
+                        if name.lower().endswith(".mp4"):
+                            found.append((os.path.join(dirpath, name), source))
+            else:
+                for name in sorted(os.listdir(source)):
+                    path = os.path.join(source, name)
+                    if name.lower().endswith(".mp4") and os.path.isfile(path):
+                        found.append((path, source))
+        elif glob.has_magic(source):
+            # Mirror below the part of the pattern that has no wildcards
+            root = source
+            while glob.has_magic(root):
+                root = os.path.dirname(root)
+            for path in sorted(glob.glob(source, recursive=True)):
+                if os.path.isfile(path) and path.lower().endswith(".mp4"):
+                    found.append((path, root or "."))
+        else:
+            found.append((source, os.path.dirname(source) or "."))
+
+    # A file reachable through several sources is converted once
+    seen = set()
+    unique = []
+    for path, root in found:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append((path, root))
+    return unique
+
+
+def output_stem_for(input_file, root, output_dir):
+    """Output path without extension, mirroring input_file's location below root into output_dir"""
+    stem = os.path.splitext(input_file)[0]
+    if output_dir is None:
+        return stem
+    return os.path.join(output_dir, os.path.relpath(stem, root))
+
+
+def output_path_for(input_file, root, output_dir, target):
+    """
+    Output path for input_file. 'auto' probes the input, since its extension
+    depends on whether the audio is copied to m4a or mp3.
+    """
+    if target == "auto":
+        target, _ = choose_target(probe_audio_codec(input_file), "auto")
+    return output_stem_for(input_file, root, output_dir) + TARGETS[target]["ext"]
+
+
+def find_output_collisions(inputs, output_dir=None):
+    """
+    Groups of inputs that would be written to the same output, e.g. a/x.mp4
+    and b/x.mp4 given as files with one --output-dir. Compared without the
+    extension, so the result doesn't depend on what 'auto' picks.
+    """
+    by_output = {}
+    for input_file, root in inputs:
+        key = os.path.normcase(os.path.abspath(output_stem_for(input_file, root, output_dir)))
+        by_output.setdefault(key, []).append(input_file)
+    return [files for files in by_output.values() if len(files) > 1]
+
+
+def convert_batch(inputs, output_dir=None, target="mp3", jobs=1, skip_existing=False):
+    """
+    Extract audio from many MP4s with a bounded pool of concurrent ffmpeg
+    processes. Progress is printed in input order. Returns the list of
+    per-file reports.
+    """
+    jobs = max(1, min(jobs, len(inputs)))
+    total = len(inputs)
+
+    def job(item):
+        input_file, root = item
+        if skip_existing:
+            output_file = output_path_for(input_file, root, output_dir, target)
+        else:
+            # extract_audio corrects the extension once it knows the codec
+            output_file = output_stem_for(input_file, root, output_dir) + TARGETS.get(target, TARGETS["mp3"])["ext"]
+        if skip_existing and os.path.exists(output_file):
+            return {"input": input_file, "output": output_file, "status": "skipped",
+                    "method": None, "codec": None, "seconds": 0.0, "error": None}
+        return extract_audio(input_file, output_file, target)
+
+    reports = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool, ffmpeg_jobs.cancel_on_interrupt():
+        # map() yields results in submission order, which keeps the log ordered
+        for idx, report in enumerate(pool.map(job, inputs), start=1):
+            if report["status"] == "skipped":
+                print(f"[{idx}/{total}] Skipped: {report['output']} (already exists)")
+            else:
+                print(f"[{idx}/{total}] {report['input']}: {describe(report)}")
+            reports.append(report)
+    return reports
+
+
+def write_report(reports, report_file):
+    """Write per-file results and totals as JSON"""
+    summary = {"total": len(reports)}
+    for key in ("ok", "skipped", "failed"):
+        summary[key] = sum(1 for r in reports if r["status"] == key)
+    for method in ("copy", "encode"):
+        summary[method] = sum(1 for r in reports if r["status"] == "ok" and r["method"] == method)
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "files": reports}, f, indent=2)
+    return summary
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 mp4_to_mp3_converter.py input.mp4")
+    parser = argparse.ArgumentParser(
+        description="Extract the audio track of MP4 files, stream-copying it when possible"
+    )
+    parser.add_argument(
+        "inputs", nargs="+",
+        help="MP4 files, directories or glob patterns (quote patterns, '**' is recursive), "
+             "or - to read a single MP4 stream from stdin",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Output file when converting a single input, or - for stdout "
+             "(default: input name with the new extension; stdout for stdin input)",
+    )
+    parser.add_argument(
+        "--pipe-format", choices=sorted(PIPE_FORMATS),
+        help="Decode to 16-bit PCM in this format instead of MP3/M4A, "
+             "e.g. to pipe into audio_silence_cutter.py or split_it.py",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Write outputs here, mirroring the source layout (default: next to each input)",
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true",
+        help="Search directories recursively for .mp4 files",
+    )
+    parser.add_argument(
+        "--format", choices=["mp3", "m4a", "auto"], default="mp3",
+        help="Output format. MP3 sources are copied to mp3 and AAC sources to m4a "
+             "without re-encoding; 'auto' picks whichever allows a copy (default: mp3)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count() or 1,
+        help="Number of files processed concurrently (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--skip-existing", action="store_true",
+        help="Skip inputs whose output file already exists",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=None,
+        help="Give up on a file after this many seconds (default: no limit)",
+    )
+    parser.add_argument(
+        "--retries", type=int, default=0,
+        help="Retry files that time out or fail with a transient I/O error (default: 0)",
+    )
+    parser.add_argument(
+        "--report",
+        help="Write a JSON report of every file (status, copy/encode, timing) to this path",
+    )
+    args = parser.parse_args()
+
+    ffmpeg_jobs.configure(timeout=args.timeout, retries=args.retries)
+
+    inputs = collect_inputs(args.inputs, args.recursive)
+    if not inputs:
+        print("No MP4 files found.")
+        sys.exit(1)
+
+    if "-" in args.inputs:
+        if len(args.inputs) != 1:
+            print("Error: - (stdin) can't be combined with other inputs.")
+            sys.exit(1)
+        args.output = args.output or "-"
+
+    if args.output:
+        if len(inputs) != 1:
+            print("Error: --output can only be used with a single input file; use --output-dir.")
+            sys.exit(1)
+        if args.output == "-":
+            # stdout carries the audio; keep our messages on stderr
+            with redirect_stdout(sys.stderr):
+                ok = convert_mp4_to_mp3(inputs[0][0], "-", args.format, args.pipe_format)
+        else:
+            ok = convert_mp4_to_mp3(inputs[0][0], args.output, args.format, args.pipe_format)
+        sys.exit(0 if ok else 1)
+
+    if args.pipe_format:
+        print("Error: --pipe-format requires a single input written to stdout (-o -).")
         sys.exit(1)
 
-    input_file = sys.argv[1]
-    convert_mp4_to_mp3(input_file)
+    collisions = find_output_collisions(inputs, args.output_dir)
+    if collisions:
+        print("Error: these inputs would overwrite each other's output:")
+        for files in collisions:
+            print("  " + ", ".join(files))
+        print("Pass their common parent directory (with -r) so --output-dir mirrors the layout, "
+              "or convert them separately.")
+        sys.exit(1)
+
+    reports = convert_batch(inputs, args.output_dir, args.format, args.jobs, args.skip_existing)
+
+    failed = sum(1 for r in reports if r["status"] == "failed")
+    copied = sum(1 for r in reports if r["status"] == "ok" and r["method"] == "copy")
+    encoded = sum(1 for r in reports if r["status"] == "ok" and r["method"] == "encode")
+    print(f"Done. {copied} copied, {encoded} encoded, "
+          f"{len(reports) - copied - encoded - failed} skipped, {failed} failed.")
+
+    if args.report:
+        write_report(reports, args.report)
+        print(f"Report written to {args.report}")
+
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Asyncio job runner for ffmpeg/ffprobe invocations.
+
+Features:
+  - bounded concurrency (a semaphore shared by all submitted jobs)
+  - per-job timeouts
+  - stderr streamed into a ring buffer of the last N lines, with an optional
+    per-line callback for callers that parse ffmpeg's log (e.g. silencedetect)
+  - clean cancellation: children get SIGINT so ffmpeg can finalize its
+    output, and are killed if they don't exit within a grace period
+  - retry with exponential backoff for transient failures
+
+Async code awaits JobRunner.run() directly. Blocking scripts use the module
+level run_ffmpeg(), which submits to a shared runner whose event loop lives
+in a background thread, so worker threads can submit concurrently:
+
+    import ffmpeg_jobs
+    result = ffmpeg_jobs.run_ffmpeg(["ffmpeg", "-i", "in.m4a", "out.wav"], timeout=600)
+    if not result.ok:
+        print(result.stderr)
+
+On KeyboardInterrupt, call ffmpeg_jobs.cancel_all() (or wrap the work in
+`with ffmpeg_jobs.cancel_on_interrupt():`) to stop every running child.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import random
+import re
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Iterable, List, Optional, Set, Union
+
+DEFAULT_STDERR_LINES = 200
+
+# Caps the children the shared runner runs at once, across every script's
+# worker pools (e.g. FFMPEG_MAX_JOBS=2 on a shared machine); unset = no cap
+MAX_JOBS_ENV = "FFMPEG_MAX_JOBS"
+
+# Seconds a child gets to exit after SIGINT before it is killed
+CANCEL_GRACE_SECONDS = 5.0
+
+# Partial stderr lines longer than this are flushed as a line of their own
+MAX_LINE_BYTES = 64 * 1024
+
+# stderr messages that indicate a failure worth retrying
+TRANSIENT_PATTERNS = re.compile(
+    r"Resource temporarily unavailable|Connection reset by peer|Connection timed out"
+    r"|Connection refused|Input/output error|Too many open files|Stale file handle"
+    r"|Server returned 5\d\d",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class JobResult:
+    """Outcome of one command, shaped like subprocess.CompletedProcess."""
+
+    args: List[str]
+    returncode: Optional[int]
+    stdout: Union[str, bytes, None] = None
+    stderr_tail: List[str] = field(default_factory=list)
+    attempts: int = 1
+    elapsed: float = 0.0
+    timed_out: bool = False
+    cancelled: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    @property
+    def stderr(self) -> str:
+        """The last lines of stderr kept in the ring buffer."""
+        return "\n".join(self.stderr_tail)
+
+
+def is_transient(result: JobResult) -> bool:
+    """True if a failed result looks worth retrying."""
+    if result.cancelled or result.ok:
+        return False
+    if result.timed_out:
+        return True
+    return any(TRANSIENT_PATTERNS.search(line) for line in result.stderr_tail)
+
+
+async def _pump_stderr(
+    stream: asyncio.StreamReader,
+    ring: Deque[str],
+    on_line: Optional[Callable[[str], None]],
+) -> None:
+    """Read stderr into the ring buffer line by line (ffmpeg also uses \\r)."""
+    pending = b""
+    while True:
+        chunk = await stream.read(4096)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = re.split(rb"[\r\n]", pending)
+        if len(pending) > MAX_LINE_BYTES:
+            lines.append(pending)
+            pending = b""
+        for raw in lines:
+            if raw:
+                line = raw.decode("utf-8", errors="replace")
+                ring.append(line)
+                if on_line is not None:
+                    on_line(line)
+    if pending:
+        line = pending.decode("utf-8", errors="replace")
+        ring.append(line)
+        if on_line is not None:
+            on_line(line)
+
+
+async def _feed_stdin(proc: asyncio.subprocess.Process, data: bytes) -> None:
+    try:
+        proc.stdin.write(data)
+        await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        proc.stdin.close()
+
+
+class JobRunner:
+    """Runs commands as asyncio subprocesses with bounded concurrency."""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        retries: int = 0,
+        backoff: float = 1.0,
+        stderr_lines: int = DEFAULT_STDERR_LINES,
+    ):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.stderr_lines = stderr_lines
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._procs: Set[asyncio.subprocess.Process] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    # ---------- async API ----------
+
+    async def run(
+        self,
+        cmd: List[str],
+        *,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        on_stderr_line: Optional[Callable[[str], None]] = None,
+        capture_stdout: bool = False,
+        text: bool = True,
+        stdin_data: Optional[bytes] = None,
+        pass_stdin: bool = False,
+        pass_stdout: bool = False,
+    ) -> JobResult:
+        """
+        Run cmd, retrying transient failures with exponential backoff.
+        timeout and retries default to the runner's settings.
+        pass_stdin/pass_stdout hand this process's stdin/stdout to the child
+        directly, for tools streaming audio through pipes ("-" paths); such
+        jobs are never retried since the stream can't be replayed.
+        """
+        if self.max_concurrency and self._semaphore is None:
+            # Created lazily so it binds to the loop that actually runs the jobs
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        if pass_stdin or pass_stdout:
+            retries = 0
+        stdio = (capture_stdout, text, stdin_data, pass_stdin, pass_stdout)
+
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if self._semaphore is not None:
+                async with self._semaphore:
+                    result = await self._run_once(cmd, timeout, on_stderr_line, *stdio)
+            else:
+                result = await self._run_once(cmd, timeout, on_stderr_line, *stdio)
+            result.attempts = attempt
+            result.elapsed = time.monotonic() - started
+
+            if attempt > retries or not is_transient(result):
+                return result
+            delay = self.backoff * 2 ** (attempt - 1)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+    async def run_all(self, cmds: Iterable[List[str]], **kwargs) -> List[JobResult]:
+        """Run several commands concurrently; results are in input order."""
+        return list(await asyncio.gather(*(self.run(cmd, **kwargs) for cmd in cmds)))
+
+    async def _run_once(
+        self, cmd, timeout, on_stderr_line, capture_stdout, text, stdin_data, pass_stdin, pass_stdout
+    ):
+        ring: Deque[str] = deque(maxlen=self.stderr_lines)
+        # None inherits our own descriptor, so piped audio never passes through Python
+        if pass_stdin:
+            stdin = None
+        else:
+            stdin = subprocess.PIPE if stdin_data is not None else subprocess.DEVNULL
+        if pass_stdout:
+            stdout = None
+        else:
+            stdout = subprocess.PIPE if capture_stdout else subprocess.DEVNULL
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdin=stdin, stdout=stdout, stderr=subprocess.PIPE
+            )
+        except FileNotFoundError:
+            return JobResult(list(cmd), None, stderr_tail=[f"{cmd[0]} not found"])
+
+        self._procs.add(proc)
+        tasks = [asyncio.ensure_future(_pump_stderr(proc.stderr, ring, on_stderr_line))]
+        stdout_task = None
+        if capture_stdout:
+            stdout_task = asyncio.ensure_future(proc.stdout.read())
+            tasks.append(stdout_task)
+        if stdin_data is not None:
+            tasks.append(asyncio.ensure_future(_feed_stdin(proc, stdin_data)))
+
+        timed_out = cancelled = False
+        try:
+            await asyncio.wait_for(asyncio.gather(proc.wait(), *tasks), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            await self._stop(proc)
+        except asyncio.CancelledError:
+            cancelled = True
+            await self._stop(proc)
+            raise
+        finally:
+            self._procs.discard(proc)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        stdout = None
+        if stdout_task is not None and stdout_task.done() and not stdout_task.cancelled():
+            stdout = stdout_task.result()
+            if text:
+                stdout = stdout.decode("utf-8", errors="replace")
+        if timed_out:
+            ring.append(f"Timed out after {timeout} seconds")
+        return JobResult(
+            list(cmd), proc.returncode, stdout, list(ring),
+            timed_out=timed_out, cancelled=cancelled,
+        )
+
+    async def _stop(self, proc: asyncio.subprocess.Process) -> None:
+        """Ask a child to stop with SIGINT, killing it after the grace period."""
+        if proc.returncode is not None:
+            return
+        try:
+            if os.name == "nt":
+                proc.terminate()
+            else:
+                proc.send_signal(signal.SIGINT)
+            await asyncio.wait_for(asyncio.shield(proc.wait()), CANCEL_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+        except ProcessLookupError:
+            pass
+
+    # ---------- blocking bridge ----------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="ffmpeg-jobs", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def submit(self, cmd: List[str], **kwargs) -> concurrent.futures.Future:
+        """Schedule cmd on the runner's background loop; safe from any thread."""
+        return asyncio.run_coroutine_threadsafe(self.run(cmd, **kwargs), self._ensure_loop())
+
+    def run_sync(self, cmd: List[str], **kwargs) -> JobResult:
+        """Run cmd on the background loop and block until it finishes."""
+        future = self.submit(cmd, **kwargs)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            return JobResult(list(cmd), None, stderr_tail=["Cancelled"], cancelled=True)
+        except KeyboardInterrupt:
+            future.cancel()
+            raise
+
+    def cancel_all(self) -> None:
+        """Cancel every job running on the background loop (children get SIGINT)."""
+        loop = self._loop
+        if loop is None:
+            return
+
+        async def _cancel():
+            current = asyncio.current_task()
+            tasks = [t for t in asyncio.all_tasks() if t is not current]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(_cancel(), loop).result()
+
+
+_default_runner: Optional[JobRunner] = None
+_default_lock = threading.Lock()
+
+
+def max_jobs_from_env() -> Optional[int]:
+    """The FFMPEG_MAX_JOBS limit, or None if it is unset or not a positive number."""
+    value = os.environ.get(MAX_JOBS_ENV, "").strip()
+    try:
+        return max(0, int(value)) or None
+    except ValueError:
+        return None
+
+
+def get_runner() -> JobRunner:
+    """
+    The shared runner used by run_ffmpeg(). Unbounded unless FFMPEG_MAX_JOBS
+    is set or configure() is called.
+    """
+    global _default_runner
+    with _default_lock:
+        if _default_runner is None:
+            _default_runner = JobRunner(max_concurrency=max_jobs_from_env())
+        return _default_runner
+
+
+def configure(**settings) -> JobRunner:
+    """
+    Change the shared runner's defaults (max_concurrency, timeout, retries,
+    backoff, stderr_lines). Call before submitting work.
+    """
+    runner = get_runner()
+    for name, value in settings.items():
+        if not hasattr(runner, name) or name.startswith("_"):
+            raise TypeError(f"Unknown runner setting: {name}")
+        setattr(runner, name, value)
+    runner._semaphore = None
+    return runner
+
+
+def run_ffmpeg(cmd: List[str], **kwargs) -> JobResult:
+    """Run one command on the shared runner and wait for it (see JobRunner.run)."""
+    return get_runner().run_sync(cmd, **kwargs)
+
+
+def cancel_all() -> None:
+    """Stop every job on the shared runner."""
+    if _default_runner is not None:
+        _default_runner.cancel_all()
+
+
+@contextmanager
+def cancel_on_interrupt():
+    """Propagate Ctrl-C to running children before re-raising KeyboardInterrupt."""
+    try:
+        yield
+    except KeyboardInterrupt:
+        cancel_all()
+        raise
@@ -1,6 +1,15 @@
 #!/usr/bin/env python3
 """
-Batch rename files by removing "- Made with Clipchamp" from filenames.
+Batch rename files with regex/template rules. By default, removes
+"- Made with Clipchamp" from filenames.
+
+The directory is read in a single os.scandir pass and the whole rename
+plan is computed in memory before anything is touched. Two files mapping
+to the same name, or a name that is already taken, are reported and
+skipped. Chains and cycles (A -> B, B -> A) are ordered so that no file is
+ever overwritten, with cycles broken through a temporary name. Every run
+writes a journal of the renames it performs, which --undo replays in
+reverse.
 
 Usage examples:
   - Rename files in current directory:
@@ -14,18 +23,41 @@ Usage examples:
 
   - Force rename without confirmation:
       python file_renamer_script.py --force
+
+  - Regex rules (applied in order, re.sub replacement syntax):
+      python file_renamer_script.py --rule " +" "_" --rule "(?i)\\.WAV$" ".wav"
+
+  - Template (fields: name, stem, suffix, index), applied after the rules:
+      python file_renamer_script.py --pattern "*.wav" --template "clip_{index:06d}{suffix}"
+
+  - Undo the most recent run in a directory:
+      python file_renamer_script.py --input "path/to/files" --undo
 """
 
 from __future__ import annotations
 
 import argparse
+import fnmatch
+import json
+import os
+import re
 import sys
+from collections import Counter
+from datetime import datetime
 from pathlib import Path
 
+CLIPCHAMP_TEXT = "- Made with Clipchamp"
+
+JOURNAL_PREFIX = ".rename-journal-"
+
+# Planned renames listed before confirmation; the rest are summarized
+PREVIEW_LIMIT = 20
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
-        description="Remove '- Made with Clipchamp' text from all filenames in a directory."
+        description="Rename files in a directory with regex/template rules "
+        "(default: remove '- Made with Clipchamp' from all filenames)."
     )
     parser.add_argument(
         "--input",
@@ -39,6 +71,21 @@ def parse_args() -> argparse.Namespace:
         default="*",
         help="Glob pattern for input files (default: * for all files)",
     )
+    parser.add_argument(
+        "--rule",
+        nargs=2,
+        action="append",
+        metavar=("REGEX", "REPLACEMENT"),
+        help="Replace REGEX in each filename with REPLACEMENT (\\1 and \\g<name> refer to "
+        "groups); may be given several times and is applied in order",
+    )
+    parser.add_argument(
+        "--template",
+        type=str,
+        default=None,
+        help="New name built from {name}, {stem}, {suffix} and {index} (1-based, in name "
+        "order), applied after the rules, e.g. 'clip_{index:06d}{suffix}'",
+    )
     parser.add_argument(
         "--force",
         action="store_true",
@@ -49,116 +96,337 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Show what would be renamed without actually doing it",
     )
+    parser.add_argument(
+        "--undo",
+        nargs="?",
+        const="latest",
+        metavar="JOURNAL",
+        help="Revert the renames recorded in JOURNAL (default: the most recent journal "
+        "in the input directory)",
+    )
     return parser.parse_args()
 
 
-def remove_clipchamp_text(filename: str) -> str:
-    """Remove the specific Clipchamp text from a filename."""
-    target_text = "- Made with Clipchamp"
-    return filename.replace(target_text, "")
-
-
-def rename_file(file_path: Path, dry_run: bool = False) -> bool:
-    """Rename a single file by removing Clipchamp text. Returns True on success."""
-    original_name = file_path.name
-    target_text = "- Made with Clipchamp"
-    
-    # Skip if target text not in filename
-    if target_text not in original_name:
-        return True  # Not an error, just nothing to do
-    
-    new_name = remove_clipchamp_text(original_name)
-    
-    # Handle edge case where removal results in empty filename
-    if not new_name.strip():
-        sys.stderr.write(f"Error: '{original_name}' would result in empty filename\n")
-        return False
-    
-    new_path = file_path.parent / new_name
-    
-    # Check if target filename already exists
-    if new_path.exists() and new_path != file_path:
-        sys.stderr.write(f"Error: Cannot rename '{original_name}' -> '{new_name}' (target exists)\n")
-        return False
-    
-    if dry_run:
-        return True
-    
-    # Perform the rename
+def compile_rules(rules: list[list[str]] | None) -> list[tuple[re.Pattern, str]]:
+    """Compile --rule pairs; without any, remove the Clipchamp text."""
+    if not rules:
+        return [(re.compile(re.escape(CLIPCHAMP_TEXT)), "")]
+    return [(re.compile(pattern), replacement) for pattern, replacement in rules]
+
+
+def scan_directory(directory: Path, pattern: str) -> tuple[set[str], list[str]]:
+    """
+    Read the directory once. Returns every entry name (files, folders,
+    anything that can block a rename) and the sorted names of the files
+    matching pattern. Rename journals are never matched.
+    """
+    occupied = set()
+    files = []
+    matches = re.compile(fnmatch.translate(pattern)).match if pattern != "*" else None
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            occupied.add(name)
+            # is_file() uses the type from the directory listing, no stat
+            if (
+                entry.is_file()
+                and not name.startswith(JOURNAL_PREFIX)
+                and (matches is None or matches(name))
+            ):
+                files.append(name)
+    files.sort()
+    return occupied, files
+
+
+def new_name_for(
+    name: str, index: int, rules: list[tuple[re.Pattern, str]], template: str | None
+) -> str:
+    """Apply the rules, then the template, to one filename."""
+    for regex, replacement in rules:
+        name = regex.sub(replacement, name)
+    if template is not None:
+        stem, suffix = os.path.splitext(name)
+        name = template.format(name=name, stem=stem, suffix=suffix, index=index)
+    return name
+
+
+def invalid_name(name: str) -> str | None:
+    """Reason a computed name can't be used, or None."""
+    if not name.strip():
+        return "would result in empty filename"
+    if name in (".", "..") or "/" in name or "\0" in name or (os.altsep and os.altsep in name):
+        return f"'{name}' is not a valid filename"
+    return None
+
+
+def build_plan(
+    occupied: set[str], files: list[str], rules: list[tuple[re.Pattern, str]], template: str | None
+) -> tuple[dict[str, str], list[str]]:
+    """
+    Compute every rename in memory. Returns (moves, errors) where moves maps
+    old name -> new name for files whose name changes and errors describes
+    the files left alone because their new name is invalid or taken.
+    """
+    moves = {}
+    errors = []
+    for index, name in enumerate(files, start=1):
+        new_name = new_name_for(name, index, rules, template)
+        if new_name == name:
+            continue
+        reason = invalid_name(new_name)
+        if reason:
+            errors.append(f"'{name}' {reason}")
+            continue
+        moves[name] = new_name
+
+    # Several files mapping to one name: none of them is renamed
+    if len(set(moves.values())) != len(moves):
+        counts = Counter(moves.values())
+        for name, new_name in list(moves.items()):
+            if counts[new_name] > 1:
+                errors.append(
+                    f"Cannot rename '{name}' -> '{new_name}' ({counts[new_name]} files map to it)"
+                )
+                del moves[name]
+
+    # A target is free if nothing has that name or its file is itself being
+    # renamed away. Dropping a move keeps its file in place, which can take
+    # another move's target, so repeat until nothing changes.
+    while True:
+        blocked = [
+            name for name, new_name in moves.items() if new_name in occupied and new_name not in moves
+        ]
+        if not blocked:
+            break
+        for name in blocked:
+            errors.append(f"Cannot rename '{name}' -> '{moves[name]}' (target exists)")
+            del moves[name]
+    return moves, errors
+
+
+def temporary_name(name: str, occupied: set[str]) -> str:
+    """A free hidden name used to break a rename cycle."""
+    candidate = f".{name}.renaming-{os.getpid()}"
+    counter = 0
+    while candidate in occupied:
+        counter += 1
+        candidate = f".{name}.renaming-{os.getpid()}-{counter}"
+    occupied.add(candidate)
+    return candidate
+
+
+def order_moves(moves: dict[str, str], occupied: set[str]) -> list[tuple[str, str]]:
+    """
+    Order the renames so that each target is free when its rename runs.
+    Since no two files share a target, the moves form simple chains and
+    cycles. A chain runs from its free end backwards; a cycle first moves
+    one file to a temporary name.
+    """
+    steps = []
+    done = set()
+    for start in moves:
+        if start in done:
+            continue
+        chain = [start]
+        done.add(start)
+        target = moves[start]
+        # Follow the chain until a free target, an already-ordered rename
+        # (whose file will have moved away) or back to the start
+        while target in moves and target not in done:
+            chain.append(target)
+            done.add(target)
+            target = moves[target]
+
+        if target == start:
+            temp = temporary_name(start, occupied)
+            steps.append((start, temp))
+            for name in reversed(chain[1:]):
+                steps.append((name, moves[name]))
+            steps.append((temp, moves[start]))
+        else:
+            for name in reversed(chain):
+                steps.append((name, moves[name]))
+    return steps
+
+
+def write_journal(journal_path: Path, directory: Path, steps: list[tuple[str, str]]) -> None:
+    """Record the planned steps before executing them, so even an interrupted run can be undone."""
+    partial_path = journal_path.with_name(journal_path.name + ".partial")
+    with open(partial_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "directory": str(directory),
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "steps": steps,
+            },
+            f,
+            ensure_ascii=False,
+        )
+    os.replace(partial_path, journal_path)
+
+
+def rename_in(directory: Path):
+    """os.rename relative to an open directory fd where supported, else with full paths."""
+    if os.rename in os.supports_dir_fd:
+        dir_fd = os.open(directory, os.O_RDONLY)
+
+        def rename(src: str, dst: str) -> None:
+            os.rename(src, dst, src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+
+        return rename, lambda: os.close(dir_fd)
+
+    def rename(src: str, dst: str) -> None:
+        os.rename(directory / src, directory / dst)
+
+    return rename, lambda: None
+
+
+def execute_steps(directory: Path, steps: list[tuple[str, str]]) -> int:
+    """
+    Perform the renames in order. Stops at the first failure, since later
+    steps may depend on it. Returns the number of steps performed.
+    """
+    rename, close = rename_in(directory)
     try:
-        file_path.rename(new_path)
-        return True
-    except OSError as e:
-        sys.stderr.write(f"Error: Failed to rename '{original_name}': {e}\n")
-        return False
+        for done, (src, dst) in enumerate(steps):
+            try:
+                rename(src, dst)
+            except OSError as e:
+                sys.stderr.write(f"Error: Failed to rename '{src}' -> '{dst}': {e}\n")
+                return done
+        return len(steps)
+    finally:
+        close()
+
+
+def latest_journal(directory: Path) -> Path | None:
+    journals = sorted(p for p in directory.glob(JOURNAL_PREFIX + "*.json"))
+    return journals[-1] if journals else None
+
+
+def undo_journal(journal_path: Path) -> bool:
+    """
+    Revert the steps in a journal, newest first. Steps that never ran (for
+    an interrupted run) or were already reverted are skipped, judged from a
+    fresh listing of the directory. The journal is removed once everything
+    is reverted.
+    """
+    with open(journal_path, encoding="utf-8") as f:
+        journal = json.load(f)
+    directory = Path(journal["directory"])
+    occupied, _ = scan_directory(directory, "*")
+
+    reverted = skipped = 0
+    rename, close = rename_in(directory)
+    try:
+        for src, dst in reversed(journal["steps"]):
+            if dst not in occupied or src in occupied:
+                skipped += 1
+                continue
+            try:
+                rename(dst, src)
+            except OSError as e:
+                sys.stderr.write(f"Error: Failed to restore '{dst}' -> '{src}': {e}\n")
+                print(f"Undo stopped. {reverted} rename(s) reverted.")
+                return False
+            occupied.discard(dst)
+            occupied.add(src)
+            reverted += 1
+    finally:
+        close()
+
+    os.remove(journal_path)
+    print(f"Undo complete. {reverted} rename(s) reverted, {skipped} skipped.")
+    return True
 
 
 def main() -> None:
     args = parse_args()
-    
+
     input_dir: Path = args.input.resolve()
-    
+
     if not input_dir.exists() or not input_dir.is_dir():
         sys.stderr.write(f"Input directory does not exist or is not a directory: {input_dir}\n")
         sys.exit(1)
-    
-    # Get all files matching the pattern
-    all_files = sorted(input_dir.glob(args.pattern))
-    all_files = [p for p in all_files if p.is_file()]
-    
-    if not all_files:
+
+    if args.undo:
+        journal_path = latest_journal(input_dir) if args.undo == "latest" else Path(args.undo)
+        if journal_path is None or not journal_path.exists():
+            sys.stderr.write(f"No rename journal found ({args.undo if args.undo != 'latest' else input_dir})\n")
+            sys.exit(1)
+        print(f"Undoing renames recorded in {journal_path}")
+        if not undo_journal(journal_path):
+            sys.exit(1)
+        return
+
+    try:
+        rules = compile_rules(args.rule)
+    except re.error as e:
+        sys.stderr.write(f"Invalid --rule pattern: {e}\n")
+        sys.exit(1)
+    if args.template is not None:
+        try:
+            args.template.format(name="", stem="", suffix="", index=1)
+        except (KeyError, IndexError, ValueError) as e:
+            sys.stderr.write(f"Invalid --template: {e!r}\n")
+            sys.exit(1)
+
+    occupied, files = scan_directory(input_dir, args.pattern)
+
+    if not files:
         print(f"No files matched pattern '{args.pattern}' in {input_dir}")
         return
-    
-    # Filter files that actually contain the target text
-    target_text = "- Made with Clipchamp"
-    files_to_rename = [f for f in all_files if target_text in f.name]
-    
-    if not files_to_rename:
-        print(f"No files contain '{target_text}' in their names")
+
+    try:
+        moves, errors = build_plan(occupied, files, rules, args.template)
+    except re.error as e:
+        sys.stderr.write(f"Invalid --rule replacement: {e}\n")
+        sys.exit(1)
+    for error in errors:
+        sys.stderr.write(f"Error: {error}\n")
+
+    if not moves:
+        print(f"No files to rename among {len(files)} matching '{args.pattern}'")
         return
-    
-    print(f"Found {len(files_to_rename)} file(s) containing '{target_text}':")
-    
+
+    print(f"Found {len(moves)} file(s) to rename:")
+
     # Show preview of what will be renamed
-    for file_path in files_to_rename:
-        original_name = file_path.name
-        new_name = remove_clipchamp_text(original_name)
-        action = "WOULD RENAME" if args.dry_run else "WILL RENAME"
+    action = "WOULD RENAME" if args.dry_run else "WILL RENAME"
+    for original_name, new_name in list(moves.items())[:PREVIEW_LIMIT]:
         print(f"  {action}: '{original_name}' -> '{new_name}'")
-    
+    if len(moves) > PREVIEW_LIMIT:
+        print(f"  ... and {len(moves) - PREVIEW_LIMIT} more")
+
     if args.dry_run:
-        print(f"\nDry run complete. {len(files_to_rename)} files would be renamed.")
+        print(f"\nDry run complete. {len(moves)} files would be renamed.")
         return
-    
+
     # Confirm with user unless --force is specified
     if not args.force:
         try:
-            response = input(f"\nProceed with renaming {len(files_to_rename)} files? (y/N): ").lower().strip()
+            response = input(f"\nProceed with renaming {len(moves)} files? (y/N): ").lower().strip()
             if response not in ['y', 'yes']:
                 print("Operation cancelled.")
                 return
         except KeyboardInterrupt:
             print("\nOperation cancelled.")
             return
-    
+
     print()
-    
-    # Perform the renames
-    total = len(files_to_rename)
-    successes = 0
-    
-    for idx, file_path in enumerate(files_to_rename, start=1):
-        original_name = file_path.name
-        new_name = remove_clipchamp_text(original_name)
-        print(f"[{idx}/{total}] Renaming: {original_name} -> {new_name}")
-        
-        ok = rename_file(file_path, dry_run=False)
-        if ok:
-            successes += 1
-    
-    print(f"Done. {successes}/{total} files renamed.")
+
+    steps = order_moves(moves, occupied)
+    journal_path = input_dir / f"{JOURNAL_PREFIX}{datetime.now():%Y%m%d-%H%M%S-%f}.json"
+    write_journal(journal_path, input_dir, steps)
+
+    performed = execute_steps(input_dir, steps)
+    if performed < len(steps):
+        print(f"Stopped after {performed}/{len(steps)} steps. Revert with: --undo '{journal_path}'")
+        sys.exit(1)
+
+    print(f"Done. {len(moves)}/{len(moves)} files renamed.")
+    print(f"Journal written to {journal_path} (revert with --undo)")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
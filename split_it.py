@@ -6,9 +6,27 @@ Usage: python3 audio_splitter.py <input_file> [output_directory]
 
 import os
 import sys
+import math
+import mmap
+import struct
 import argparse
-from pydub import AudioSegment
-from pydub.silence import detect_silence
+
+try:
+    from pydub import AudioSegment
+    from pydub.silence import detect_silence
+except ImportError:
+    # Only needed for non-WAV input; the WAV path works on raw bytes
+    AudioSegment = None
+    detect_silence = None
+
+# WAV format codes (fmt chunk wFormatTag)
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Envelope resolution used when searching for silent split points
+ENVELOPE_BLOCK_MS = 10
+ENVELOPE_SAMPLES_PER_BLOCK = 64
 
 def get_file_size_mb(file_path):
     """Get file size in MB"""
@@ -67,6 +85,416 @@ def find_best_split_point(audio, start_ms, target_end_ms, silence_thresh=-50, mi
     # If no silence found, return target end point
     return target_end_ms
 
+def parse_wav_header(mm):
+    """
+    Parse a RIFF/RF64 WAV header from a mapped file.
+    Returns a dict with the raw fmt chunk, format fields and data byte range,
+    or None if the file is not PCM/float WAV that can be split by byte range.
+    """
+    if len(mm) < 12 or mm[8:12] != b"WAVE" or mm[0:4] not in (b"RIFF", b"RF64"):
+        return None
+
+    is_rf64 = mm[0:4] == b"RF64"
+    ds64_data_size = None
+    fmt_chunk = None
+    data_offset = None
+    data_size = None
+
+    pos = 12
+    while pos + 8 <= len(mm):
+        chunk_id = mm[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", mm, pos + 4)[0]
+        body = pos + 8
+
+        if chunk_id == b"ds64" and is_rf64:
+            ds64_data_size = struct.unpack_from("<Q", mm, body + 8)[0]
+        elif chunk_id == b"fmt ":
+            fmt_chunk = bytes(mm[body:body + chunk_size])
+        elif chunk_id == b"data":
+            data_offset = body
+            if chunk_size == 0xFFFFFFFF and ds64_data_size is not None:
+                data_size = ds64_data_size
+            else:
+                data_size = chunk_size
+            # Streaming writers leave the size unset; trust the file length
+            if data_size == 0 or data_offset + data_size > len(mm):
+                data_size = len(mm) - data_offset
+            break
+
+        pos = body + chunk_size + (chunk_size & 1)
+
+    if fmt_chunk is None or data_offset is None:
+        return None
+
+    info = parse_fmt_chunk(fmt_chunk)
+    if info is None:
+        return None
+    info["data_offset"] = data_offset
+    info["num_frames"] = data_size // info["block_align"]
+    return info
+
+def parse_fmt_chunk(fmt_chunk):
+    """
+    Decode a WAV fmt chunk into the format fields used for splitting, or
+    None if the samples can't be split by byte range.
+    """
+    if len(fmt_chunk) < 16:
+        return None
+
+    format_tag, channels, sample_rate, _, block_align, bits = struct.unpack_from(
+        "<HHIIHH", fmt_chunk
+    )
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_chunk) >= 26:
+        # First two bytes of the SubFormat GUID carry the real format code
+        format_tag = struct.unpack_from("<H", fmt_chunk, 24)[0]
+
+    sample_formats = {
+        (WAVE_FORMAT_PCM, 8): "B",
+        (WAVE_FORMAT_PCM, 16): "h",
+        (WAVE_FORMAT_PCM, 32): "i",
+        (WAVE_FORMAT_IEEE_FLOAT, 32): "f",
+        (WAVE_FORMAT_IEEE_FLOAT, 64): "d",
+    }
+    sample_format = sample_formats.get((format_tag, bits))
+    if sample_format is None or channels == 0 or block_align != channels * bits // 8:
+        return None
+
+    return {
+        "fmt_chunk": fmt_chunk,
+        "sample_format": sample_format,
+        "channels": channels,
+        "sample_rate": sample_rate,
+        "bits": bits,
+        "block_align": block_align,
+    }
+
+def read_wav_stream_header(stream):
+    """
+    Read a RIFF/RF64 WAV header from a non-seekable stream, stopping at the
+    start of the data chunk. Returns the parse_fmt_chunk() fields, or None
+    if the stream is not splittable WAV. The data size is not trusted, since
+    writers streaming to a pipe can't fill it in; data runs until EOF.
+    """
+    riff = stream.read(12)
+    if len(riff) < 12 or riff[8:12] != b"WAVE" or riff[0:4] not in (b"RIFF", b"RF64"):
+        return None
+
+    fmt_chunk = None
+    while True:
+        chunk_header = stream.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id = chunk_header[0:4]
+        chunk_size = struct.unpack_from("<I", chunk_header, 4)[0]
+        if chunk_id == b"data":
+            break
+        body = stream.read(chunk_size + (chunk_size & 1))
+        if chunk_id == b"fmt ":
+            fmt_chunk = body[:chunk_size]
+
+    if fmt_chunk is None:
+        return None
+    return parse_fmt_chunk(fmt_chunk)
+
+def compute_envelope(samples, info, start_frame, end_frame):
+    """
+    Compute a peak envelope in dBFS over [start_frame, end_frame) of the mapped
+    samples, one value per ENVELOPE_BLOCK_MS block. Only every n-th frame is
+    inspected, so only a fraction of the search window is ever read.
+    """
+    channels = info["channels"]
+    frames_per_block = max(1, info["sample_rate"] * ENVELOPE_BLOCK_MS // 1000)
+    stride = max(1, frames_per_block // ENVELOPE_SAMPLES_PER_BLOCK)
+
+    if info["sample_format"] in ("f", "d"):
+        offset, full_scale = 0.0, 1.0
+    elif info["sample_format"] == "B":
+        offset, full_scale = 128, 128  # 8-bit WAV is unsigned
+    else:
+        offset, full_scale = 0, 2 ** (info["bits"] - 1)
+
+    envelope = []
+    for block_start in range(start_frame, end_frame, frames_per_block):
+        block_end = min(block_start + frames_per_block, end_frame)
+        peak = 0
+        for ch in range(channels):
+            seg = samples[block_start * channels + ch:block_end * channels:stride * channels]
+            if len(seg):
+                peak = max(peak, max(seg) - offset, offset - min(seg))
+        envelope.append(20 * math.log10(peak / full_scale) if peak > 0 else -math.inf)
+
+    return envelope, frames_per_block
+
+def find_silent_ranges(envelope, block_ms, min_silence_len, silence_thresh):
+    """Return (start_block, end_block) runs of the envelope below silence_thresh"""
+    min_blocks = max(1, min_silence_len // block_ms)
+    ranges = []
+    run_start = None
+    for i, level in enumerate(envelope + [math.inf]):
+        if level < silence_thresh:
+            if run_start is None:
+                run_start = i
+        elif run_start is not None:
+            if i - run_start >= min_blocks:
+                ranges.append((run_start, i))
+            run_start = None
+    return ranges
+
+def find_wav_split_point(samples, info, start_frame, target_end_frame,
+                         silence_thresh=-50, min_silence_len=500):
+    """
+    WAV counterpart of find_best_split_point, working in frames on the mapped
+    samples instead of a decoded AudioSegment.
+    """
+    rate = info["sample_rate"]
+    # Same ±10% / 30 second search window as the pydub path
+    search_window = min(30 * rate, int((target_end_frame - start_frame) * 0.1))
+    search_start = max(start_frame, target_end_frame - search_window)
+    search_end = min(info["num_frames"], target_end_frame + search_window)
+
+    envelope, frames_per_block = compute_envelope(samples, info, search_start, search_end)
+
+    silent_ranges = find_silent_ranges(envelope, ENVELOPE_BLOCK_MS, min_silence_len, silence_thresh)
+    if not silent_ranges:
+        # If no silence found, try with more lenient parameters
+        silent_ranges = find_silent_ranges(envelope, ENVELOPE_BLOCK_MS, 200, silence_thresh + 10)
+
+    if not silent_ranges:
+        return target_end_frame
+
+    best_split = target_end_frame
+    min_distance = float('inf')
+    for silence_start, silence_end in silent_ranges:
+        # Use middle of silence range
+        silence_middle = search_start + (silence_start + silence_end) * frames_per_block // 2
+        distance = abs(silence_middle - target_end_frame)
+        if distance < min_distance:
+            min_distance = distance
+            best_split = silence_middle
+
+    return min(max(best_split, start_frame + 1), info["num_frames"])
+
+def build_wav_header(fmt_chunk, data_size, block_align):
+    """
+    Build a RIFF header for a data chunk of data_size bytes, switching to RF64
+    (with a ds64 chunk) when the sizes no longer fit in 32 bits.
+    """
+    pad = data_size & 1
+    fmt = b"fmt " + struct.pack("<I", len(fmt_chunk)) + fmt_chunk
+    riff_size = 4 + len(fmt) + 8 + data_size + pad
+
+    if riff_size <= 0xFFFFFFFF:
+        return (b"RIFF" + struct.pack("<I", riff_size) + b"WAVE" + fmt
+                + b"data" + struct.pack("<I", data_size))
+
+    riff_size += 8 + 28  # ds64 chunk
+    ds64 = b"ds64" + struct.pack("<IQQQI", 28, riff_size, data_size,
+                                 data_size // block_align, 0)
+    return (b"RF64" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE" + ds64 + fmt
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+def copy_byte_range(src_fd, dst_fd, offset, count):
+    """
+    Copy count bytes starting at offset from src_fd to the current position of
+    dst_fd in the kernel, preferring copy_file_range, then sendfile, then a
+    plain read/write loop.
+    """
+    copy_file_range = getattr(os, "copy_file_range", None)
+    sendfile = getattr(os, "sendfile", None)
+
+    while count > 0:
+        n = 0
+        if copy_file_range is not None:
+            try:
+                n = copy_file_range(src_fd, dst_fd, count, offset_src=offset)
+            except OSError:
+                copy_file_range = None  # e.g. EXDEV/ENOSYS; try the next method
+                continue
+        elif sendfile is not None:
+            try:
+                n = sendfile(dst_fd, src_fd, offset, count)
+            except OSError:
+                sendfile = None  # e.g. non-socket output on macOS
+                continue
+        else:
+            data = os.pread(src_fd, min(count, 1024 * 1024), offset)
+            n = os.write(dst_fd, data)
+
+        if n == 0:
+            raise IOError("Unexpected end of input while copying WAV data")
+        offset += n
+        count -= n
+
+def split_wav_file(input_file, output_dir, target_size_mb=25.0):
+    """
+    Split a PCM WAV file into chunks of approximately target_size_mb without
+    decoding it. Split points come from a strided envelope over the mapped
+    samples and each chunk is a fresh header plus a kernel-side copy of the
+    original data bytes. Returns None if the file cannot be handled here.
+    """
+    with open(input_file, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = samples = None
+        try:
+            info = parse_wav_header(mm)
+            if info is None:
+                return None
+
+            channels = info["channels"]
+            block_align = info["block_align"]
+            rate = info["sample_rate"]
+            num_frames = info["num_frames"]
+            data_offset = info["data_offset"]
+
+            itemsize = struct.calcsize(info["sample_format"])
+            data = memoryview(mm)[data_offset:data_offset + num_frames * block_align]
+            samples = data.cast(info["sample_format"])
+
+            print(f"Original file size: {get_file_size_mb(input_file):.2f} MB")
+            print(f"Audio duration: {num_frames / rate:.2f} seconds")
+            print(f"Audio format: {rate} Hz, {channels} channels, {itemsize * 8} bit")
+
+            target_frames = max(1, int(target_size_mb * 1024 * 1024) // block_align)
+            num_chunks = -(-num_frames // target_frames)
+            print(f"Estimated chunks needed: {num_chunks}")
+
+            os.makedirs(output_dir, exist_ok=True)
+            file_extension = os.path.splitext(input_file)[1]
+
+            chunk_num = 1
+            start_frame = 0
+            while start_frame < num_frames:
+                print(f"\nProcessing chunk {chunk_num}...")
+
+                target_end_frame = min(start_frame + target_frames, num_frames)
+
+                # If this is the last chunk or we're close to the end, take everything remaining
+                if target_end_frame >= num_frames - 5 * rate:  # Within 5 seconds of end
+                    end_frame = num_frames
+                else:
+                    # Find the best split point at a silent moment
+                    end_frame = find_wav_split_point(samples, info, start_frame, target_end_frame)
+
+                output_filename = f"part{chunk_num}{file_extension}"
+                output_path = os.path.join(output_dir, output_filename)
+                chunk_bytes = (end_frame - start_frame) * block_align
+
+                try:
+                    with open(output_path, "wb") as out:
+                        out.write(build_wav_header(info["fmt_chunk"], chunk_bytes, block_align))
+                        out.flush()
+                        copy_byte_range(f.fileno(), out.fileno(),
+                                        data_offset + start_frame * block_align, chunk_bytes)
+                        if chunk_bytes & 1:
+                            os.write(out.fileno(), b"\x00")
+
+                    print(f"Saved: {output_filename}")
+                    print(f"  Size: {get_file_size_mb(output_path):.2f} MB")
+                    print(f"  Duration: {(end_frame - start_frame) / rate:.2f} seconds")
+                    print(f"  Time range: {start_frame / rate:.2f}s - {end_frame / rate:.2f}s")
+
+                except OSError as e:
+                    print(f"Error exporting chunk {chunk_num}: {e}")
+                    return False
+
+                start_frame = end_frame
+                chunk_num += 1
+
+                # Safety check to avoid infinite loop
+                if chunk_num > 1000:
+                    print("Error: Too many chunks generated. Stopping.")
+                    break
+
+            print(f"\nSplitting complete! Created {chunk_num - 1} chunks in '{output_dir}'")
+            return True
+        finally:
+            # Views must be released before the map can be closed
+            for view in (samples, data):
+                if view is not None:
+                    view.release()
+            mm.close()
+
+def split_wav_stream(stream, output_dir, target_size_mb=25.0):
+    """
+    Split a PCM WAV stream (e.g. stdin at the end of a pipe) into chunks of
+    approximately target_size_mb. Only the current chunk plus the silence
+    search window is buffered; each chunk is written as soon as its split
+    point is known. Returns None if the stream is not splittable WAV.
+    """
+    info = read_wav_stream_header(stream)
+    if info is None:
+        return None
+
+    channels = info["channels"]
+    block_align = info["block_align"]
+    rate = info["sample_rate"]
+    itemsize = struct.calcsize(info["sample_format"])
+    print(f"Audio format: {rate} Hz, {channels} channels, {itemsize * 8} bit")
+
+    target_frames = max(1, int(target_size_mb * 1024 * 1024) // block_align)
+    # Buffer enough past the target for the silence search and the
+    # "within 5 seconds of the end" rule
+    search_window = min(30 * rate, int(target_frames * 0.1))
+    buffer_frames = target_frames + max(search_window, 5 * rate)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    buf = bytearray()
+    eof = False
+    chunk_num = 1
+    position = 0  # frames written so far
+    while True:
+        while not eof and len(buf) < buffer_frames * block_align:
+            data = stream.read(min(1024 * 1024, buffer_frames * block_align - len(buf)))
+            if not data:
+                eof = True
+            buf += data
+
+        available = len(buf) // block_align
+        if available == 0:
+            break
+
+        print(f"\nProcessing chunk {chunk_num}...")
+        if eof and available <= target_frames + 5 * rate:
+            end_frame = available
+        else:
+            # Find the best split point at a silent moment
+            view = memoryview(buf)[:available * block_align]
+            samples = view.cast(info["sample_format"])
+            try:
+                end_frame = find_wav_split_point(
+                    samples, dict(info, num_frames=available), 0, target_frames
+                )
+            finally:
+                # The buffer can't be resized while views are exported
+                samples.release()
+                view.release()
+
+        output_filename = f"part{chunk_num}.wav"
+        output_path = os.path.join(output_dir, output_filename)
+        chunk_bytes = end_frame * block_align
+        try:
+            with open(output_path, "wb") as out, memoryview(buf) as view:
+                out.write(build_wav_header(info["fmt_chunk"], chunk_bytes, block_align))
+                out.write(view[:chunk_bytes])
+                if chunk_bytes & 1:
+                    out.write(b"\x00")
+        except OSError as e:
+            print(f"Error exporting chunk {chunk_num}: {e}")
+            return False
+
+        print(f"Saved: {output_filename}")
+        print(f"  Size: {get_file_size_mb(output_path):.2f} MB")
+        print(f"  Duration: {end_frame / rate:.2f} seconds")
+        print(f"  Time range: {position / rate:.2f}s - {(position + end_frame) / rate:.2f}s")
+
+        del buf[:chunk_bytes]
+        position += end_frame
+        chunk_num += 1
+
+    print(f"\nSplitting complete! Created {chunk_num - 1} chunks in '{output_dir}'")
+    return True
+
 def split_audio_file(input_file, output_dir, target_size_mb=25.0):
     """
     Split audio file into chunks of approximately target_size_mb
@@ -160,7 +588,7 @@ def main():
         description="Split large audio files into ~25MB chunks at silent points",
         epilog="Example: python3 audio_splitter.py input.wav ./output_chunks"
     )
-    parser.add_argument("input_file", help="Path to the input audio file")
+    parser.add_argument("input_file", help="Path to the input audio file, or - to read WAV from stdin")
     parser.add_argument("output_dir", nargs="?", default="./chunks", 
                        help="Output directory for chunks (default: ./chunks)")
     parser.add_argument("--size", type=float, default=25.0, 
@@ -168,6 +596,18 @@ def main():
     
     args = parser.parse_args()
     
+    # Piped WAV is split as it streams in, without a temporary file
+    if args.input_file == "-":
+        success = split_wav_stream(sys.stdin.buffer, args.output_dir, args.size)
+        if success is None:
+            print("Error: stdin must be PCM or float WAV (e.g. --pipe-format wav upstream)")
+            sys.exit(1)
+        if not success:
+            print("✗ Audio splitting failed!")
+            sys.exit(1)
+        print("✓ Audio splitting completed successfully!")
+        return
+    
     # Validate input file
     if not os.path.isfile(args.input_file):
         print(f"Error: Input file '{args.input_file}' does not exist")
@@ -180,10 +620,21 @@ def main():
         print("No splitting needed.")
         sys.exit(0)
     
+    # PCM WAV input is split by byte range without decoding
+    if args.input_file.lower().endswith(".wav"):
+        print(f"Splitting WAV by byte range: {args.input_file}")
+        success = split_wav_file(args.input_file, args.output_dir, args.size)
+        if success is not None:
+            if success:
+                print("✓ Audio splitting completed successfully!")
+            else:
+                print("✗ Audio splitting failed!")
+                sys.exit(1)
+            return
+        print("WAV encoding not supported for byte-range splitting, falling back to pydub")
+
     # Check if pydub is available
-    try:
-        import pydub
-    except ImportError:
+    if AudioSegment is None:
         print("Error: pydub library is required. Install it with:")
         print("pip install pydub")
         print("\nYou may also need ffmpeg:")
@@ -0,0 +1,73 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "H.264_MP4"))
+
+import h264_index  # noqa: E402
+
+# SPS and PPS of a 320x240, 25 fps x264 stream
+SPS = bytes.fromhex("67f4000d919b28283f6022000003000200000300641e28532c")
+PPS = bytes.fromhex("68ebe3c44844")
+
+
+def payload(rng, length):
+    # No zero bytes, so no start codes or zero runs by accident
+    return bytes(rng.randrange(1, 256) for _ in range(length))
+
+
+def build_stream(gops=3, gop_length=10):
+    """Annex-B stream of gops GOPs; returns (data, keyframe offsets)."""
+    rng = random.Random(0)
+    data = bytearray()
+    keyframes = []
+    for _ in range(gops):
+        keyframes.append(len(data))
+        for nal in (SPS, PPS, b"\x65\x88" + payload(rng, 300)):
+            data += b"\x00\x00\x00\x01" + nal
+        for _ in range(gop_length - 1):
+            data += b"\x00\x00\x01\x41\x9a" + payload(rng, 100)
+    return bytes(data), keyframes
+
+
+class IndexTest(unittest.TestCase):
+    def test_clean_stream(self):
+        data, keyframes = build_stream()
+        index = h264_index.index_data(data)
+        self.assertIsNone(index.damage)
+        self.assertIsNone(index.problem)
+        self.assertEqual(index.good_end, len(data))
+        self.assertEqual([offset for offset, _ in index.keyframes], keyframes)
+        self.assertEqual((index.width, index.height, index.fps), (320, 240, 25))
+        self.assertEqual(index.frames, 30)
+
+    def test_trailing_zero_bytes_are_allowed(self):
+        data, _ = build_stream()
+        index = h264_index.index_data(data + b"\x00" * 4)
+        self.assertIsNone(index.damage)
+        self.assertEqual(index.good_end, len(data) + 4)
+
+    def test_zero_filled_tail(self):
+        data, keyframes = build_stream()
+        index = h264_index.index_data(data + b"\x00" * 4096)
+        self.assertEqual(index.damage, "zero-filled data")
+        self.assertEqual(index.good_end, keyframes[-1])
+        self.assertEqual(h264_index.usable_frames(index), 20)
+
+    def test_garbage_tail(self):
+        data, keyframes = build_stream()
+        index = h264_index.index_data(data + payload(random.Random(1), 4096))
+        self.assertIsNotNone(index.damage)
+        self.assertEqual(index.good_end, keyframes[-1])
+        self.assertIsNone(index.problem)
+
+    def test_damage_in_first_gop_makes_the_file_unusable(self):
+        data, keyframes = build_stream(gops=1)
+        index = h264_index.index_data(data + b"\x00" * 4096)
+        self.assertEqual(index.good_end, 0)
+        self.assertIn("no complete GOP", index.problem)
+
+
+if __name__ == "__main__":
+    unittest.main()
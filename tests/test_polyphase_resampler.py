@@ -0,0 +1,68 @@
+import math
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "utilities"))
+
+from polyphase_resampler import (  # noqa: E402
+    COMMON_RATES,
+    PolyphaseResampler,
+    design_kernel,
+    rational_ratio,
+)
+
+# Quality limits, as fractions of the lower of the two Nyquist frequencies
+PASSBAND_EDGE = 0.8
+STOPBAND_EDGE = 1.0
+MAX_RIPPLE_DB = 0.01
+MIN_ATTENUATION_DB = 80.0
+
+
+def measure_response(orig_sr, target_sr):
+    """(passband ripple in dB, stopband attenuation in dB) of the kernel for orig_sr -> target_sr."""
+    up, down = rational_ratio(orig_sr, target_sr)
+    kernel = design_kernel(up, down) / up
+    size = 1 << int(np.ceil(np.log2(len(kernel) * 16)))
+    response = np.abs(np.fft.rfft(kernel, size))
+    freqs = np.arange(len(response)) * (orig_sr * up / size)
+    nyquist = min(orig_sr, target_sr) / 2
+
+    db = 20 * np.log10(np.maximum(response, 1e-12))
+    passband = db[freqs <= PASSBAND_EDGE * nyquist]
+    stopband = db[freqs >= STOPBAND_EDGE * nyquist]
+    return passband.max() - passband.min(), -stopband.max()
+
+
+def resample_in_blocks(audio, orig_sr, target_sr, block):
+    resampler = PolyphaseResampler(orig_sr, target_sr)
+    parts = [resampler.process(audio[i:i + block]) for i in range(0, len(audio), block)]
+    parts.append(resampler.flush())
+    return np.concatenate(parts)
+
+
+class KernelQualityTest(unittest.TestCase):
+    def test_passband_ripple_and_stopband_attenuation(self):
+        for orig_sr, target_sr in COMMON_RATES:
+            with self.subTest(orig_sr=orig_sr, target_sr=target_sr):
+                ripple, attenuation = measure_response(orig_sr, target_sr)
+                self.assertLessEqual(ripple, MAX_RIPPLE_DB)
+                self.assertGreaterEqual(attenuation, MIN_ATTENUATION_DB)
+
+
+class StreamingTest(unittest.TestCase):
+    def test_output_length_and_block_size_independence(self):
+        rng = np.random.default_rng(0)
+        for orig_sr, target_sr in COMMON_RATES:
+            audio = rng.uniform(-0.5, 0.5, orig_sr // 2 + 123).astype(np.float32)
+            with self.subTest(orig_sr=orig_sr, target_sr=target_sr):
+                whole = resample_in_blocks(audio, orig_sr, target_sr, len(audio))
+                blocks = resample_in_blocks(audio, orig_sr, target_sr, 1000)
+                self.assertEqual(len(whole), math.ceil(len(audio) * target_sr / orig_sr))
+                np.testing.assert_allclose(blocks, whole, atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
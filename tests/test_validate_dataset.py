@@ -0,0 +1,49 @@
+import json
+import os
+import struct
+import sys
+import tempfile
+import unittest
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "utilities"))
+
+from validate_dataset import validate_dataset  # noqa: E402
+
+
+def write_wav(path, frames=2205, rate=22050):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * frames)
+
+
+class TruncatedHeaderTest(unittest.TestCase):
+    def test_truncated_rf64_header_is_reported_not_raised(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wavs = os.path.join(tmp, "wavs")
+            os.mkdir(wavs)
+            write_wav(os.path.join(wavs, "good.wav"))
+            # RF64 header whose ds64 chunk claims 28 bytes but the file ends after 4
+            with open(os.path.join(wavs, "cut.wav"), "wb") as f:
+                f.write(b"RF64" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE")
+                f.write(b"ds64" + struct.pack("<I", 28) + b"\0" * 4)
+            metadata = os.path.join(tmp, "metadata.csv")
+            with open(metadata, "w", encoding="utf-8") as f:
+                f.write("good|Hello.|Hello.\ncut|World.|World.\n")
+
+            manifest = os.path.join(tmp, "manifest.jsonl")
+            summary = validate_dataset(metadata, wavs, manifest, 22050, 1, jobs=2)
+
+            self.assertEqual(summary["total"], 2)
+            self.assertEqual(summary["ok"], 1)
+            self.assertEqual(summary["unreadable"], 1)
+            with open(manifest, encoding="utf-8") as f:
+                entries = {e["audio"]: e for e in map(json.loads, f)}
+            self.assertEqual(entries["cut"]["problems"], ["unreadable"])
+            self.assertIn("ds64", entries["cut"]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Resampler Benchmark
+Compares the throughput of the polyphase resampler used by
+convert_audio_to_22k_mono.py with librosa.resample. Kernel quality
+(passband ripple, stopband attenuation) is checked by
+tests/test_polyphase_resampler.py.
+
+Usage:
+    python benchmark_resampler.py
+    python benchmark_resampler.py --seconds 300
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from polyphase_resampler import COMMON_RATES, PolyphaseResampler
+
+BLOCK_FRAMES = 65536
+
+
+def time_streaming(audio, orig_sr, target_sr):
+    start = time.perf_counter()
+    resampler = PolyphaseResampler(orig_sr, target_sr)
+    for i in range(0, len(audio), BLOCK_FRAMES):
+        resampler.process(audio[i:i + BLOCK_FRAMES])
+    resampler.flush()
+    return time.perf_counter() - start
+
+
+def time_librosa(audio, orig_sr, target_sr):
+    import librosa
+
+    start = time.perf_counter()
+    librosa.resample(audio, orig_sr=orig_sr, target_sr=target_sr)
+    return time.perf_counter() - start
+
+
+def benchmark(seconds, rates=COMMON_RATES):
+    try:
+        import librosa  # noqa: F401
+    except ImportError:
+        librosa = None
+        print("librosa not installed; timing the polyphase resampler only")
+
+    print(f"Throughput on {seconds:g}s of noise (x realtime)")
+    print(f"  {'conversion':<16} {'polyphase':>10} {'librosa':>10}")
+    rng = np.random.default_rng(0)
+    for orig_sr, target_sr in rates:
+        audio = rng.uniform(-0.5, 0.5, int(seconds * orig_sr)).astype(np.float32)
+        # Warm up both paths so one-off setup isn't timed
+        time_streaming(audio[:orig_sr], orig_sr, target_sr)
+        polyphase = seconds / time_streaming(audio, orig_sr, target_sr)
+        reference = "-"
+        if librosa is not None:
+            time_librosa(audio[:orig_sr], orig_sr, target_sr)
+            reference = f"{seconds / time_librosa(audio, orig_sr, target_sr):>10.0f}"
+        print(f"  {orig_sr:>6} -> {target_sr:<6} {polyphase:>10.0f} {reference:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the polyphase resampler against librosa.resample"
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=60.0, help="Length of the benchmark signal (default: 60)"
+    )
+    args = parser.parse_args()
+
+    benchmark(args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,100 @@
 """
 Audio Converter Script
 Converts WAV files to 22kHz mono format.
+
+Files are streamed in blocks: each block is downmixed, resampled through a
+stateful polyphase filter and written out before the next is read, so
+memory use does not grow with file length. Folders are converted by a pool
+of worker processes, each importing numpy/soundfile once.
+
+--prepare turns this into a one-pass TTS dataset preparation: each clip is
+decoded once, leading and trailing silence is trimmed, it is resampled to
+22kHz mono and its loudness is normalized (ITU-R BS.1770) to a target LUFS
+under a peak ceiling. --report writes per-clip durations, loudness and any
+clipped or near-silent clips as JSON.
 """
 
 import os
+import json
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-import librosa
-import soundfile as sf
+
+# Imported by load_dsp() on first use, so --help and empty folders don't pay
+# for the numpy/soundfile import
+np = None
+sf = None
+PolyphaseResampler = None
+
+TARGET_SR = 22050
+
+# Input frames read per block
+BLOCK_FRAMES = 65536
+
+# Upper bound on files handed to a worker at once; large folders of short
+# clips are dominated by per-task overhead otherwise
+MAX_CHUNKSIZE = 64
+
+# Defaults for --prepare
+TRIM_THRESHOLD_DB = -40.0  # peak level below which leading/trailing audio is silence
+TRIM_PAD_SECONDS = 0.1  # silence kept before the first and after the last sound
+TARGET_LUFS = -23.0
+PEAK_CEILING_DB = -1.0
+
+# Trim envelope resolution
+TRIM_BLOCK_MS = 10
+
+# Clips with at least this many full-scale input samples are flagged as clipped
+CLIPPED_SAMPLE_LEVEL = 0.999
+CLIPPED_MIN_SAMPLES = 3
+
+# Clips quieter than this (before normalization) are flagged as near-silent
+NEAR_SILENT_LUFS = -50.0
+
+# BS.1770 gating: 400 ms blocks with 75% overlap, absolute and relative gates
+LOUDNESS_BLOCK_SECONDS = 0.4
+LOUDNESS_OVERLAP = 0.75
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+
+def load_dsp():
+    """Import the DSP stack into the module globals (once per process)."""
+    global np, sf, PolyphaseResampler
+    if np is None:
+        import numpy
+        import soundfile
+        from polyphase_resampler import PolyphaseResampler as resampler_cls
+
+        np, sf, PolyphaseResampler = numpy, soundfile, resampler_cls
+
+
+def resolve_output_path(input_path, output_path=None, overwrite=False):
+    """Output file for input_path: itself, output_path, or a _converted copy."""
+    if overwrite:
+        return input_path
+    if output_path:
+        return output_path
+    # Create _converted suffix
+    input_path_obj = Path(input_path)
+    return str(
+        input_path_obj.parent / f"{input_path_obj.stem}_converted{input_path_obj.suffix}"
+    )
+
+
+def partial_path_for(output_file):
+    """
+    Temporary name next to the destination, renamed once complete, which
+    also lets --overwrite replace the file that is still being read.
+    """
+    output_obj = Path(output_file)
+    return str(output_obj.with_name(f".{output_obj.stem}.partial{output_obj.suffix}"))
 
 
 def convert_audio_file(input_path, output_path=None, overwrite=False):
     """
-    Convert a WAV file to 22kHz mono format.
+    Convert a WAV file to 22kHz mono format, streaming it block by block.
 
     Args:
         input_path (str): Path to the input WAV file
@@ -23,33 +105,27 @@ def convert_audio_file(input_path, output_path=None, overwrite=False):
     Returns:
         str: Path to the converted file
     """
+    load_dsp()
+    partial_file = None
     try:
-        # Load audio file
-        audio, sample_rate = librosa.load(input_path, sr=None, mono=False)
-
-        # Convert to mono if stereo
-        if len(audio.shape) > 1:
-            audio = librosa.to_mono(audio)
-
-        # Resample to 22kHz
-        if sample_rate != 22050:
-            audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=22050)
-
-        # Determine output path
-        if overwrite:
-            output_file = input_path
-        elif output_path:
-            output_file = output_path
-        else:
-            # Create _converted suffix
-            input_path_obj = Path(input_path)
-            output_file = str(
-                input_path_obj.parent
-                / f"{input_path_obj.stem}_converted{input_path_obj.suffix}"
-            )
-
-        # Save the converted audio
-        sf.write(output_file, audio, 22050)
+        output_file = resolve_output_path(input_path, output_path, overwrite)
+        partial_file = partial_path_for(output_file)
+
+        with sf.SoundFile(input_path) as source:
+            resampler = PolyphaseResampler(source.samplerate, TARGET_SR)
+            mono = np.empty(BLOCK_FRAMES, dtype=np.float32)
+            with sf.SoundFile(
+                partial_file, "w", samplerate=TARGET_SR, channels=1
+            ) as dest:
+                for block in source.blocks(BLOCK_FRAMES, dtype="float32", always_2d=True):
+                    # Downmix into a reused buffer
+                    frames = mono[:len(block)]
+                    np.mean(block, axis=1, out=frames)
+                    dest.write(resampler.process(frames))
+                dest.write(resampler.flush())
+
+        os.replace(partial_file, output_file)
+        partial_file = None
 
         print(f"Converted: {input_path} -> {output_file}")
         return output_file
@@ -57,9 +133,203 @@ def convert_audio_file(input_path, output_path=None, overwrite=False):
     except Exception as e:
         print(f"Error converting {input_path}: {str(e)}")
         return None
+    finally:
+        if partial_file and os.path.exists(partial_file):
+            os.remove(partial_file)
+
+
+def biquad_coefficients(kind, fc, q, gain_db, sample_rate):
+    """RBJ cookbook high-shelf or high-pass biquad, normalized so a[0] == 1."""
+    w0 = 2 * np.pi * fc / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    if kind == "high_shelf":
+        a = 10 ** (gain_db / 40)
+        sqrt_a = np.sqrt(a)
+        b = [
+            a * ((a + 1) + (a - 1) * cos_w0 + 2 * sqrt_a * alpha),
+            -2 * a * ((a - 1) + (a + 1) * cos_w0),
+            a * ((a + 1) + (a - 1) * cos_w0 - 2 * sqrt_a * alpha),
+        ]
+        den = [
+            (a + 1) - (a - 1) * cos_w0 + 2 * sqrt_a * alpha,
+            2 * ((a - 1) - (a + 1) * cos_w0),
+            (a + 1) - (a - 1) * cos_w0 - 2 * sqrt_a * alpha,
+        ]
+    else:
+        b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        den = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    return np.array(b) / den[0], np.array(den) / den[0]
+
+
+def integrated_loudness(audio, sample_rate):
+    """
+    Integrated loudness of a mono signal in LUFS (ITU-R BS.1770-4), with
+    the K-weighting filters derived for sample_rate. Returns -inf for
+    silence.
+    """
+    from scipy.signal import lfilter
+
+    # K-weighting: head-effect high shelf, then the RLB high-pass
+    b, a = biquad_coefficients("high_shelf", 1500.0, 1 / np.sqrt(2), 4.0, sample_rate)
+    weighted = lfilter(b, a, audio)
+    b, a = biquad_coefficients("high_pass", 38.0, 0.5, 0.0, sample_rate)
+    weighted = lfilter(b, a, weighted)
+
+    block = int(LOUDNESS_BLOCK_SECONDS * sample_rate)
+    if len(weighted) < block:
+        # Shorter than one gating block: ungated mean square
+        power = np.array([np.mean(weighted ** 2)]) if len(weighted) else np.zeros(0)
+    else:
+        step = max(1, int(block * (1 - LOUDNESS_OVERLAP)))
+        squares = np.concatenate(([0.0], np.cumsum(weighted ** 2)))
+        starts = np.arange(0, len(weighted) - block + 1, step)
+        power = (squares[starts + block] - squares[starts]) / block
+
+    with np.errstate(divide="ignore"):
+        block_lufs = -0.691 + 10 * np.log10(power)
+    power = power[block_lufs > ABSOLUTE_GATE_LUFS]
+    if not len(power):
+        return -np.inf
+    relative_gate = -0.691 + 10 * np.log10(np.mean(power)) + RELATIVE_GATE_LU
+    with np.errstate(divide="ignore"):
+        power = power[-0.691 + 10 * np.log10(power) > relative_gate]
+    return float(-0.691 + 10 * np.log10(np.mean(power)))
+
+
+def find_trim_bounds(audio, sample_rate, threshold_db, pad_seconds):
+    """
+    (start, end) sample range from pad_seconds before the first block whose
+    peak reaches threshold_db to pad_seconds after the last, or None if the
+    clip never does.
+    """
+    block = max(1, sample_rate * TRIM_BLOCK_MS // 1000)
+    blocks = -(-len(audio) // block)
+    padded = np.zeros(blocks * block, dtype=audio.dtype)
+    padded[:len(audio)] = np.abs(audio)
+    loud = np.flatnonzero(padded.reshape(blocks, block).max(axis=1) >= 10 ** (threshold_db / 20))
+    if not len(loud):
+        return None
+    pad = int(pad_seconds * sample_rate)
+    start = max(0, loud[0] * block - pad)
+    end = min(len(audio), (loud[-1] + 1) * block + pad)
+    return int(start), int(end)
 
 
-def scan_and_convert_folder(folder_path, overwrite=False, recursive=False):
+def prepare_clip(
+    input_path,
+    output_path=None,
+    overwrite=False,
+    trim_db=TRIM_THRESHOLD_DB,
+    trim_pad=TRIM_PAD_SECONDS,
+    target_lufs=TARGET_LUFS,
+    peak_db=PEAK_CEILING_DB,
+):
+    """
+    Prepare one TTS clip in a single decode: trim leading/trailing silence,
+    downmix and resample to 22kHz mono, then normalize to target_lufs with
+    the sample peak held at or below peak_db. Clips are read whole, which is
+    fine for dataset-length utterances.
+
+    Returns:
+        dict: Report with status ('ok', 'skipped' or 'failed'), durations
+        before and after, loudness before normalization, applied gain,
+        flags ('clipped', 'near_silent') and any error
+    """
+    load_dsp()
+    report = {
+        "input": input_path,
+        "output": None,
+        "status": "failed",
+        "duration_before": None,
+        "duration_after": None,
+        "loudness_before": None,
+        "gain_db": None,
+        "peak_db": None,
+        "flags": [],
+        "error": None,
+    }
+    partial_file = None
+    try:
+        audio, sample_rate = sf.read(input_path, dtype="float32", always_2d=True)
+        report["duration_before"] = round(len(audio) / sample_rate, 3)
+
+        if np.count_nonzero(np.abs(audio) >= CLIPPED_SAMPLE_LEVEL) >= CLIPPED_MIN_SAMPLES:
+            report["flags"].append("clipped")
+        audio = audio.mean(axis=1)
+
+        bounds = find_trim_bounds(audio, sample_rate, trim_db, trim_pad)
+        if bounds is None:
+            report["flags"].append("near_silent")
+            report.update(status="skipped", error=f"No audio above {trim_db} dBFS")
+            print(f"Skipped (silent): {input_path}")
+            return report
+
+        resampler = PolyphaseResampler(sample_rate, TARGET_SR)
+        trimmed = audio[bounds[0]:bounds[1]]
+        audio = np.concatenate((resampler.process(trimmed), resampler.flush()))
+
+        loudness = integrated_loudness(audio, TARGET_SR)
+        report["loudness_before"] = round(loudness, 2) if np.isfinite(loudness) else None
+        if not np.isfinite(loudness) or loudness < NEAR_SILENT_LUFS:
+            report["flags"].append("near_silent")
+
+        # Gain to the loudness target, limited by the peak ceiling
+        peak = float(np.max(np.abs(audio))) if len(audio) else 0.0
+        gain_db = target_lufs - loudness if np.isfinite(loudness) else 0.0
+        if peak > 0:
+            gain_db = min(gain_db, peak_db - 20 * np.log10(peak))
+        audio *= np.float32(10 ** (gain_db / 20))
+
+        output_file = resolve_output_path(input_path, output_path, overwrite)
+        partial_file = partial_path_for(output_file)
+        sf.write(partial_file, audio, TARGET_SR)
+        os.replace(partial_file, output_file)
+        partial_file = None
+
+        report.update(
+            output=output_file,
+            status="ok",
+            duration_after=round(len(audio) / TARGET_SR, 3),
+            gain_db=round(float(gain_db), 2),
+            peak_db=round(20 * np.log10(peak) + gain_db, 2) if peak > 0 else None,
+        )
+        flags = f" [{', '.join(report['flags'])}]" if report["flags"] else ""
+        print(
+            f"Prepared: {input_path} -> {output_file} "
+            f"({report['duration_before']:.2f}s -> {report['duration_after']:.2f}s, "
+            f"gain {report['gain_db']:+.1f} dB){flags}"
+        )
+        return report
+
+    except Exception as e:
+        report["error"] = str(e)
+        print(f"Error preparing {input_path}: {str(e)}")
+        return report
+    finally:
+        if partial_file and os.path.exists(partial_file):
+            os.remove(partial_file)
+
+
+def write_report(reports, report_file):
+    """Write per-clip results and totals as JSON"""
+    summary = {"total": len(reports)}
+    for key in ("ok", "skipped", "failed"):
+        summary[key] = sum(1 for r in reports if r["status"] == key)
+    for flag in ("clipped", "near_silent"):
+        summary[flag] = [r["input"] for r in reports if flag in r["flags"]]
+    summary["hours_before"] = round(sum(r["duration_before"] or 0 for r in reports) / 3600, 3)
+    summary["hours_after"] = round(
+        sum(r["duration_after"] or 0 for r in reports if r["status"] == "ok") / 3600, 3
+    )
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump({"summary": summary, "files": reports}, f, indent=2)
+    return summary
+
+
+def scan_and_convert_folder(
+    folder_path, overwrite=False, recursive=False, jobs=None, prepare=None, report_file=None
+):
     """
     Scan a folder for WAV files and convert them to 22kHz mono.
 
@@ -67,6 +337,10 @@ def scan_and_convert_folder(folder_path, overwrite=False, recursive=False):
         folder_path (str): Path to the folder to scan
         overwrite (bool): Whether to overwrite original files
         recursive (bool): Whether to scan subdirectories recursively
+        jobs (int): Number of worker processes (default: number of CPUs)
+        prepare (dict): prepare_clip() settings; trims and normalizes each
+            clip instead of only converting it
+        report_file (str): Where to write the JSON report (prepare mode only)
     """
     folder = Path(folder_path)
 
@@ -79,6 +353,8 @@ def scan_and_convert_folder(folder_path, overwrite=False, recursive=False):
         wav_files = list(folder.rglob("*.wav")) + list(folder.rglob("*.WAV"))
     else:
         wav_files = list(folder.glob("*.wav")) + list(folder.glob("*.WAV"))
+    # Leftovers of an interrupted run are not inputs
+    wav_files = [f for f in wav_files if not f.name.startswith(".") or ".partial" not in f.name]
 
     if not wav_files:
         print(f"No WAV files found in '{folder_path}'")
@@ -86,15 +362,43 @@ def scan_and_convert_folder(folder_path, overwrite=False, recursive=False):
 
     print(f"Found {len(wav_files)} WAV file(s) to convert...")
 
-    converted_count = 0
-    for wav_file in wav_files:
-        result = convert_audio_file(str(wav_file), overwrite=overwrite)
-        if result:
-            converted_count += 1
+    jobs = min(jobs or os.cpu_count() or 1, len(wav_files))
+    if prepare is not None:
+        convert = partial(prepare_clip, overwrite=overwrite, **prepare)
+    else:
+        convert = partial(convert_audio_file, overwrite=overwrite)
+    paths = [str(f) for f in wav_files]
 
+    if jobs == 1:
+        results = list(map(convert, paths))
+    else:
+        # Hand out files in chunks so each round trip to a worker covers
+        # several short clips, while still spreading them over all workers
+        chunksize = max(1, min(MAX_CHUNKSIZE, len(paths) // (jobs * 4)))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=load_dsp) as pool:
+            results = list(pool.map(convert, paths, chunksize=chunksize))
+
+    if prepare is None:
+        converted_count = sum(1 for result in results if result)
+        print(
+            f"\nConversion complete! {converted_count}/{len(wav_files)} files converted successfully."
+        )
+        return
+
+    converted_count = sum(1 for result in results if result["status"] == "ok")
     print(
-        f"\nConversion complete! {converted_count}/{len(wav_files)} files converted successfully."
+        f"\nPreparation complete! {converted_count}/{len(wav_files)} files prepared successfully."
     )
+    for flag, label in (("clipped", "clipped"), ("near_silent", "near-silent")):
+        flagged = sum(1 for result in results if flag in result["flags"])
+        if flagged:
+            print(f"  {flagged} {label} clip(s) flagged")
+    if report_file:
+        summary = write_report(results, report_file)
+        print(
+            f"Report written to {report_file} "
+            f"({summary['hours_before']:.2f}h -> {summary['hours_after']:.2f}h)"
+        )
 
 
 def main():
@@ -111,11 +415,67 @@ def main():
     parser.add_argument(
         "--recursive", "-r", action="store_true", help="Scan subdirectories recursively"
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--prepare",
+        action="store_true",
+        help="TTS dataset preparation: also trim leading/trailing silence and normalize loudness",
+    )
+    parser.add_argument(
+        "--trim-db",
+        type=float,
+        default=TRIM_THRESHOLD_DB,
+        help=f"Peak level treated as silence when trimming (default: {TRIM_THRESHOLD_DB:g} dBFS)",
+    )
+    parser.add_argument(
+        "--trim-pad",
+        type=float,
+        default=TRIM_PAD_SECONDS,
+        help=f"Seconds of silence kept at each end (default: {TRIM_PAD_SECONDS:g})",
+    )
+    parser.add_argument(
+        "--target-lufs",
+        type=float,
+        default=TARGET_LUFS,
+        help=f"Integrated loudness target (default: {TARGET_LUFS:g} LUFS)",
+    )
+    parser.add_argument(
+        "--peak-db",
+        type=float,
+        default=PEAK_CEILING_DB,
+        help=f"Sample peak ceiling after normalization (default: {PEAK_CEILING_DB:g} dBFS)",
+    )
+    parser.add_argument(
+        "--report",
+        help="With --prepare, write a JSON report of per-clip durations, loudness and flags",
+    )
 
     args = parser.parse_args()
 
+    prepare = None
+    if args.prepare:
+        prepare = {
+            "trim_db": args.trim_db,
+            "trim_pad": args.trim_pad,
+            "target_lufs": args.target_lufs,
+            "peak_db": args.peak_db,
+        }
+    elif args.report:
+        parser.error("--report requires --prepare")
+
     scan_and_convert_folder(
-        args.folder, overwrite=args.overwrite, recursive=args.recursive
+        args.folder,
+        overwrite=args.overwrite,
+        recursive=args.recursive,
+        jobs=args.jobs,
+        prepare=prepare,
+        report_file=args.report,
     )
 
 
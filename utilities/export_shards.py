@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Tar Shard Exporter
+Packs the clips referenced by a pipe-separated metadata file into
+fixed-size tar shards (WebDataset layout) so data loaders can stream a
+dataset sequentially instead of opening hundreds of thousands of small
+files.
+
+Each sample is a <key>.wav + <key>.txt pair stored next to each other,
+where key is the audio ID (made unique with a _2, _3, ... suffix if two
+IDs clean up to the same key). Shards are planned up front from the file sizes,
+optionally after a deterministic shuffle, and then written in parallel. A
+shard index (index.json) lists every shard with its sample count, size and
+first/last key.
+
+Shards are PAX tars, so keys of any length fit. Tar members get fixed
+ownership, permissions and timestamps, so the same input and seed always
+produce byte-identical shards.
+
+Usage:
+    python export_shards.py metadata.csv wavs/ shards/ [--max-size 256] [--shuffle SEED] [--jobs 8]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+
+from metadata_to_csv_json import audio_path_for, iter_metadata
+
+TAR_BLOCK = 512
+# Longest member name a plain USTAR header holds (longer ones get a PAX header)
+USTAR_NAME_LENGTH = 100
+
+
+def sample_key(audio_id):
+    """
+    WebDataset key for an audio ID. Loaders split member names at the first
+    dot, so extensions are dropped and remaining dots/slashes replaced.
+    """
+    key = os.path.splitext(audio_id)[0] if os.path.splitext(audio_id)[1] == ".wav" else audio_id
+    return key.replace(".", "_").replace("/", "_").replace("\\", "_")
+
+
+def tar_size(size):
+    """Bytes a member of size bytes takes in a tar: header plus padded data."""
+    return TAR_BLOCK + -(-size // TAR_BLOCK) * TAR_BLOCK
+
+
+def member_size(name, size):
+    """tar_size plus the PAX header a name too long or non-ASCII for USTAR needs."""
+    encoded = name.encode("utf-8")
+    if len(encoded) <= USTAR_NAME_LENGTH and name.isascii():
+        return tar_size(size)
+    # One "<length> path=<name>\n" record
+    return tar_size(len(encoded) + 16) + tar_size(size)
+
+
+def unique_key(key, used):
+    """key, or key_2, key_3, ... if it is already in used; adds the result to used."""
+    unique, n = key, 1
+    while unique in used:
+        n += 1
+        unique = f"{key}_{n}"
+    used.add(unique)
+    return unique
+
+
+def plan_shards(metadata_file, audio_root, max_bytes, max_count=None, text_column="transcription",
+                seed=None):
+    """
+    Group the metadata entries into shards of at most max_bytes of members
+    (tar adds up to 10 KB of end-of-archive padding) and max_count samples.
+    Returns (shards, missing, renamed) where each shard is a list of (key,
+    audio path, text), missing lists IDs whose audio is absent and renamed
+    lists (audio ID, key) for IDs whose cleaned-up key was already taken.
+    """
+    samples = []
+    missing = []
+    renamed = []
+    used = set()
+    for item in iter_metadata(metadata_file):
+        path = audio_path_for(audio_root, item["audio"])
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            missing.append(item["audio"])
+            continue
+        text = item.get(text_column) or item["transcription"]
+        key = sample_key(item["audio"])
+        unique = unique_key(key, used)
+        if unique != key:
+            renamed.append((item["audio"], unique))
+        samples.append((unique, path, text, size))
+
+    if seed is not None:
+        random.Random(seed).shuffle(samples)
+
+    shards = []
+    current, current_bytes = [], 0
+    for key, path, text, size in samples:
+        sample_bytes = member_size(f"{key}.wav", size) + member_size(f"{key}.txt", len(text.encode("utf-8")))
+        full = current and (
+            current_bytes + sample_bytes > max_bytes
+            or (max_count and len(current) >= max_count)
+        )
+        if full:
+            shards.append(current)
+            current, current_bytes = [], 0
+        current.append((key, path, text))
+        current_bytes += sample_bytes
+    if current:
+        shards.append(current)
+    return shards, missing, renamed
+
+
+def make_member(name, size):
+    """TarInfo with fixed metadata so shards are reproducible."""
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = 0
+    info.mode = 0o444
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+
+def write_shard(shard_path, samples):
+    """Write one shard to a temporary name and rename it into place."""
+    partial_path = shard_path + ".partial"
+    try:
+        with tarfile.open(partial_path, "w", format=tarfile.PAX_FORMAT) as tar:
+            for key, path, text in samples:
+                with open(path, "rb") as f:
+                    tar.addfile(make_member(f"{key}.wav", os.fstat(f.fileno()).st_size), f)
+                data = text.encode("utf-8")
+                tar.addfile(make_member(f"{key}.txt", len(data)), io.BytesIO(data))
+        os.replace(partial_path, shard_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return os.path.getsize(shard_path)
+
+
+def export_shards(metadata_file, audio_root, output_dir, max_bytes, max_count=None,
+                  text_column="transcription", seed=None, prefix="shard", jobs=None):
+    """
+    Plan and write all shards plus index.json. Returns the index dict, or
+    None if the metadata file is missing.
+    """
+    if not os.path.exists(metadata_file):
+        print(f"Error: Metadata file '{metadata_file}' not found.")
+        return None
+
+    shards, missing, renamed = plan_shards(
+        metadata_file, audio_root, max_bytes, max_count, text_column, seed
+    )
+    for audio_id in missing[:10]:
+        print(f"Warning: audio for '{audio_id}' not found, skipped")
+    if len(missing) > 10:
+        print(f"Warning: {len(missing) - 10} more missing clips skipped")
+    # Loaders group members by key, so two samples must never share one
+    for audio_id, key in renamed[:10]:
+        print(f"Warning: key for '{audio_id}' is already used, stored as '{key}'")
+    if len(renamed) > 10:
+        print(f"Warning: {len(renamed) - 10} more clips stored under a suffixed key")
+
+    os.makedirs(output_dir, exist_ok=True)
+    names = [f"{prefix}-{i:06d}.tar" for i in range(len(shards))]
+    paths = [os.path.join(output_dir, name) for name in names]
+    print(f"Writing {sum(len(s) for s in shards)} samples into {len(shards)} shard(s)...")
+
+    index = {
+        "shards": [], "samples": 0, "bytes": 0, "shuffle_seed": seed,
+        "missing": len(missing), "renamed": [{"audio": a, "key": k} for a, k in renamed],
+    }
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for i, size in enumerate(pool.map(write_shard, paths, shards)):
+            samples = shards[i]
+            index["shards"].append({
+                "file": names[i],
+                "samples": len(samples),
+                "bytes": size,
+                "first_key": samples[0][0],
+                "last_key": samples[-1][0],
+            })
+            index["samples"] += len(samples)
+            index["bytes"] += size
+            print(f"[{i + 1}/{len(shards)}] {names[i]}: {len(samples)} samples, {size / 1024 / 1024:.1f} MB")
+
+    with open(os.path.join(output_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pack audio clips and transcriptions into WebDataset-style tar shards",
+        epilog="Example: python export_shards.py LJSpeech-1.1/metadata.csv LJSpeech-1.1/wavs shards --shuffle 42",
+    )
+    parser.add_argument("metadata_file", help="Pipe-separated metadata file")
+    parser.add_argument("audio_root", help="Directory the audio IDs are relative to")
+    parser.add_argument("output_dir", help="Directory for the shards and index.json")
+    parser.add_argument(
+        "--max-size", type=float, default=256.0,
+        help="Maximum shard size in MB (default: 256)",
+    )
+    parser.add_argument(
+        "--max-samples", type=int, default=None,
+        help="Maximum samples per shard (default: no limit)",
+    )
+    parser.add_argument(
+        "--shuffle", type=int, metavar="SEED", default=None,
+        help="Shuffle samples with this seed before sharding (default: metadata order)",
+    )
+    parser.add_argument(
+        "--text-column", default="transcription",
+        choices=["transcription", "normalized_transcription"],
+        help="Metadata column stored as <key>.txt (default: transcription)",
+    )
+    parser.add_argument("--prefix", default="shard", help="Shard file name prefix (default: shard)")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count() or 1,
+        help="Shards written concurrently (default: number of CPUs)",
+    )
+    args = parser.parse_args()
+
+    index = export_shards(
+        args.metadata_file,
+        args.audio_root,
+        args.output_dir,
+        int(args.max_size * 1024 * 1024),
+        args.max_samples,
+        args.text_column,
+        args.shuffle,
+        args.prefix,
+        args.jobs,
+    )
+    if index is None:
+        sys.exit(1)
+
+    count = len(index["shards"])
+    if count:
+        last = f"{count - 1:06d}"
+        print(f"\nExported {index['samples']} samples ({index['bytes'] / 1024 / 1024:.1f} MB) "
+              f"to {args.output_dir}/{args.prefix}-{{000000..{last}}}.tar")
+    else:
+        print("\nNo samples exported.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,139 @@
 #!/usr/bin/env python3
+"""
+Metadata Converter
+Converts pipe-separated metadata (LJSpeech style: id|transcription|normalized)
+to CSV and JSON Lines.
+
+The metadata file is read line by line and every output is written as it
+goes, so memory stays constant however many lines there are. All columns are
+kept: the first three are named audio, transcription and
+normalized_transcription, any further ones column_4, column_5, ...
+
+The sqlite format writes an indexed database instead: clips keyed by audio
+ID, an FTS5 full-text index over the transcriptions and, with --audio-dir,
+duration and sample rate read from each WAV header. Re-importing updates
+only the rows that changed. --lookup and --search query it.
+
+Usage:
+    python metadata_to_csv_json.py [<metadata_file> [<output_base>]] [--format csv|jsonl|json|sqlite ...]
+    python metadata_to_csv_json.py --search "phrase" [--db transcriptions.sqlite]
+"""
+import argparse
 import csv
 import json
+import sqlite3
+import struct
 import sys
 import os
 
+COLUMN_NAMES = ["audio", "transcription", "normalized_transcription"]
+
+# Output formats and the extension each is written with
+OUTPUT_FORMATS = {"csv": ".csv", "jsonl": ".jsonl", "json": ".json", "sqlite": ".sqlite"}
+DEFAULT_FORMATS = ["csv", "jsonl"]
+
+
+def column_name(index):
+    """Field name for the column at index (0-based)."""
+    if index < len(COLUMN_NAMES):
+        return COLUMN_NAMES[index]
+    return f"column_{index + 1}"
+
+
+def iter_metadata(metadata_file):
+    """Yield one dict per metadata line, keyed by column_name()."""
+    with open(metadata_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and "|" in line:
+                parts = line.split("|")
+                if len(parts) >= 2:
+                    yield {column_name(i): value for i, value in enumerate(parts)}
+
+
+def count_columns(metadata_file):
+    """Widest line in the file, so the CSV header can name every column."""
+    widest = 2
+    with open(metadata_file, "r", encoding="utf-8") as f:
+        for line in f:
+            widest = max(widest, line.count("|") + 1)
+    return widest
+
+
+def audio_path_for(audio_root, audio_id):
+    """Path of the clip for a metadata ID; IDs without an extension are .wav files."""
+    if not os.path.splitext(audio_id)[1]:
+        audio_id += ".wav"
+    return os.path.join(audio_root, audio_id)
+
+
+def read_wav_info(path):
+    """
+    Read the format and length of a RIFF/RF64 WAV file from its header
+    without decoding any audio. Raises ValueError if it is not a WAV file
+    or its header is cut short.
+
+    Returns:
+        dict: sample_rate, channels, bits, frames, duration (seconds) and
+        truncated (the data chunk claims more bytes than the file holds)
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[8:12] != b"WAVE" or riff[0:4] not in (b"RIFF", b"RF64"):
+            raise ValueError("not a WAV file")
+
+        fmt = None
+        data_size = None
+        ds64_data_size = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            chunk_id = header[0:4]
+            chunk_size = struct.unpack_from("<I", header, 4)[0]
+            if chunk_id == b"ds64":
+                body = f.read(chunk_size + (chunk_size & 1))
+                if len(body) < 16:
+                    raise ValueError("truncated ds64 chunk")
+                ds64_data_size = struct.unpack_from("<Q", body, 8)[0]
+            elif chunk_id == b"fmt ":
+                body = f.read(chunk_size + (chunk_size & 1))
+                if len(body) < 16:
+                    raise ValueError("truncated fmt chunk")
+                fmt = struct.unpack_from("<HHIIHH", body)
+            elif chunk_id == b"data":
+                data_offset = f.tell()
+                if chunk_size == 0xFFFFFFFF and ds64_data_size is not None:
+                    chunk_size = ds64_data_size
+                data_size = chunk_size
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    if fmt is None or data_size is None:
+        raise ValueError("missing fmt or data chunk")
+
+    _, channels, sample_rate, _, block_align, bits = fmt
+    available = file_size - data_offset
+    truncated = data_size > available
+    # Streaming writers leave the size unset; trust the file length
+    if data_size == 0 or truncated:
+        data_size = available
+    frames = data_size // block_align if block_align else 0
+    return {
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "bits": bits,
+        "frames": frames,
+        "duration": frames / sample_rate if sample_rate else 0.0,
+        "truncated": truncated,
+    }
+
+
+# Everything read_wav_info raises for a missing, unreadable or malformed file
+WAV_ERRORS = (OSError, ValueError, IndexError, struct.error)
+
 
 def parse_metadata(metadata_file):
     """Parse metadata file and return list of audio-transcription pairs."""
@@ -12,35 +142,286 @@ def parse_metadata(metadata_file):
         return None
 
     try:
-        with open(metadata_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+        return list(iter_metadata(metadata_file))
 
-        data = []
-        for line in lines:
-            line = line.strip()
-            if line and "|" in line:
-                parts = line.split("|")
-                if len(parts) >= 2:
-                    audio_file = parts[0]
-                    transcription = parts[1]
-                    data.append({"audio": audio_file, "transcription": transcription})
+    except Exception as e:
+        print(f"Error processing metadata file: {e}")
+        return None
+
+
+class CsvWriter:
+    """Streams entries to CSV with a fixed header; missing columns are left empty."""
+
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.columns = columns
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, item):
+        self.writer.writerow([item.get(column, "") for column in self.columns])
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesWriter:
+    """Streams entries as one JSON object per line."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, item):
+        self.file.write(json.dumps(item, ensure_ascii=False))
+        self.file.write("\n")
+
+    def close(self):
+        self.file.close()
 
-        return data
+
+class JsonArrayWriter:
+    """
+    Streams entries into a pretty-printed JSON array, formatted exactly like
+    json.dump(entries, indent=2).
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+        self.count = 0
+
+    def write(self, item):
+        text = json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        self.file.write(("[\n  " if self.count == 0 else ",\n  ") + text)
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]" if self.count else "[]")
+        self.file.close()
+
+
+class SqliteWriter:
+    """
+    Upserts entries into an SQLite metadata store. Rows whose columns are
+    unchanged are left alone, so re-importing an updated metadata file only
+    touches (and re-indexes) the lines that changed. prune() then removes
+    the rows whose IDs are no longer in the metadata file.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS clips (
+            audio                    TEXT PRIMARY KEY,
+            transcription            TEXT NOT NULL,
+            normalized_transcription TEXT,
+            extra                    TEXT,
+            duration                 REAL,
+            sample_rate              INTEGER
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS clips_fts USING fts5(
+            transcription, normalized_transcription,
+            content='clips', content_rowid='rowid'
+        );
+        CREATE TRIGGER IF NOT EXISTS clips_ai AFTER INSERT ON clips BEGIN
+            INSERT INTO clips_fts (rowid, transcription, normalized_transcription)
+            VALUES (new.rowid, new.transcription, new.normalized_transcription);
+        END;
+        CREATE TRIGGER IF NOT EXISTS clips_ad AFTER DELETE ON clips BEGIN
+            INSERT INTO clips_fts (clips_fts, rowid, transcription, normalized_transcription)
+            VALUES ('delete', old.rowid, old.transcription, old.normalized_transcription);
+        END;
+        CREATE TRIGGER IF NOT EXISTS clips_au AFTER UPDATE ON clips BEGIN
+            INSERT INTO clips_fts (clips_fts, rowid, transcription, normalized_transcription)
+            VALUES ('delete', old.rowid, old.transcription, old.normalized_transcription);
+            INSERT INTO clips_fts (rowid, transcription, normalized_transcription)
+            VALUES (new.rowid, new.transcription, new.normalized_transcription);
+        END;
+    """
+
+    # Audio columns are only replaced when this import measured them
+    UPSERT = """
+        INSERT INTO clips (audio, transcription, normalized_transcription, extra, duration, sample_rate)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (audio) DO UPDATE SET
+            transcription = excluded.transcription,
+            normalized_transcription = excluded.normalized_transcription,
+            extra = excluded.extra,
+            duration = coalesce(excluded.duration, clips.duration),
+            sample_rate = coalesce(excluded.sample_rate, clips.sample_rate)
+        WHERE clips.transcription IS NOT excluded.transcription
+            OR clips.normalized_transcription IS NOT excluded.normalized_transcription
+            OR clips.extra IS NOT excluded.extra
+            OR (excluded.duration IS NOT NULL AND clips.duration IS NOT excluded.duration)
+            OR (excluded.sample_rate IS NOT NULL AND clips.sample_rate IS NOT excluded.sample_rate)
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, path, audio_dir=None):
+        self.path = path
+        self.audio_dir = audio_dir
+        self.conn = open_metadata_db(path)
+        self.conn.executescript(self.SCHEMA)
+        # IDs seen in this import, so prune() can find the ones that are gone
+        self.conn.execute("CREATE TEMP TABLE seen (audio TEXT PRIMARY KEY)")
+        self.rows_before = self.conn.execute("SELECT count(*) FROM clips").fetchone()[0]
+        self.batch = []
+        self.changed = 0
+        self.removed = 0
+        self.missing_audio = 0
+
+    def write(self, item):
+        extra = {k: v for k, v in item.items() if k not in COLUMN_NAMES}
+        duration = sample_rate = None
+        if self.audio_dir:
+            try:
+                info = read_wav_info(audio_path_for(self.audio_dir, item["audio"]))
+                duration, sample_rate = round(info["duration"], 6), info["sample_rate"]
+            except WAV_ERRORS:
+                self.missing_audio += 1
+        self.batch.append((
+            item["audio"],
+            item["transcription"],
+            item.get("normalized_transcription"),
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+            duration,
+            sample_rate,
+        ))
+        if len(self.batch) >= self.BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self.batch:
+            self.changed += self.conn.executemany(self.UPSERT, self.batch).rowcount
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO temp.seen (audio) VALUES (?)", ((row[0],) for row in self.batch)
+            )
+            self.batch = []
+
+    def prune(self):
+        """
+        Delete the rows (and, through the trigger, their FTS entries) that
+        this import did not write. Call only once the whole file was read.
+        """
+        self._flush()
+        self.removed = self.conn.execute(
+            "DELETE FROM clips WHERE audio NOT IN (SELECT audio FROM temp.seen)"
+        ).rowcount
+
+    def close(self):
+        try:
+            self._flush()
+            self.conn.commit()
+            rows = self.conn.execute("SELECT count(*) FROM clips").fetchone()[0]
+            inserted = rows + self.removed - self.rows_before
+            print(
+                f"SQLite store '{self.path}': {inserted} inserted, "
+                f"{self.changed - inserted} updated, {self.removed} removed, {rows} total"
+            )
+            if self.missing_audio:
+                print(f"  {self.missing_audio} audio file(s) missing or unreadable in '{self.audio_dir}'")
+        finally:
+            self.conn.close()
+
+
+def open_metadata_db(path):
+    """Connect to a metadata store with the settings used for bulk imports."""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def lookup_clip(db_path, audio_id):
+    """Return the row for audio_id as a dict, or None."""
+    conn = open_metadata_db(db_path)
+    try:
+        row = conn.execute("SELECT * FROM clips WHERE audio = ?", (audio_id,)).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def search_clips(db_path, phrase, limit=20):
+    """
+    Full-text search over both transcription columns, best matches first.
+    phrase is matched as an exact phrase; use search_clips_query() for FTS5
+    operators.
+    """
+    return search_clips_query(db_path, '"' + phrase.replace('"', '""') + '"', limit)
+
+
+def search_clips_query(db_path, query, limit=20):
+    """Run an FTS5 MATCH query (e.g. 'hello NEAR world') against the store."""
+    conn = open_metadata_db(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT clips.* FROM clips_fts JOIN clips ON clips.rowid = clips_fts.rowid "
+            "WHERE clips_fts MATCH ? ORDER BY clips_fts.rank LIMIT ?",
+            (query, limit),
+        )
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def convert_metadata(metadata_file, output_base, formats=None, audio_dir=None):
+    """
+    Stream metadata_file into one output per format in formats (csv, jsonl,
+    json, sqlite). audio_dir adds duration and sample rate to the SQLite
+    store. Returns the number of entries written, or None on error.
+    """
+    formats = formats or DEFAULT_FORMATS
+    if not os.path.exists(metadata_file):
+        print(f"Error: Metadata file '{metadata_file}' not found.")
+        return None
+
+    writers = {}
+    try:
+        for fmt in formats:
+            path = f"{output_base}{OUTPUT_FORMATS[fmt]}"
+            if fmt == "csv":
+                columns = [column_name(i) for i in range(count_columns(metadata_file))]
+                writers[path] = CsvWriter(path, columns)
+            elif fmt == "jsonl":
+                writers[path] = JsonLinesWriter(path)
+            elif fmt == "sqlite":
+                writers[path] = SqliteWriter(path, audio_dir)
+            else:
+                writers[path] = JsonArrayWriter(path)
+
+        count = 0
+        for item in iter_metadata(metadata_file):
+            for writer in writers.values():
+                writer.write(item)
+            count += 1
+
+        # Only a complete import says which IDs left the metadata file
+        for writer in writers.values():
+            if isinstance(writer, SqliteWriter):
+                writer.prune()
 
     except Exception as e:
-        print(f"Error processing metadata file: {e}")
+        print(f"Error converting metadata file: {e}")
         return None
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    for path in writers:
+        print(f"File '{path}' created successfully.")
+    return count
 
 
 def create_csv(data, output_csv):
     """Create CSV file from data."""
     try:
-        with open(output_csv, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["audio", "transcription"])
-
+        width = max((len(item) for item in data), default=2)
+        writer = CsvWriter(output_csv, [column_name(i) for i in range(width)])
+        try:
             for item in data:
-                writer.writerow([item["audio"], item["transcription"]])
+                writer.write(item)
+        finally:
+            writer.close()
 
         print(f"CSV file '{output_csv}' created successfully.")
         return True
@@ -63,35 +444,62 @@ def create_json(data, output_json):
 
 
 def main():
-    if len(sys.argv) == 1:
-        metadata_file = "metadata.txt"
-        output_base = "transcriptions"
-    elif len(sys.argv) == 2:
-        metadata_file = sys.argv[1]
-        output_base = "transcriptions"
-    elif len(sys.argv) == 3:
-        metadata_file = sys.argv[1]
-        output_base = sys.argv[2].replace(".csv", "").replace(".json", "")
-    else:
-        print("Usage: python metadata_to_csv.py [<metadata_file> [<output_base>]]")
-        print("Example: python metadata_to_csv.py metadata.txt transcriptions")
-        print(
-            "Or run without arguments to use defaults: metadata.txt -> transcriptions.csv & transcriptions.json"
-        )
-        sys.exit(1)
-
-    data = parse_metadata(metadata_file)
-    if data is None:
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Convert pipe-separated metadata to CSV and JSON Lines",
+        epilog="Example: python metadata_to_csv_json.py metadata.txt transcriptions --format csv --format json",
+    )
+    parser.add_argument(
+        "metadata_file", nargs="?", default="metadata.txt",
+        help="Pipe-separated metadata file (default: metadata.txt)",
+    )
+    parser.add_argument(
+        "output_base", nargs="?", default="transcriptions",
+        help="Output path without extension (default: transcriptions)",
+    )
+    parser.add_argument(
+        "--format", dest="formats", action="append", choices=sorted(OUTPUT_FORMATS),
+        help="Output format; repeat for several. json is a pretty-printed array, "
+             "sqlite an indexed, full-text searchable store (default: csv and jsonl)",
+    )
+    parser.add_argument(
+        "--audio-dir",
+        help="With --format sqlite, read duration and sample rate from <audio-dir>/<id>.wav",
+    )
+    parser.add_argument("--lookup", metavar="ID", help="Print the stored entry for an audio ID")
+    parser.add_argument("--search", metavar="PHRASE", help="Full-text search the stored transcriptions")
+    parser.add_argument(
+        "--limit", type=int, default=20, help="Maximum number of --search results (default: 20)"
+    )
+    parser.add_argument(
+        "--db", help="SQLite store for --lookup/--search (default: <output_base>.sqlite)"
+    )
+    args = parser.parse_args()
 
-    output_csv = f"{output_base}.csv"
-    output_json = f"{output_base}.json"
+    output_base = (
+        args.output_base.replace(".csv", "").replace(".jsonl", "").replace(".json", "")
+        .replace(".sqlite", "")
+    )
 
-    csv_success = create_csv(data, output_csv)
-    json_success = create_json(data, output_json)
+    if args.lookup or args.search:
+        db_path = args.db or f"{output_base}.sqlite"
+        if not os.path.exists(db_path):
+            print(f"Error: SQLite store '{db_path}' not found. Create it with --format sqlite.")
+            sys.exit(1)
+        if args.lookup:
+            rows = [row for row in [lookup_clip(db_path, args.lookup)] if row]
+        else:
+            rows = search_clips(db_path, args.search, args.limit)
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        if not rows:
+            print("No matches.")
+            sys.exit(1)
+        return
 
-    if not (csv_success and json_success):
+    count = convert_metadata(args.metadata_file, output_base, args.formats, args.audio_dir)
+    if count is None:
         sys.exit(1)
+    print(f"Converted {count} entries.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Stateful polyphase resampler for block-by-block audio conversion.
+
+The rate change is reduced to a rational up/down ratio and applied with a
+Kaiser-windowed sinc low-pass split into `up` phases, so each output sample
+costs one short dot product instead of filtering an upsampled signal. The
+phases are laid out in one block matrix covering a whole period of the
+ratio, so a block of input is resampled with a single strided matrix
+product (BLAS) rather than a Python loop over phases. Filter history is
+carried between calls, so feeding a file in blocks gives the same output
+as resampling it in one piece while memory stays constant.
+
+    resampler = PolyphaseResampler(48000, 22050)
+    for block in blocks:
+        out.write(resampler.process(block))
+    out.write(resampler.flush())
+
+The total output length is ceil(input_length * target_sr / orig_sr), the
+same as librosa.resample.
+
+Kernels are designed once per process and ratio. Set
+POLYPHASE_KERNEL_CACHE to a directory to also keep them on disk between
+runs; the common dataset conversions are listed in COMMON_RATES.
+
+Requirements:
+  - numpy
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from math import gcd
+from typing import Optional
+
+import numpy as np
+
+# Zero crossings of the sinc kept on each side of the centre tap
+ZERO_CROSSINGS = 48
+
+# Cutoff as a fraction of the lower Nyquist frequency, leaving room for the
+# transition band so it is fully attenuated by the Nyquist frequency
+ROLLOFF = 0.92
+
+# Kaiser window shape; 8.6 gives roughly 85 dB of stopband attenuation
+KAISER_BETA = 8.6
+
+# (orig_sr, target_sr) pairs most inputs use (checked by tests/test_polyphase_resampler.py)
+COMMON_RATES = (
+    (44100, 22050),
+    (48000, 22050),
+    (16000, 22050),
+    (24000, 22050),
+)
+
+# Directory for kernels kept between runs (unset: in-process cache only)
+KERNEL_CACHE_ENV = "POLYPHASE_KERNEL_CACHE"
+
+
+def design_kernel(up: int, down: int) -> np.ndarray:
+    """
+    Low-pass filter for resampling by up/down, at the upsampled rate, scaled
+    by `up` so the passband gain of the resampled signal is 1.
+    """
+    ratio = max(up, down)
+    half_len = ZERO_CROSSINGS * ratio
+    cutoff = ROLLOFF / ratio  # relative to the upsampled Nyquist frequency
+    n = np.arange(-half_len, half_len + 1, dtype=np.float64)
+    kernel = cutoff * np.sinc(cutoff * n) * np.kaiser(2 * half_len + 1, KAISER_BETA)
+    return kernel * (up / kernel.sum())
+
+
+def polyphase_matrix(kernel: np.ndarray, up: int) -> np.ndarray:
+    """
+    Split a kernel into `up` phases of equal length, one row per phase, with
+    the taps reversed so a row can be applied directly to a slice of input.
+    """
+    taps = -(-len(kernel) // up)
+    padded = np.zeros(taps * up, dtype=np.float64)
+    padded[:len(kernel)] = kernel
+    return np.ascontiguousarray(padded.reshape(taps, up).T[:, ::-1], dtype=np.float32)
+
+
+def rational_ratio(orig_sr: int, target_sr: int) -> tuple[int, int]:
+    """Reduce a rate change to (up, down)."""
+    divisor = gcd(orig_sr, target_sr)
+    return target_sr // divisor, orig_sr // divisor
+
+
+def kernel_cache_path(up: int, down: int) -> Optional[str]:
+    """On-disk location of the phases for up/down, or None if disabled."""
+    cache_dir = os.environ.get(KERNEL_CACHE_ENV)
+    if not cache_dir:
+        return None
+    # The design parameters are part of the name so a change never loads stale taps
+    name = f"polyphase_{up}_{down}_z{ZERO_CROSSINGS}_r{ROLLOFF}_b{KAISER_BETA}.npy"
+    return os.path.join(cache_dir, name)
+
+
+@lru_cache(maxsize=None)
+def get_phases(up: int, down: int) -> np.ndarray:
+    """
+    Polyphase matrix for resampling by up/down, designed once per process
+    and, if POLYPHASE_KERNEL_CACHE is set, loaded from or saved to disk.
+    The returned array is shared and must not be modified.
+    """
+    path = kernel_cache_path(up, down)
+    if path and os.path.exists(path):
+        try:
+            phases = np.load(path)
+            if phases.ndim == 2 and phases.shape[0] == up:
+                phases.setflags(write=False)
+                return phases
+        except (OSError, ValueError):
+            pass  # unreadable or truncated; rebuild it below
+
+    phases = polyphase_matrix(design_kernel(up, down), up)
+    if path:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, phases)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # the cache is an optimisation only
+    phases.setflags(write=False)
+    return phases
+
+
+def filter_delay(up: int, down: int) -> int:
+    """Centre tap of design_kernel(), at the upsampled rate."""
+    return ZERO_CROSSINGS * max(up, down)
+
+
+@lru_cache(maxsize=None)
+def get_block_matrix(up: int, down: int) -> tuple[np.ndarray, int]:
+    """
+    Phases arranged so one matrix product computes `group * up` consecutive
+    outputs, starting at an output index that is a multiple of that count,
+    from a window of input. Returns (matrix of shape (window, outputs),
+    group). Consecutive output groups use windows `group * down` inputs
+    apart. group is raised above 1 for small ratios such as 2:1, where
+    single-output rows would overlap almost completely.
+    """
+    phases = get_phases(up, down)
+    taps = phases.shape[1]
+    group = max(1, -(-taps // (up * down)))
+    outputs = group * up
+
+    # Output r is centred on upsampled position r * down + delay; its window
+    # starts `offsets[r]` inputs after output 0's and uses phase `rows[r]`
+    positions = np.arange(outputs) * down + filter_delay(up, down)
+    offsets = positions // up - positions[0] // up
+    rows = positions % up
+
+    matrix = np.zeros((offsets[-1] + taps, outputs), dtype=np.float32)
+    matrix[offsets[:, None] + np.arange(taps), np.arange(outputs)[:, None]] = phases[rows]
+    matrix.setflags(write=False)
+    return matrix, group
+
+
+class PolyphaseResampler:
+    """Resamples a mono float stream from orig_sr to target_sr in blocks."""
+
+    def __init__(self, orig_sr: int, target_sr: int):
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self.up, self.down = rational_ratio(orig_sr, target_sr)
+
+        self.delay = filter_delay(self.up, self.down)
+        if self.up == self.down:
+            self.phases = np.ones((1, 1), dtype=np.float32)
+            self.matrix, self.group = self.phases, 1
+        else:
+            self.phases = get_phases(self.up, self.down)
+            self.matrix, self.group = get_block_matrix(self.up, self.down)
+        self.taps = self.phases.shape[1]
+        # Outputs per matrix row; rows always start at a multiple of this
+        self.per_row = self.group * self.up
+
+        # Input not yet consumed, starting at absolute sample index _buf_start;
+        # the zeros stand in for the samples before the start of the stream
+        self._buf = np.zeros(self.taps - 1, dtype=np.float32)
+        self._buf_start = -(self.taps - 1)
+        self._consumed = 0  # input samples received
+        self._produced = 0  # output samples emitted
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Feed a block of input and return every output sample it completes."""
+        self._consumed += len(block)
+        return self._run(block, limit=None)
+
+    def flush(self) -> np.ndarray:
+        """Return the remaining output, padding the input with silence."""
+        total = -(-self._consumed * self.up // self.down)
+        padding = np.zeros(self.delay // self.up + self.taps, dtype=np.float32)
+        return self._run(padding, limit=total)
+
+    def _run(self, block: np.ndarray, limit: int | None) -> np.ndarray:
+        if self.up == self.down:
+            self._produced += len(block)
+            if limit is not None:
+                return np.zeros(0, dtype=np.float32)
+            return np.asarray(block, dtype=np.float32)
+
+        buf = np.concatenate((self._buf, np.asarray(block, dtype=np.float32)))
+        last_index = self._buf_start + len(buf) - 1
+
+        # Output n is centred on input position (n * down + delay) / up; it is
+        # complete once that position has arrived
+        end = (last_index * self.up - self.delay) // self.down + 1
+        if limit is not None:
+            end = min(end, limit)
+        start = self._produced
+        count = max(end - start, 0)
+
+        out = np.empty(count, dtype=np.float32)
+        if count:
+            # Start at the row boundary at or before `start`; the few outputs
+            # computed twice are dropped. Each row is one window of input
+            # times the block matrix, and the rows are a strided view of the
+            # buffer, so the whole block is a single matrix product.
+            aligned = start - start % self.per_row
+            first = (aligned * self.down + self.delay) // self.up - self.taps + 1 - self._buf_start
+            rows = -(-(start + count - aligned) // self.per_row)
+            window, stride = self.matrix.shape[0], self.group * self.down
+            needed = first + (rows - 1) * stride + window
+            if needed > len(buf):
+                # The last row runs past the input; its extra outputs are dropped
+                source = np.concatenate((buf, np.zeros(needed - len(buf), dtype=np.float32)))
+            else:
+                source = buf
+            view = np.lib.stride_tricks.as_strided(
+                source[first:], shape=(rows, window),
+                strides=(stride * source.itemsize, source.itemsize), writeable=False,
+            )
+            skip = start - aligned
+            out[:] = (view @ self.matrix).ravel()[skip:skip + count]
+            self._produced = start + count
+
+        # Keep the history the next row needs (from its aligned start)
+        next_aligned = self._produced - self._produced % self.per_row
+        next_first = (next_aligned * self.down + self.delay) // self.up - self.taps + 1
+        keep_from = min(next_first, last_index + 1) - self._buf_start
+        self._buf = buf[keep_from:].copy()
+        self._buf_start += keep_from
+        return out
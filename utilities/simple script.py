@@ -1,46 +1,333 @@
-# This script generates a folder structure for ljspeech-1.1 processing from mimic-recording-studio database
-# Written as first python script (eg. helloworld) by Thorsten Miller (deep-learning-german-tts@gmx.net) on november 2019 without any warranty
-import sqlite3
+#!/usr/bin/env python3
+"""
+LJSpeech Exporter
+Builds an LJSpeech-1.1 style dataset (metadata.csv + wavs/) from a
+mimic-recording-studio database.
+
+Originally written as a first python script by Thorsten Miller
+(deep-learning-german-tts@gmx.net) in November 2019, without any warranty.
+
+Exports are incremental: the highest exported database row is recorded in
+the dataset directory, so later runs only export new recordings. Rows whose
+clip failed to export are recorded too and retried on the next run. Clips are
+reflinked or hardlinked when the studio and the dataset share a filesystem
+and copied by a pool of threads otherwise. metadata.csv is rewritten on
+every run with all exported rows ordered by prompt length, as before.
+
+--resample converts each new clip to 22.05 kHz mono while exporting (see
+convert_audio_to_22k_mono.py), so the raw studio WAVs are not written to
+the dataset first and converted afterwards.
+
+Usage:
+    python "simple script.py" --studio ~/mimic-recording-studio --output ~/dataset/LJSpeech-1.1 \\
+        --speaker 58b2b614-d98d-dd60-6be5-85d3c5cc2b28
+"""
+import argparse
+import errno
+import json
 import os
+import shutil
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from shutil import copyfile
-# please set following vars matching your environment
-# -----------------------------------------------------
-directory_base_mrs = "/Users/ThorstenVoice/Documents/TTS/mimic-recording-studio/"
-directory_base_ljspeech = "/Users/ThorstenVoice/Pocuments/TTS/dataset/"
-speaker_id = "58b2b614-d98d-dd60-6be5-85d3c5¢c2b28f"
-# -----------------------------------------------------
-
-# end of environment vars
-# Create needed folder structure for ljspeech
-def folder_creation():
-    now = datetime.now()
-    dt_string = now.strftime("%d.%m.%Y_%H-%M-%5")
-
-    global directory_base_ljspeech
-    directory_base_ljspeech = os.path.join(directory_base_ljspeech,"ljspeech_" + dt_string,"L)Speech-1.1")
-    directory_base_ljspeech = os.path.join(directory_base_ljspeech,"L]Speech-1.1")
-
-    if not os.path.exists(directory_base_ljspeech):
-        os.makedirs(directory_base_ljspeech)
-
-    if not os.path.exists(directory_base_ljspeech + "/wavs"):
-        os.makedirs(directory_base_ljspeech + "/wavs")
+from itertools import repeat
+
+STATE_FILE = ".export_state.json"
+
+# Linux ioctl that shares a file's extents with another (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+
+# Linking and copying wait on I/O, so use more threads than CPUs
+DEFAULT_THREADS = min(32, (os.cpu_count() or 1) * 4)
+
+# Failed rows looked up per query when they are retried
+RETRY_CHUNK = 500
+
+
+def load_state(dataset_dir):
+    """Previous export state ({} if this is the first export)."""
+    try:
+        with open(os.path.join(dataset_dir, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(dataset_dir, state):
+    path = os.path.join(dataset_dir, STATE_FILE)
+    with open(path + ".partial", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".partial", path)
+
+
+def open_studio_db(studio_dir):
+    """Open the studio database read-only, so a running studio is unaffected."""
+    db_path = os.path.join(studio_dir, "backend", "db", "mimicstudio.db")
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Database not found: {db_path}")
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+def iter_recordings(conn, speaker_id, after=None, rowids=None):
+    """
+    Yield (rowid, audio_id, prompt, lower(prompt)) ordered by prompt length,
+    straight from the cursor. Rows are limited to the speaker when the table
+    records one. With after and/or rowids, only rows whose rowid is greater
+    than after or in rowids are yielded.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(audiomodel)")}
+    query = "SELECT rowid, audio_id, prompt, lower(prompt) FROM audiomodel"
+    conditions = []
+    params = []
+    if "user_id" in columns:
+        conditions.append("user_id = ?")
+        params.append(speaker_id)
+    if after is not None or rowids is not None:
+        selected = []
+        if after is not None:
+            selected.append("rowid > ?")
+            params.append(after)
+        if rowids:
+            selected.append(f"rowid IN ({', '.join('?' * len(rowids))})")
+            params.extend(rowids)
+        conditions.append(f"({' OR '.join(selected or ['0'])})")
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    # rowid breaks ties so the order is the same on every run
+    query += " ORDER BY length(prompt), rowid"
+    yield from conn.execute(query, params)
+
+
+def iter_pending(conn, speaker_id, last_rowid, retry):
+    """
+    Rows to export: those added after last_rowid, then the retried ones
+    (queried in chunks to stay under SQLite's limit on parameters).
+    """
+    yield from iter_recordings(conn, speaker_id, after=last_rowid)
+    retry = sorted(retry)
+    for i in range(0, len(retry), RETRY_CHUNK):
+        yield from iter_recordings(conn, speaker_id, rowids=retry[i:i + RETRY_CHUNK])
+
+
+def reflink(src, dst):
+    """Clone src into dst sharing its data blocks; raises OSError if unsupported."""
+    import fcntl
+
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+
+def place_file(src, dst, mode):
+    """
+    Put src at dst using mode (reflink, hardlink or copy) and return the
+    method used. auto tries reflink, then hardlink, then copy.
+    """
+    if mode in ("auto", "reflink"):
+        try:
+            reflink(src, dst)
+            return "reflink"
+        except (OSError, ImportError) as e:
+            if mode == "reflink":
+                raise OSError(f"reflink not supported: {e}")
+    if mode in ("auto", "hardlink"):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError as e:
+            if mode == "hardlink" or e.errno not in (errno.EXDEV, errno.EPERM, errno.ENOTSUP):
+                raise
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+def export_clip(src, dst, mode):
+    """Export one clip; returns (method, error)."""
+    try:
+        if os.path.lexists(dst):
+            os.remove(dst)
+        return place_file(src, dst, mode), None
+    except OSError as e:
+        return None, str(e)
+
+
+def choose_link_mode(mode, audio_dir, wavs_dir):
+    """Skip straight to copying when the two directories are on different devices."""
+    if mode == "auto" and os.stat(audio_dir).st_dev != os.stat(wavs_dir).st_dev:
+        return "copy"
+    return mode
+
+
+def run_exports(sources, targets, mode, jobs=None, resample=False):
+    """
+    Yield (method, error) for each clip, in input order. Clips are placed
+    by a thread pool, or converted to 22.05 kHz mono by a process pool when
+    resample is set.
+    """
+    if not sources:
+        return
+    if not resample:
+        with ThreadPoolExecutor(max_workers=jobs or DEFAULT_THREADS) as pool:
+            yield from pool.map(export_clip, sources, targets, repeat(mode))
+        return
+
+    from convert_audio_to_22k_mono import MAX_CHUNKSIZE, convert_audio_file, load_dsp
+
+    jobs = min(jobs or os.cpu_count() or 1, len(sources))
+    chunksize = max(1, min(MAX_CHUNKSIZE, len(sources) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=load_dsp) as pool:
+        # convert_audio_file writes a partial file and renames it over the
+        # target, so an earlier hardlink to the studio file is never written through
+        outputs = pool.map(convert_audio_file, sources, targets, chunksize=chunksize)
+        for target, output in zip(targets, outputs):
+            if output:
+                yield "resample", None
+                continue
+            # Drop what an earlier export left there, as export_clip does,
+            # so the failed clip is retried rather than kept at the old rate
+            if os.path.lexists(target):
+                os.remove(target)
+            yield None, "conversion failed"
+
+
+def export_dataset(
+    studio_dir, dataset_dir, speaker_id, link_mode="auto", jobs=None, full=False, resample=False
+):
+    """
+    Export new recordings and rewrite metadata.csv. With resample, clips
+    are written as 22.05 kHz mono instead of being linked or copied.
+    Returns True if every new clip was exported.
+    """
+    audio_dir = os.path.join(studio_dir, "backend", "audio_files", speaker_id)
+    wavs_dir = os.path.join(dataset_dir, "wavs")
+    os.makedirs(wavs_dir, exist_ok=True)
+
+    state = {} if full else load_state(dataset_dir)
+    if state.get("speaker_id") not in (None, speaker_id):
+        print(f"Error: '{dataset_dir}' was exported for speaker {state['speaker_id']}; use --full or another --output")
+        return False
+    last_rowid = state.get("last_rowid", 0)
+    # Rows at or below last_rowid whose clip failed last time
+    retry = set(state.get("failed_rowids", []))
+
+    # One directory listing instead of a stat per already-exported row
+    existing = {entry.name for entry in os.scandir(wavs_dir)}
+
+    conn = open_studio_db(studio_dir)
+    try:
+        # Only the rows to export are held in memory
+        pending_rows = [row[:2] for row in iter_pending(conn, speaker_id, last_rowid, retry)]
+        pending = [audio_id for _, audio_id in pending_rows]
+        retried = sum(1 for rowid, _ in pending_rows if rowid <= last_rowid)
+
+        print(f"{len(pending) - retried} new recording(s) since the last export")
+        if retried:
+            print(f"Retrying {retried} clip(s) that failed in an earlier export")
+
+        if pending and state.get("resample", resample) != resample:
+            print(f"Warning: earlier clips were exported {'without' if resample else 'with'} --resample; "
+                  f"use --full to export them all the same way")
+        mode = link_mode
+        if pending and not resample:
+            mode = choose_link_mode(link_mode, audio_dir, wavs_dir)
+        sources = [os.path.join(audio_dir, audio_id + ".wav") for audio_id in pending]
+        targets = [os.path.join(wavs_dir, audio_id + ".wav") for audio_id in pending]
+
+        failed = set()
+        failed_rowids = []
+        methods = {}
+        results = run_exports(sources, targets, mode, jobs, resample)
+        for done, ((rowid, audio_id), (method, error)) in enumerate(zip(pending_rows, results), 1):
+            if error:
+                failed.add(audio_id)
+                failed_rowids.append(rowid)
+                existing.discard(f"{audio_id}.wav")
+                print(f"[{done}/{len(pending)}] Failed: {audio_id}: {error}")
+            else:
+                existing.add(f"{audio_id}.wav")
+                methods[method] = methods.get(method, 0) + 1
+
+        # Second pass over the cursor, so metadata.csv lists every exported
+        # clip in prompt order without keeping all rows in memory. Rows
+        # recorded since the first query have no clip yet and are left out.
+        metadata_path = os.path.join(dataset_dir, "metadata.csv")
+        written = 0
+        with open(metadata_path + ".partial", mode="w", encoding="utf8") as metadata:
+            for _, audio_id, prompt, prompt_lower in iter_recordings(conn, speaker_id):
+                if f"{audio_id}.wav" in existing:
+                    metadata.write(audio_id + "|" + prompt + "|" + prompt_lower + "\n")
+                    written += 1
+        os.replace(metadata_path + ".partial", metadata_path)
+    finally:
+        conn.close()
+
+    if pending_rows:
+        state.update(
+            speaker_id=speaker_id,
+            resample=resample,
+            last_rowid=max(last_rowid, max(rowid for rowid, _ in pending_rows)),
+            failed_rowids=sorted(failed_rowids),
+            exported_at=datetime.now().isoformat(timespec="seconds"),
+        )
+        save_state(dataset_dir, state)
+
+    summary = ", ".join(f"{count} by {method}" for method, count in sorted(methods.items()))
+    print(f"Exported {len(pending) - len(failed)} clip(s){' (' + summary + ')' if summary else ''}, "
+          f"{len(failed)} failed")
+    print(f"metadata.csv: {written} entries in {dataset_dir}")
+    return not failed
+
 
 def main():
-	folder_creation()
-	conn = sqlite3.connect(os.path.join(directory_base_mrs," backend" ,"db","mimicstudio.db"))
-	c = conn.cursor()
+    parser = argparse.ArgumentParser(
+        description="Export an LJSpeech-1.1 dataset from a mimic-recording-studio database"
+    )
+    parser.add_argument(
+        "--studio", required=True,
+        help="mimic-recording-studio directory (contains backend/db/mimicstudio.db)",
+    )
+    parser.add_argument(
+        "--output", required=True,
+        help="Dataset directory to create or update (metadata.csv and wavs/)",
+    )
+    parser.add_argument("--speaker", required=True, help="Speaker (user) ID whose recordings to export")
+    parser.add_argument(
+        "--link", choices=LINK_MODES, default="auto",
+        help="How clips are placed: reflink/hardlink when on the same filesystem, "
+             "else copy (default: auto)",
+    )
+    parser.add_argument(
+        "--resample", action="store_true",
+        help="Write clips as 22.05 kHz mono (converted in a process pool) instead of linking or copying",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=None,
+        help="Parallel copies (default: 4 per CPU, at most 32) or, with --resample, "
+             "worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Ignore the recorded state and export every recording again",
+    )
+    args = parser.parse_args()
 
-	# Create new metadata.csv for ljspeech
-	metadata = open(os.path.join(directory_base_ljspeech,"metadata.csv"),mode="w", encoding="utf8")
-	
-	for row in c.execute('SELECT audio_id, prompt, lower(prompt) FROM audiomodel ORDER BY length(prompt)'):
-		metadata.write(row[0] + "|" + row[1] + "|" + row[2] + "\n")
-		copyfile(os.path.join(directory_base_mrs, "backend", "audio_files", speaker_id, row[0] + ".wav"),os.path.join(directory_base_ljspeech, "wavs", row[0] + ".wav"))
+    try:
+        ok = export_dataset(
+            args.studio, args.output, args.speaker, args.link, args.jobs, args.full, args.resample
+        )
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not ok:
+        sys.exit(1)
 
-	metadata.close()
-	conn.close()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Dataset Validator
+Checks that every clip referenced by a pipe-separated metadata file exists
+and is usable before training starts, and writes an enriched manifest.
+
+Each referenced file's WAV header is read directly (no ffprobe per clip) by
+a pool of worker threads. Clips are flagged as missing, empty (no audio
+frames), unreadable (not WAV), truncated (header claims more data than the
+file holds), wrong_rate or wrong_channels.
+
+The manifest is JSON Lines, one entry per metadata line with all metadata
+columns plus path, duration, sample_rate, channels, bits and problems. A
+summary with counts per problem and total hours is written next to it.
+
+Usage:
+    python validate_dataset.py metadata.csv wavs/ [--rate 22050] [--channels 1] [--manifest manifest.jsonl]
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from metadata_to_csv_json import WAV_ERRORS, audio_path_for, iter_metadata, read_wav_info
+
+PROBLEMS = ("missing", "empty", "unreadable", "truncated", "wrong_rate", "wrong_channels")
+
+# Entries submitted to the pool at a time; bounds memory on huge metadata files
+WINDOW = 10000
+
+
+def check_clip(item, audio_root, expected_rate=None, expected_channels=None):
+    """Return item enriched with the clip's header fields and any problems."""
+    entry = dict(item)
+    entry.update(
+        path=audio_path_for(audio_root, item["audio"]),
+        duration=None,
+        sample_rate=None,
+        channels=None,
+        bits=None,
+        problems=[],
+    )
+    try:
+        info = read_wav_info(entry["path"])
+    except FileNotFoundError:
+        entry["problems"].append("missing")
+        return entry
+    except WAV_ERRORS as e:
+        # Zero-length files fail the RIFF check; report them as empty
+        if os.path.isfile(entry["path"]) and os.path.getsize(entry["path"]) == 0:
+            entry["problems"].append("empty")
+        else:
+            entry["problems"].append("unreadable")
+            entry["error"] = str(e)
+        return entry
+
+    entry.update(
+        duration=round(info["duration"], 6),
+        sample_rate=info["sample_rate"],
+        channels=info["channels"],
+        bits=info["bits"],
+    )
+    if info["frames"] == 0:
+        entry["problems"].append("empty")
+    if info["truncated"]:
+        entry["problems"].append("truncated")
+    if expected_rate and info["sample_rate"] != expected_rate:
+        entry["problems"].append("wrong_rate")
+    if expected_channels and info["channels"] != expected_channels:
+        entry["problems"].append("wrong_channels")
+    return entry
+
+
+def validate_dataset(
+    metadata_file, audio_root, manifest_file, expected_rate=None, expected_channels=None, jobs=None
+):
+    """
+    Check every clip in metadata_file and write the manifest and summary.
+    Returns the summary dict, or None if the metadata file is missing.
+    """
+    if not os.path.exists(metadata_file):
+        print(f"Error: Metadata file '{metadata_file}' not found.")
+        return None
+
+    summary = {"total": 0, "ok": 0, "hours": 0.0, "ok_hours": 0.0}
+    summary.update({problem: 0 for problem in PROBLEMS})
+    examples = {problem: [] for problem in PROBLEMS}
+
+    def check(item):
+        return check_clip(item, audio_root, expected_rate, expected_channels)
+
+    entries = iter_metadata(metadata_file)
+    with ThreadPoolExecutor(max_workers=jobs) as pool, \
+            open(manifest_file, "w", encoding="utf-8") as manifest:
+        while True:
+            window = list(islice(entries, WINDOW))
+            if not window:
+                break
+            for entry in pool.map(check, window):
+                manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                summary["total"] += 1
+                duration = entry["duration"] or 0.0
+                summary["hours"] += duration / 3600
+                if not entry["problems"]:
+                    summary["ok"] += 1
+                    summary["ok_hours"] += duration / 3600
+                for problem in entry["problems"]:
+                    summary[problem] += 1
+                    if len(examples[problem]) < 10:
+                        examples[problem].append(entry["audio"])
+
+    summary["hours"] = round(summary["hours"], 3)
+    summary["ok_hours"] = round(summary["ok_hours"], 3)
+    summary["examples"] = {k: v for k, v in examples.items() if v}
+    with open(os.path.splitext(manifest_file)[0] + ".summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the audio referenced by a metadata file and write an enriched manifest",
+        epilog="Example: python validate_dataset.py LJSpeech-1.1/metadata.csv LJSpeech-1.1/wavs",
+    )
+    parser.add_argument("metadata_file", help="Pipe-separated metadata file")
+    parser.add_argument("audio_root", help="Directory the audio IDs are relative to")
+    parser.add_argument(
+        "--rate", type=int, default=22050,
+        help="Expected sample rate; 0 to accept any (default: 22050)",
+    )
+    parser.add_argument(
+        "--channels", type=int, default=1,
+        help="Expected channel count; 0 to accept any (default: 1)",
+    )
+    parser.add_argument(
+        "--manifest", default="manifest.jsonl",
+        help="Enriched manifest to write (default: manifest.jsonl)",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=min(32, (os.cpu_count() or 1) * 4),
+        help="Worker threads reading headers (default: 4 per CPU, at most 32)",
+    )
+    args = parser.parse_args()
+
+    summary = validate_dataset(
+        args.metadata_file, args.audio_root, args.manifest, args.rate, args.channels, args.jobs
+    )
+    if summary is None:
+        sys.exit(1)
+
+    print(f"Checked {summary['total']} clips: {summary['ok']} ok, {summary['hours']:.2f} hours total "
+          f"({summary['ok_hours']:.2f} hours usable)")
+    for problem in PROBLEMS:
+        if summary[problem]:
+            shown = ", ".join(summary["examples"][problem])
+            print(f"  {problem}: {summary[problem]} (e.g. {shown})")
+    print(f"Manifest written to {args.manifest}")
+
+    if summary["ok"] != summary["total"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
-import subprocess
 import tempfile
 import sys
 import os
 import logging
 
+import ffmpeg_jobs
+
 # ===========================
 # ==== Configure logging ====
 # ===========================
@@ -29,9 +30,12 @@ def findSilences(filename, dB):
   command = ["ffmpeg","-i",filename,
              "-af","silencedetect=n=" + str (dB) + "dB:d=1",
              "-f","null","-"]
-  output = subprocess.run (command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-  s = str(output)
-  lines = s.split("\\n")
+  # keep every silencedetect line; the job's stderr buffer only holds the tail
+  lines = []
+  def keep_silencedetect (line):
+    if ("silencedetect" in line):
+      lines.append (line)
+  ffmpeg_jobs.run_ffmpeg (command, on_stderr_line=keep_silencedetect)
   time_list = []
   logging.debug("  lines: ```\n" + "\n".join(lines) + "```\n\n")
 
@@ -60,9 +64,8 @@ def getVideoDuration(filename:str) -> float:
              "-show_entries","format=duration","-hide_banner",
              "-of","default=noprint_wrappers=1:nokey=1"]
 
-  output = subprocess.run (command, stdout=subprocess.PIPE)
-  s = str(output.stdout, "UTF-8")
-  return float (s)
+  output = ffmpeg_jobs.run_ffmpeg (command, capture_stdout=True)
+  return float (output.stdout)
 
 def getSectionsOfNewVideo (silences, duration, BUFFER):
   """Returns timings for parts, where the video should be kept"""
@@ -129,8 +132,10 @@ def ffmpeg_run (file, videoFilter, audioFilter, outfile):
   command = ["ffmpeg","-i",file,
               "-filter_script:v",videoFilter_file,
               "-filter_script:a",audioFilter_file,
-              outfile]
-  subprocess.run (command)
+              "-y",outfile]  # -y: ffmpeg can't prompt, its stdin isn't a terminal
+  result = ffmpeg_jobs.run_ffmpeg (command)
+  if not result.ok:
+    print ("ffmpeg failed:\n" + result.stderr)
 
   vFile.close()
   aFile.close()
@@ -207,7 +212,8 @@ def main():
   #   dB = args[2]
 
 
-  cut_silences (infile, outfile, dB, BUFFER)
+  with ffmpeg_jobs.cancel_on_interrupt ():
+    cut_silences (infile, outfile, dB, BUFFER)
 
 
 if __name__ == "__main__":